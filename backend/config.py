@@ -13,10 +13,89 @@ class Settings:
     ODOO_USERNAME: str = os.getenv("ODOO_USERNAME")
     ODOO_PASSWORD: str = os.getenv("ODOO_PASSWORD")
     
+    # Timeout mỗi RPC odoorpc (giây)
+    ODOO_RPC_TIMEOUT: float = float(os.getenv("ODOO_RPC_TIMEOUT", "30"))
+    
+    # Product Catalog Cache (giây)
+    CATALOG_ENABLED: bool = os.getenv("CATALOG_ENABLED", "true").lower() == "true"
+    CATALOG_TTL: float = float(os.getenv("CATALOG_TTL", "60"))
+    CATALOG_STOCK_TTL: float = float(os.getenv("CATALOG_STOCK_TTL", "15"))
+    
+    # Tìm tên sản phẩm (index trigram bỏ dấu): ngưỡng phủ trigram, điểm tối thiểu khi liệt kê,
+    # tự chọn khi điểm đầu >= AUTOPICK_SCORE và hơn ứng viên thứ 2 >= AUTOPICK_MARGIN
+    PRODUCT_MATCH_MIN_COVERAGE: float = float(os.getenv("PRODUCT_MATCH_MIN_COVERAGE", "0.5"))
+    PRODUCT_MATCH_MIN_SCORE: float = float(os.getenv("PRODUCT_MATCH_MIN_SCORE", "0.5"))
+    PRODUCT_AUTOPICK_SCORE: float = float(os.getenv("PRODUCT_AUTOPICK_SCORE", "0.75"))
+    PRODUCT_AUTOPICK_MARGIN: float = float(os.getenv("PRODUCT_AUTOPICK_MARGIN", "0.1"))
+    
+    # Customer Index (giây)
+    CUSTOMER_INDEX_ENABLED: bool = os.getenv("CUSTOMER_INDEX_ENABLED", "true").lower() == "true"
+    CUSTOMER_INDEX_TTL: float = float(os.getenv("CUSTOMER_INDEX_TTL", "60"))
+    
+    # Snapshot đơn hàng: số mã đơn (SO...) nhớ sẵn ID
+    ORDER_NAME_CACHE_SIZE: int = int(os.getenv("ORDER_NAME_CACHE_SIZE", "512"))
+    
+    # Result cache cho action chỉ đọc: TTL theo action (giây, 0 = không cache), số entry tối đa (LRU)
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "1000"))
+    RESULT_CACHE_TTL: dict = {
+        'list_products': float(os.getenv("RESULT_CACHE_TTL_PRODUCTS", "15")),
+        'suggest_price': float(os.getenv("RESULT_CACHE_TTL_PRICE", "15")),
+        'get_customer_pricelist': float(os.getenv("RESULT_CACHE_TTL_PRICELIST", "60")),
+        'check_orders': float(os.getenv("RESULT_CACHE_TTL_ORDERS", "10")),
+    }
+    
+    # Số thread tra cứu song song trong 1 action (sản phẩm, khách hàng, bảng giá...)
+    LOOKUP_WORKERS: int = int(os.getenv("LOOKUP_WORKERS", "8"))
+    
+    # Khởi động: thời gian tối đa chờ warmup (giây) trước khi nhận traffic, phần còn lại chạy nền
+    STARTUP_BUDGET: float = float(os.getenv("STARTUP_BUDGET", "0.3"))
+    
+    # Header X-Odoo-RPC (tóm tắt RPC của từng request) để debug
+    RPC_DEBUG_HEADER: bool = os.getenv("RPC_DEBUG_HEADER", "false").lower() == "true"
+    
+    # Pricelist Engine: chu kỳ kiểm tra thay đổi rule (giây)
+    PRICELIST_CHECK_INTERVAL: float = float(os.getenv("PRICELIST_CHECK_INTERVAL", "60"))
+    
+    # Fast-path intent (bỏ qua LLM với lệnh có cấu trúc rõ ràng)
+    FAST_INTENT_ENABLED: bool = os.getenv("FAST_INTENT_ENABLED", "true").lower() == "true"
+    FAST_INTENT_THRESHOLD: float = float(os.getenv("FAST_INTENT_THRESHOLD", "0.85"))
+    
+    # Lịch sử hội thoại gửi cho LLM (ngân sách token, độ dài reply bắt đầu rút gọn)
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "1200"))
+    HISTORY_COMPACT_CHARS: int = int(os.getenv("HISTORY_COMPACT_CHARS", "300"))
+    
+    # Phiên chat phía server (SESSION_DB_PATH rỗng = chỉ lưu trong bộ nhớ)
+    SESSION_CAPACITY: int = int(os.getenv("SESSION_CAPACITY", "1000"))
+    SESSION_MAX_TURNS: int = int(os.getenv("SESSION_MAX_TURNS", "20"))
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "sessions.db")
+    
+    # Cache intent LLM (tin nhắn chuẩn hóa + ngữ cảnh -> intent JSON); INTENT_CACHE_DB_PATH rỗng = chỉ trong bộ nhớ
+    INTENT_CACHE_ENABLED: bool = os.getenv("INTENT_CACHE_ENABLED", "true").lower() == "true"
+    INTENT_CACHE_SIZE: int = int(os.getenv("INTENT_CACHE_SIZE", "2000"))
+    INTENT_CACHE_TTL: float = float(os.getenv("INTENT_CACHE_TTL", "3600"))
+    INTENT_CACHE_DB_PATH: str = os.getenv("INTENT_CACHE_DB_PATH", "")
+    
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
-    OPENAI_BASE_URL: str = "https://api.groq.com/openai/v1"
-    OPENAI_MODEL: str = "llama-3.3-70b-versatile"
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://api.groq.com/openai/v1")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "llama-3.3-70b-versatile")
+    
+    # LLM client: deadline mỗi request (giây), retry lỗi tạm thời, hedged request theo p95
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "20"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_POOL_SIZE: int = int(os.getenv("LLM_POOL_SIZE", "16"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+    
+    # Circuit breaker (Odoo, LLM): mở khi tỉ lệ lỗi / tỉ lệ gọi chậm trong cửa sổ vượt ngưỡng
+    BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+    BREAKER_FAILURE_RATIO: float = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+    BREAKER_SLOW_RATIO: float = float(os.getenv("BREAKER_SLOW_RATIO", "0.8"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    ODOO_SLOW_CALL: float = float(os.getenv("ODOO_SLOW_CALL", "5"))
+    LLM_SLOW_CALL: float = float(os.getenv("LLM_SLOW_CALL", "10"))
     
     # CORS Configuration
     CORS_ORIGINS: list = ["*"]
@@ -33,4 +112,4 @@ class Settings:
             raise ValueError(f"Missing required config: {', '.join(missing)}")
 
 settings = Settings()
-settings.validate()
\ No newline at end of file
+# validate() chạy khi khởi động app / lần đầu kết nối Odoo (không chạy lúc import)
@@ -0,0 +1 @@
+# Fake backends (Odoo, LLM) dùng cho test/benchmark khi không có hệ thống thật
@@ -0,0 +1,116 @@
+"""
+Fake OpenAI-compatible server (chat completions).
+
+Chạy độc lập:
+    python -m backend.fakes.llm_server --port 8090 --latency 0.3
+    -> OPENAI_BASE_URL=http://127.0.0.1:8090/v1
+
+Hoặc dùng in-process với httpx.ASGITransport(app=create_fake_llm_app(...)).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Callable, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def default_responder(messages: List[dict]) -> dict:
+    """Intent mặc định: trả lời chat thường, nhắc lại tin nhắn cuối"""
+    last = messages[-1]['content'] if messages else ''
+    return {"action": "chat", "response": f"Em đã nhận: {last}"}
+
+
+def create_fake_llm_app(responder: Callable[[List[dict]], dict] = None, latency: float = 0.0,
+                        jitter: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None) -> FastAPI:
+    """
+    Tạo ASGI app giả lập POST /v1/chat/completions
+
+    Args:
+        responder: hàm nhận messages, trả về dict intent (được trả dưới dạng JSON string)
+        latency: độ trễ mỗi request (giây), jitter: cộng thêm ngẫu nhiên [0, jitter]
+        failure_rate: tỉ lệ trả lỗi 503 (để thử retry)
+    """
+    responder = responder or default_responder
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+
+    def usage_for(messages: List[dict], content: str) -> dict:
+        prompt = sum(len((m.get('content') or '').encode('utf-8')) // 4 + 4 for m in messages)
+        completion = len(content.encode('utf-8')) // 4 + 1
+        return {'prompt_tokens': prompt, 'completion_tokens': completion, 'total_tokens': prompt + completion}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        await asyncio.sleep(latency + rng.uniform(0, jitter))
+
+        if failure_rate and rng.random() < failure_rate:
+            return JSONResponse(status_code=503, content={'error': {'message': 'Service unavailable (fake)', 'type': 'server_error'}})
+
+        messages = payload.get('messages') or []
+        model = payload.get('model', 'fake-model')
+        content = json.dumps(responder(messages), ensure_ascii=False)
+        completion_id = f"chatcmpl-fake-{next(ids)}"
+        created = int(time.time())
+
+        if not payload.get('stream'):
+            return {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': usage_for(messages, content),
+            }
+
+        async def event_stream():
+            for i in range(0, len(content), 8):
+                chunk = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': content[i:i + 8]}, 'finish_reason': None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            done = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            if (payload.get('stream_options') or {}).get('include_usage'):
+                last = {
+                    'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': [], 'usage': usage_for(messages, content),
+                }
+                yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    options = parser.parse_args()
+
+    print(f"Fake LLM: OPENAI_BASE_URL=http://{options.host}:{options.port}/v1")
+    uvicorn.run(
+        create_fake_llm_app(latency=options.latency, jitter=options.jitter, failure_rate=options.failure_rate),
+        host=options.host, port=options.port
+    )
@@ -0,0 +1,196 @@
+"""
+Fake odoorpc (in-process) trên FakeOdooStore.
+
+Giả lập đủ API odoorpc mà service dùng: ODOO.env[model], method của model
+(search, search_read, read, create, write...), browse() với lazy load field,
+many2one/x2many trả về recordset. Mọi RPC đều đi qua ODOO.execute_kw nên
+OdooService.rpc_counter đếm được y như với Odoo thật.
+
+VD (trước lần kết nối Odoo đầu tiên):
+    store = build_demo_dataset(n_products=1000)
+    install_fake_odoo(store, latency=0.005)
+"""
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import odoorpc
+
+from backend.fakes.odoo_store import SCHEMA, FakeOdooError, FakeOdooStore
+
+
+class FakeRecordset:
+    """Tương đương odoorpc recordset: ids, lazy load field, gọi method trên record"""
+
+    def __init__(self, env: 'FakeEnvironment', model: str, ids: List[int], prefetch: List[int] = None):
+        object.__setattr__(self, '_env', env)
+        object.__setattr__(self, '_name', model)
+        object.__setattr__(self, 'ids', list(ids))
+        # odoorpc đọc 1 lần cho cả recordset cha (VD: tất cả order_line)
+        object.__setattr__(self, '_prefetch', list(prefetch or ids))
+        object.__setattr__(self, '_values', {})
+
+    @property
+    def id(self):
+        return self.ids[0] if self.ids else False
+
+    def __bool__(self):
+        return bool(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        for record_id in self.ids:
+            yield self._child(self._name, [record_id], self.ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return FakeRecordset(self._env, self._name, self.ids[key])
+        return self._child(self._name, [self.ids[key]], self.ids)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRecordset) and other._name == self._name and other.ids == self.ids
+
+    def __hash__(self):
+        return hash((self._name, tuple(self.ids)))
+
+    def __repr__(self):
+        return f"Recordset({self._name!r}, {self.ids})"
+
+    def _child(self, model: str, ids: List[int], prefetch: List[int]) -> 'FakeRecordset':
+        child = FakeRecordset(self._env, model, ids, prefetch)
+        if model == self._name:
+            object.__setattr__(child, '_values', self._values)
+        return child
+
+    def _load(self):
+        """Đọc toàn bộ field của các record trong nhóm prefetch (1 RPC)"""
+        ids = [i for i in self._prefetch if i not in self._values] or self.ids
+        rows = self._env.odoo.execute_kw(self._name, 'read', [ids], {'load': '_classic_write'})
+        for row in rows:
+            self._values[row['id']] = row
+
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        schema = SCHEMA.get(self._name, {})
+        if name in self._env.field_names(self._name):
+            if len(self.ids) != 1:
+                raise ValueError(f"Expected singleton: {self!r}")
+            if self.id not in self._values:
+                self._load()
+            value = self._values[self.id].get(name, False)
+            if name in schema.get('many2one', {}):
+                return self._child(schema['many2one'][name], [value] if value else [], [])
+            if name in schema.get('x2many', {}):
+                return self._child(schema['x2many'][name], value or [], value or [])
+            return value
+
+        def method(*args, **kwargs):
+            result = self._env.odoo.execute_kw(self._name, name, [self.ids] + list(args), kwargs)
+            self._values.clear()
+            return result
+        return method
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Dùng record.write({...}) để ghi dữ liệu")
+
+
+class FakeModel:
+    """Tương đương odoorpc Model (env['sale.order'])"""
+
+    def __init__(self, env: 'FakeEnvironment', model: str):
+        self._env = env
+        self._name = model
+
+    def browse(self, ids) -> FakeRecordset:
+        ids = [ids] if isinstance(ids, int) else list(ids or [])
+        return FakeRecordset(self._env, self._name, ids)
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self._env.odoo.execute_kw(self._name, name, list(args), kwargs)
+        return method
+
+
+class FakeEnvironment:
+    """Tương đương odoorpc Environment (ODOO.env)"""
+
+    def __init__(self, odoo: 'FakeODOO'):
+        self.odoo = odoo
+        self.context = {'lang': 'vi_VN'}
+        self._fields: Dict[str, set] = {}
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self.odoo.uid
+
+    def field_names(self, model: str) -> set:
+        """Danh sách field (tương đương metadata fields_get mà odoorpc cache sẵn)"""
+        if model not in self._fields:
+            schema = SCHEMA.get(model, {})
+            names = {'id', 'name', 'display_name', 'write_date', 'create_date'}
+            names |= set(schema.get('many2one', {})) | set(schema.get('x2many', {}))
+            for record in self.odoo.store.records.get(model, {}).values():
+                names |= set(record)
+            self._fields[model] = names
+        return self._fields[model]
+
+    def __getitem__(self, model: str) -> FakeModel:
+        if model not in SCHEMA:
+            raise ValueError(f"There is no model '{model}'")
+        return FakeModel(self, model)
+
+    def __contains__(self, model: str) -> bool:
+        return model in SCHEMA
+
+
+class FakeODOO:
+    """
+    Tương đương odoorpc.ODOO nhưng chạy trên FakeOdooStore trong cùng process.
+
+    Args:
+        latency: độ trễ giả lập mỗi RPC (giây), jitter: cộng thêm ngẫu nhiên [0, jitter]
+    """
+
+    def __init__(self, store: FakeOdooStore, latency: float = 0.0, jitter: float = 0.0, seed: int = None):
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self.uid: Optional[int] = None
+        self.env = FakeEnvironment(self)
+
+    def _sleep(self):
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def login(self, db: str, login: str = 'admin', password: str = 'admin'):
+        self._sleep()
+        uid = self.store.login(db, login, password)
+        if not uid:
+            raise ValueError("Wrong login ID or password")
+        self.uid = uid
+
+    def execute_kw(self, model: str, method: str, args: list = None, kw: dict = None) -> Any:
+        self._sleep()
+        try:
+            return self.store.execute_kw(model, method, args, kw)
+        except FakeOdooError as e:
+            # odoorpc báo lỗi nghiệp vụ từ server bằng RPCError
+            raise odoorpc.error.RPCError(str(e)) from e
+
+    def execute(self, model: str, method: str, *args) -> Any:
+        return self.execute_kw(model, method, list(args))
+
+
+def install_fake_odoo(store: FakeOdooStore, latency: float = 0.0, jitter: float = 0.0, seed: int = None) -> FakeODOO:
+    """Thay odoorpc.ODOO bằng FakeODOO dùng chung 1 store (gọi trước lần kết nối Odoo đầu tiên)"""
+    fake = FakeODOO(store, latency=latency, jitter=jitter, seed=seed)
+    odoorpc.ODOO = lambda *args, **kwargs: fake
+    return fake
@@ -0,0 +1,481 @@
+import copy
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+class FakeOdooError(Exception):
+    """Lỗi nghiệp vụ giả lập (tương đương UserError/ValidationError của Odoo)"""
+
+
+# Quan hệ giữa các model: field -> model đích
+SCHEMA = {
+    'res.partner': {
+        'many2one': {'property_product_pricelist': 'product.pricelist'},
+        'x2many': {},
+    },
+    'product.template': {
+        'many2one': {},
+        'x2many': {'taxes_id': 'account.tax'},
+    },
+    'product.product': {
+        'many2one': {'product_tmpl_id': 'product.template'},
+        'x2many': {'taxes_id': 'account.tax'},
+    },
+    'account.tax': {'many2one': {}, 'x2many': {}},
+    'res.currency': {'many2one': {}, 'x2many': {}},
+    'product.pricelist': {
+        'many2one': {'currency_id': 'res.currency'},
+        'x2many': {'item_ids': 'product.pricelist.item'},
+    },
+    'product.pricelist.item': {
+        'many2one': {
+            'pricelist_id': 'product.pricelist',
+            'product_id': 'product.product',
+            'product_tmpl_id': 'product.template',
+        },
+        'x2many': {},
+    },
+    'sale.order': {
+        'many2one': {'partner_id': 'res.partner'},
+        'x2many': {
+            'order_line': 'sale.order.line',
+            'picking_ids': 'stock.picking',
+            'invoice_ids': 'account.move',
+        },
+    },
+    'sale.order.line': {
+        'many2one': {'order_id': 'sale.order', 'product_id': 'product.product'},
+        'x2many': {},
+    },
+    'stock.picking': {
+        'many2one': {'sale_id': 'sale.order'},
+        'x2many': {},
+    },
+    'account.move': {'many2one': {}, 'x2many': {}},
+    'crm.lead': {
+        'many2one': {'partner_id': 'res.partner', 'user_id': 'res.users'},
+        'x2many': {},
+    },
+    'res.users': {'many2one': {}, 'x2many': {}},
+}
+
+
+class FakeOdooStore:
+    """
+    CSDL Odoo giả lập trong bộ nhớ.
+
+    Hỗ trợ các method ORM mà chatbot dùng (search, search_read, read, search_count,
+    create, write, unlink, action_confirm, action_cancel) với domain dạng Polish
+    notation giống Odoo. Dùng chung cho fake JSON-RPC server và fake odoorpc.
+    """
+
+    def __init__(self, db: str = 'fake', username: str = 'admin', password: str = 'admin'):
+        self.db = db
+        self.username = username
+        self.password = password
+        self.uid = 2
+        self.records: Dict[str, Dict[int, dict]] = {model: {} for model in SCHEMA}
+        self._next_id: Dict[str, int] = {model: 1 for model in SCHEMA}
+        self._clock = datetime(2025, 1, 1)
+
+    # ===== TIỆN ÍCH =====
+
+    def _now(self) -> str:
+        """write_date tăng dần 1 giây mỗi lần ghi (để test incremental refresh)"""
+        self._clock += timedelta(seconds=1)
+        return self._clock.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _display_name(self, model: str, record_id: int) -> str:
+        record = self.records.get(model, {}).get(record_id)
+        if not record:
+            return f"{model},{record_id}"
+        return record.get('display_name') or record.get('name') or f"{model},{record_id}"
+
+    def _get_value(self, model: str, record: dict, path: str) -> Any:
+        """Lấy giá trị field (hỗ trợ 'partner_id.name')"""
+        head, _, rest = path.partition('.')
+        value = record.get(head, False)
+        if not rest:
+            return value
+        comodel = SCHEMA.get(model, {}).get('many2one', {}).get(head)
+        if not comodel or not value:
+            return False
+        target = self.records[comodel].get(value)
+        return self._get_value(comodel, target, rest) if target else False
+
+    # ===== DOMAIN =====
+
+    @staticmethod
+    def _compare(value: Any, operator: str, operand: Any) -> bool:
+        if operator in ('=', '=='):
+            if isinstance(value, list) and not isinstance(operand, list):
+                return operand in value
+            return value == operand or (operand is False and value in (None, False, ''))
+        if operator in ('!=', '<>'):
+            return not FakeOdooStore._compare(value, '=', operand)
+        if operator in ('ilike', 'not ilike', 'like', 'not like', '=ilike'):
+            if operand is False:
+                matched = not value
+            else:
+                text = str(value or '')
+                needle = str(operand)
+                if operator == '=ilike':
+                    matched = text.lower() == needle.lower()
+                elif 'ilike' in operator:
+                    matched = needle.lower() in text.lower()
+                else:
+                    matched = needle in text
+            return not matched if operator.startswith('not') else matched
+        if operator in ('in', 'not in'):
+            values = value if isinstance(value, list) else [value]
+            matched = any(v in operand for v in values)
+            return not matched if operator == 'not in' else matched
+        if value in (None, False):
+            return False
+        if operator == '<':
+            return value < operand
+        if operator == '>':
+            return value > operand
+        if operator == '<=':
+            return value <= operand
+        if operator == '>=':
+            return value >= operand
+        raise FakeOdooError(f"Operator không hỗ trợ: {operator}")
+
+    def _match(self, model: str, record: dict, domain: list) -> bool:
+        """Đánh giá domain Polish notation (mặc định nối bằng '&')"""
+        stack = []
+        for token in reversed(domain or []):
+            if token == '&':
+                left, right = stack.pop(), stack.pop()
+                stack.append(left and right)
+            elif token == '|':
+                left, right = stack.pop(), stack.pop()
+                stack.append(left or right)
+            elif token == '!':
+                stack.append(not stack.pop())
+            else:
+                field, operator, operand = token
+                value = self._get_value(model, record, field)
+                stack.append(self._compare(value, operator, operand))
+        return all(stack)
+
+    @staticmethod
+    def _mentions(domain: list, field: str) -> bool:
+        return any(isinstance(t, (list, tuple)) and t[0] == field for t in domain or [])
+
+    def _sort(self, rows: List[dict], order: Optional[str]) -> List[dict]:
+        if not order:
+            return sorted(rows, key=lambda r: r['id'])
+        for part in reversed([p.strip() for p in order.split(',') if p.strip()]):
+            field, _, direction = part.partition(' ')
+            reverse = direction.strip().lower() == 'desc'
+
+            def sort_key(row, field=field):
+                value = row.get(field)
+                empty = value in (None, False)
+                return (empty, 0 if empty else value)
+
+            rows = sorted(rows, key=sort_key, reverse=reverse)
+        return rows
+
+    def _search_records(self, model: str, domain: list, offset: int = 0, limit: int = None,
+                        order: str = None, context: dict = None) -> List[dict]:
+        table = self.records[model]
+        active_test = (context or {}).get('active_test', True) and not self._mentions(domain, 'active')
+        rows = [r for r in table.values()
+                if (not active_test or r.get('active', True) is not False)
+                and self._match(model, r, domain)]
+        rows = self._sort(rows, order)
+        rows = rows[offset or 0:]
+        if limit:
+            rows = rows[:limit]
+        return rows
+
+    # ===== ĐỌC =====
+
+    def _export(self, model: str, record: dict, fields: List[str] = None) -> dict:
+        schema = SCHEMA.get(model, {})
+        names = fields or [f for f in record if f != 'id']
+        row = {'id': record['id']}
+        for name in names:
+            if name == 'id':
+                continue
+            value = record.get(name, False)
+            if name == 'display_name':
+                value = record.get('display_name') or record.get('name', False)
+            elif name in schema.get('many2one', {}):
+                value = [value, self._display_name(schema['many2one'][name], value)] if value else False
+            elif name in schema.get('x2many', {}):
+                value = list(value or [])
+            row[name] = copy.copy(value)
+        return row
+
+    def search(self, model: str, domain: list = None, offset: int = 0, limit: int = None,
+               order: str = None, count: bool = False, context: dict = None):
+        rows = self._search_records(model, domain, offset, limit, order, context)
+        return len(rows) if count else [r['id'] for r in rows]
+
+    def search_count(self, model: str, domain: list = None, context: dict = None) -> int:
+        return len(self._search_records(model, domain, context=context))
+
+    def search_read(self, model: str, domain: list = None, fields: List[str] = None, offset: int = 0,
+                    limit: int = None, order: str = None, context: dict = None) -> List[dict]:
+        rows = self._search_records(model, domain, offset, limit, order, context)
+        return [self._export(model, r, fields) for r in rows]
+
+    def read(self, model: str, ids, fields: List[str] = None, context: dict = None, load: str = None) -> List[dict]:
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        table = self.records[model]
+        missing = [i for i in ids if i not in table]
+        if missing:
+            raise FakeOdooError(f"Record does not exist or has been deleted: {model}{missing}")
+        rows = [self._export(model, table[i], fields) for i in ids]
+        if load == '_classic_write':
+            for row in rows:
+                for name, value in row.items():
+                    if isinstance(value, list) and len(value) == 2 and name in SCHEMA[model]['many2one']:
+                        row[name] = value[0]
+        return rows
+
+    # ===== GHI =====
+
+    def _apply_x2many(self, model: str, record: dict, field: str, commands: list):
+        comodel = SCHEMA[model]['x2many'][field]
+        current = list(record.get(field) or [])
+        inverse = next((f for f, m in SCHEMA[comodel]['many2one'].items() if m == model and f.endswith('_id')), None)
+        for command in commands:
+            if isinstance(command, int):
+                current.append(command)
+                continue
+            code = command[0]
+            if code == 0:
+                vals = dict(command[2])
+                if inverse:
+                    vals[inverse] = record['id']
+                current.append(self.create(comodel, vals))
+            elif code == 1:
+                self.write(comodel, [command[1]], command[2])
+            elif code == 2:
+                self.unlink(comodel, [command[1]])
+                current = [i for i in current if i != command[1]]
+            elif code == 3:
+                current = [i for i in current if i != command[1]]
+            elif code == 4:
+                if command[1] not in current:
+                    current.append(command[1])
+            elif code == 5:
+                current = []
+            elif code == 6:
+                current = list(command[2])
+        record[field] = current
+
+    def create(self, model: str, vals, context: dict = None):
+        if isinstance(vals, list):
+            return [self.create(model, v) for v in vals]
+        record_id = self._next_id[model]
+        self._next_id[model] += 1
+        record = {'id': record_id}
+        self.records[model][record_id] = record
+        self._defaults(model, record)
+        x2many = SCHEMA[model]['x2many']
+        for field, value in vals.items():
+            if field in x2many:
+                record.setdefault(field, [])
+                self._apply_x2many(model, record, field, value or [])
+            else:
+                record[field] = value
+        record['create_date'] = record['write_date'] = self._now()
+        self._after_write(model, record)
+        return record_id
+
+    def write(self, model: str, ids, vals: dict, context: dict = None) -> bool:
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        x2many = SCHEMA[model]['x2many']
+        for record_id in ids:
+            record = self.records[model][record_id]
+            for field, value in vals.items():
+                if field in x2many:
+                    self._apply_x2many(model, record, field, value or [])
+                else:
+                    record[field] = value
+            record['write_date'] = self._now()
+            self._after_write(model, record)
+        return True
+
+    def unlink(self, model: str, ids, context: dict = None) -> bool:
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        for record_id in ids:
+            record = self.records[model].pop(record_id, None)
+            if model == 'sale.order.line' and record and record.get('order_id'):
+                order = self.records['sale.order'].get(record['order_id'])
+                if order:
+                    order['order_line'] = [i for i in order['order_line'] if i != record_id]
+                    self._after_write('sale.order', order)
+        return True
+
+    def _defaults(self, model: str, record: dict):
+        if model == 'sale.order':
+            record.update({
+                'name': f"S{record['id']:05d}", 'state': 'draft', 'invoice_status': 'no',
+                'order_line': [], 'picking_ids': [], 'invoice_ids': [],
+                'amount_untaxed': 0.0, 'amount_total': 0.0, 'note': False,
+            })
+        elif model == 'sale.order.line':
+            record.update({'product_uom_qty': 1.0, 'price_unit': 0.0})
+        elif model == 'res.partner':
+            record.update({'phone': False, 'email': False, 'active': True,
+                           'property_product_pricelist': False, 'customer_rank': 0})
+        elif model == 'crm.lead':
+            record.update({'type': 'lead', 'active': True})
+
+    def _after_write(self, model: str, record: dict):
+        """Tính lại các field computed đơn giản"""
+        if model == 'sale.order.line':
+            order = self.records['sale.order'].get(record.get('order_id'))
+            if order is not None:
+                self._compute_amounts(order)
+        elif model == 'sale.order':
+            self._compute_amounts(record)
+        elif model == 'res.partner':
+            record['display_name'] = record.get('name', False)
+
+    def _compute_amounts(self, order: dict):
+        untaxed = total = 0.0
+        for line_id in order.get('order_line') or []:
+            line = self.records['sale.order.line'].get(line_id)
+            if not line:
+                continue
+            subtotal = line.get('price_unit', 0.0) * line.get('product_uom_qty', 0.0)
+            product = self.records['product.product'].get(line.get('product_id'))
+            rate = 0.0
+            if product and product.get('taxes_id'):
+                tax = self.records['account.tax'].get(product['taxes_id'][0])
+                rate = tax.get('amount', 0.0) if tax else 0.0
+            untaxed += subtotal
+            total += subtotal * (1 + rate / 100)
+        order['amount_untaxed'] = untaxed
+        order['amount_total'] = total
+
+    # ===== ACTION =====
+
+    def action_confirm(self, model: str, ids, context: dict = None) -> bool:
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        for record_id in ids:
+            order = self.records[model][record_id]
+            if order['state'] not in ('draft', 'sent'):
+                raise FakeOdooError(f"Đơn {order['name']} không ở trạng thái nháp")
+            order['state'] = 'sale'
+            order['invoice_status'] = 'to invoice'
+            picking_id = self.create('stock.picking', {
+                'name': f"WH/OUT/{record_id:05d}", 'sale_id': record_id, 'state': 'assigned'
+            })
+            order['picking_ids'] = order.get('picking_ids', []) + [picking_id]
+            order['write_date'] = self._now()
+        return True
+
+    def action_cancel(self, model: str, ids, context: dict = None) -> bool:
+        ids = [ids] if isinstance(ids, int) else list(ids)
+        for record_id in ids:
+            order = self.records[model][record_id]
+            for picking_id in order.get('picking_ids') or []:
+                picking = self.records['stock.picking'].get(picking_id)
+                if picking and picking['state'] != 'done':
+                    picking['state'] = 'cancel'
+            order['state'] = 'cancel'
+            order['write_date'] = self._now()
+        return True
+
+    # ===== DISPATCH (execute_kw) =====
+
+    def execute_kw(self, model: str, method: str, args: list = None, kwargs: dict = None) -> Any:
+        """Điểm vào chung giống object.execute_kw của Odoo"""
+        if model not in self.records:
+            raise FakeOdooError(f"Model không tồn tại: {model}")
+        handler = getattr(self, method, None)
+        if method.startswith('_') or handler is None or method in ('execute_kw', 'login'):
+            raise FakeOdooError(f"Method '{method}' không tồn tại trên model {model}")
+        args = list(args or [])
+        kwargs = dict(kwargs or {})
+        return copy.deepcopy(handler(model, *args, **kwargs))
+
+    def login(self, db: str, username: str, password: str):
+        if db == self.db and username == self.username and password == self.password:
+            return self.uid
+        return False
+
+
+def build_demo_dataset(store: FakeOdooStore = None, n_products: int = 50, n_partners: int = 20,
+                       n_orders: int = 10, seed: int = 42) -> FakeOdooStore:
+    """Sinh dữ liệu mẫu: khách hàng, sản phẩm, thuế, bảng giá, đơn hàng"""
+    store = store or FakeOdooStore()
+    rng = random.Random(seed)
+
+    currency_id = store.create('res.currency', {'name': 'VND'})
+    vat10 = store.create('account.tax', {'name': 'VAT 10%', 'amount': 10.0})
+    vat8 = store.create('account.tax', {'name': 'VAT 8%', 'amount': 8.0})
+
+    brands = ['iPhone', 'Samsung Galaxy', 'Xiaomi', 'Oppo', 'AirPods', 'MacBook', 'iPad', 'Điện thoại Nokia']
+    product_ids = []
+    for i in range(n_products):
+        brand = brands[i % len(brands)]
+        name = f"{brand} {10 + i // len(brands)}" + (f" Pro" if i % 3 == 0 else "")
+        list_price = float(rng.randrange(2, 60) * 500_000)
+        tax_ids = [vat10] if i % 4 else ([vat8] if i % 8 else [])
+        tmpl_id = store.create('product.template', {'name': name, 'list_price': list_price, 'taxes_id': tax_ids})
+        product_ids.append(store.create('product.product', {
+            'name': name, 'display_name': name, 'product_tmpl_id': tmpl_id,
+            'list_price': list_price, 'standard_price': round(list_price * 0.7),
+            'qty_available': float(rng.choice([0, 3, 10, 25, 100])),
+            'taxes_id': tax_ids, 'sale_ok': True, 'active': True,
+        }))
+
+    default_pl = store.create('product.pricelist', {'name': 'Public Pricelist', 'active': True, 'currency_id': currency_id})
+    vip_pl = store.create('product.pricelist', {'name': 'VIP', 'active': True, 'currency_id': currency_id})
+    store.create('product.pricelist.item', {
+        'pricelist_id': vip_pl, 'applied_on': '3_global', 'compute_price': 'percentage',
+        'percent_price': 5.0, 'min_quantity': 0, 'product_id': False, 'product_tmpl_id': False,
+        'fixed_price': 0.0, 'price_discount': 0.0, 'price_surcharge': 0.0, 'base': 'list_price',
+    })
+    store.create('product.pricelist.item', {
+        'pricelist_id': vip_pl, 'applied_on': '3_global', 'compute_price': 'percentage',
+        'percent_price': 10.0, 'min_quantity': 10, 'product_id': False, 'product_tmpl_id': False,
+        'fixed_price': 0.0, 'price_discount': 0.0, 'price_surcharge': 0.0, 'base': 'list_price',
+    })
+    if product_ids:
+        first = store.records['product.product'][product_ids[0]]
+        store.create('product.pricelist.item', {
+            'pricelist_id': vip_pl, 'applied_on': '0_product_variant', 'compute_price': 'fixed',
+            'fixed_price': first['list_price'] * 0.8, 'min_quantity': 0,
+            'product_id': product_ids[0], 'product_tmpl_id': first['product_tmpl_id'],
+            'percent_price': 0.0, 'price_discount': 0.0, 'price_surcharge': 0.0, 'base': 'list_price',
+        })
+
+    first_names = ['Nguyễn Văn', 'Trần Thị', 'Lê Hoàng', 'Phạm Minh', 'Võ Thanh']
+    last_names = ['An', 'Bình', 'Cường', 'Dũng', 'Giang', 'Hà', 'Khoa', 'Lan']
+    partner_ids = []
+    for i in range(n_partners):
+        name = f"{first_names[i % len(first_names)]} {last_names[(i // len(first_names)) % len(last_names)]}"
+        if i >= len(first_names) * len(last_names):
+            name += f" {i}"
+        partner_ids.append(store.create('res.partner', {
+            'name': name, 'phone': f"09{i:08d}", 'email': f"customer{i}@example.com",
+            'customer_rank': 1, 'property_product_pricelist': vip_pl if i % 5 == 0 else default_pl,
+        }))
+
+    for i in range(n_orders):
+        lines = [(0, 0, {
+            'product_id': rng.choice(product_ids),
+            'product_uom_qty': float(rng.randint(1, 5)),
+            'price_unit': 1_000_000.0,
+        }) for _ in range(rng.randint(1, 3))] if product_ids else []
+        order_id = store.create('sale.order', {'partner_id': rng.choice(partner_ids), 'order_line': lines})
+        if i % 3 == 1:
+            store.action_confirm('sale.order', [order_id])
+        elif i % 3 == 2:
+            store.action_confirm('sale.order', [order_id])
+            order = store.records['sale.order'][order_id]
+            for picking_id in order['picking_ids']:
+                store.records['stock.picking'][picking_id]['state'] = 'done'
+    return store
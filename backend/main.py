@@ -1,11 +1,36 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.config import settings
 from backend.routers import chat
+from backend.services.odoo_service import odoo_service
+from backend.services.catalog_cache import product_catalog
+from backend.services.fast_intent import fast_intent_parser
+from backend.services.history_manager import history_manager
+from backend.services.intent_cache import intent_cache
+from backend.services.session_store import session_store
+from backend.services.result_cache import result_cache
+from backend.services.llm_service import llm_service
+from backend.services.startup import startup_warmup
+from backend.utils import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Đăng nhập Odoo + nạp cache chạy nền, nhận traffic sau tối đa STARTUP_BUDGET giây"""
+    settings.validate()
+    await startup_warmup.start()
+    yield
+    await startup_warmup.stop()
+    await llm_service.close()
+
 
 # Khởi tạo FastAPI app
-app = FastAPI(title="ERP Chatbot API", version="1.0.0")
+app = FastAPI(title="ERP Chatbot API", version="1.0.0", lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -14,8 +39,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Odoo-RPC"],
+)
+
+HTTP_SECONDS = metrics.registry.histogram('http_request_duration_seconds', 'Thời gian xử lý request HTTP', ['path', 'status'])
+HTTP_RPC = metrics.registry.histogram(
+    'http_request_odoo_rpc', 'Số RPC tới Odoo mỗi request HTTP', ['path'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
 )
 
+
+@app.middleware("http")
+async def rpc_metrics(request: Request, call_next):
+    """Gắn các RPC Odoo cho request, ghi metrics; header X-Odoo-RPC khi bật RPC_DEBUG_HEADER"""
+    start = time.perf_counter()
+    with odoo_service.rpc_counter.track() as calls:
+        response = await call_next(request)
+    # Response stream: chỉ tính được RPC trước khi gửi header
+    route = getattr(request.scope.get('route'), 'path', 'unmatched')
+    HTTP_SECONDS.observe(time.perf_counter() - start, path=route, status=response.status_code)
+    HTTP_RPC.observe(len(calls), path=route)
+    if calls:
+        print(f"DEBUG - {request.method} {route}: {odoo_service.rpc_counter.summarize(calls)}")
+    if settings.RPC_DEBUG_HEADER:
+        response.headers['X-Odoo-RPC'] = odoo_service.rpc_counter.summarize(calls)
+    return response
+
 # Include routers
 app.include_router(chat.router, tags=["Chat"])
 
@@ -24,3 +73,60 @@ app.include_router(chat.router, tags=["Chat"])
 def home():
     return {"message": "Server Chatbot đang chạy ngon lành!", "version": "1.0.0"}
 
+# Liveness: process còn chạy
+@app.get("/health/live")
+def health_live():
+    return {"status": "alive"}
+
+# Readiness: đã đăng nhập Odoo (503 khi chưa) + thời gian từng bước warmup
+@app.get("/health/ready")
+def health_ready():
+    status = startup_warmup.status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+# Thống kê RPC tới Odoo: tổng số, số RPC chạy song song (hiện tại/cao nhất)
+@app.get("/odoo/rpc")
+def odoo_rpc_stats():
+    return odoo_service.rpc_counter.stats()
+
+# Thống kê catalog sản phẩm trong bộ nhớ
+@app.get("/catalog/stats")
+def catalog_stats():
+    return product_catalog.stats()
+
+
+# Result cache của action chỉ đọc: hit ratio theo action, bộ nhớ, số entry bị loại
+@app.get("/result-cache/stats")
+def result_cache_stats():
+    return result_cache.stats()
+
+
+# Tỉ lệ lệnh đi fast-path (không gọi LLM)
+@app.get("/intent/stats")
+def intent_stats():
+    return fast_intent_parser.stats()
+
+# Cache intent LLM: hit rate, thời gian gọi LLM tiết kiệm được
+@app.get("/intent/cache/stats")
+def intent_cache_stats():
+    return intent_cache.stats()
+
+# Token ước lượng mỗi lượt + lượng token tiết kiệm nhờ rút gọn lịch sử
+@app.get("/history/stats")
+def history_stats():
+    return history_manager.stats()
+
+# Thống kê phiên chat phía server
+@app.get("/sessions/stats")
+def session_stats():
+    return session_store.stats()
+
+# Độ trễ LLM theo model, retry, hedged request
+@app.get("/llm/stats")
+def llm_stats():
+    return llm_service.stats()
+
+# Prometheus metrics (RPC Odoo, LLM, action, HTTP)
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
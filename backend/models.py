@@ -4,12 +4,16 @@ from typing import List, Optional
 class ChatRequest(BaseModel):
     """Request model cho chat endpoint"""
     message: str
-    history: List[dict] = []
+    session_id: Optional[str] = None
+    history: List[dict] = []  # Chỉ dùng khi không có session (client cũ)
     sales_rep_name: str = "Admin"
 
 class ChatResponse(BaseModel):
     """Response model cho chat endpoint"""
     reply: str
+    session_id: Optional[str] = None
+    usage: Optional[dict] = None
+    timings: Optional[dict] = None  # Thời gian từng action (ms) + tổng
 
 class CustomerInfo(BaseModel):
     """Model thông tin khách hàng"""
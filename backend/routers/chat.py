@@ -1,6 +1,11 @@
 from fastapi import APIRouter
-from openai import OpenAI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
 import json
+import re
+import time
+from contextlib import nullcontext
 
 from backend.models import ChatRequest, ChatResponse
 from backend.config import settings
@@ -8,23 +13,20 @@ from backend.services.product_service import product_service
 from backend.services.customer_service import customer_service
 from backend.services.order_service import order_service
 from backend.services.crm_service import crm_service
+from backend.services.fast_intent import fast_intent_parser
+from backend.services.history_manager import history_manager
+from backend.services.intent_cache import intent_cache, prompt_version
+from backend.services.session_store import session_store
+from backend.services.llm_service import llm_service
+from backend.services.odoo_service import odoo_service
+from backend.utils.circuit_breaker import CircuitOpenError, stale_note, stale_reads
+from backend.utils.metrics import registry
+from backend.utils.progress import progress_reporter
 
 router = APIRouter()
 
-# Khởi tạo OpenAI client
-client = OpenAI(
-    base_url=settings.OPENAI_BASE_URL,
-    api_key=settings.OPENAI_API_KEY
-)
-
-@router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    """Endpoint xử lý chat"""
-    user_msg = request.message
-    print(f"User: {user_msg}")
-
-    # System instruction
-    system_instruction = """
+# System instruction
+SYSTEM_INSTRUCTION = """
     Bạn là trợ lý bán hàng AI thông minh cho hệ thống ERP. Nhiệm vụ:
     1. Phân tích yêu cầu của nhân viên bán hàng
     2. Đề xuất giá phù hợp với từng khách hàng
@@ -37,10 +39,11 @@ async def chat_endpoint(request: ChatRequest):
     - Tạo cơ hội CRM (VD: "Tạo opportunity cho khách A", "Khách B quan tâm 3 iPhone", "Lead mới: C muốn mua Samsung"):
       -> {"action": "create_opportunity", "customer": "tên khách", "phone": "SĐT (optional)", "email": "email (optional)","qty": 1 (default), "product": "sản phẩm quan tâm (optional)", "note": "ghi chú (optional)"}
     
-    - Liệt kê sản phẩm (VD: "Có điện thoại nào?", "Show products", "Liệt kê iPhone", "Tìm Samsung"):
-      -> {"action": "list_products", "keyword": "từ khóa tìm kiếm (optional)"}
+    - Liệt kê sản phẩm (VD: "Có điện thoại nào?", "Show products", "Liệt kê iPhone", "Tìm Samsung", "Sản phẩm còn hàng dưới 10 triệu"):
+      -> {"action": "list_products", "keyword": "từ khóa tìm kiếm (optional)", "min_price": giá tối thiểu (optional), "max_price": giá tối đa (optional), "in_stock": true nếu chỉ lấy hàng còn trong kho (optional)}
       Nếu có keyword -> tìm các sản phẩm chứa từ khóa đó
       Nếu không có keyword -> liệt kê top sản phẩm đang bán
+      min_price/max_price: số VNĐ của giá sau thuế (VD "dưới 10 triệu" -> "max_price": 10000000)
       
     - Kiểm tra giá/suggest pricing (VD: "Giá iPhone cho khách A?", "Giá 15 chiếc iPhone?"):
       -> {"action": "suggest_price", "product": "tên sản phẩm", "customer": "tên khách (optional)", "qty": số_lượng (mặc định 1), "phone": "SĐT (optional)", "email": "email (optional)"}
@@ -70,39 +73,404 @@ async def chat_endpoint(request: ChatRequest):
     - Chat thông thường:
       -> {"action": "chat", "response": "câu trả lời"}
     
+    - Nhiều yêu cầu trong 1 tin nhắn (VD: "Báo giá iPhone cho khách A và xem đơn của khách B"):
+      -> {"actions": [{"action": "suggest_price", ...}, {"action": "check_orders", ...}]}
+      Mỗi phần tử đúng định dạng của action đơn lẻ ở trên, giữ đúng thứ tự người dùng yêu cầu
+    
     LƯU Ý: 
     - qty phải là số nguyên
     - Ưu tiên phân tích khách hàng trước khi suggest giá
     - Luôn thân thiện và chuyên nghiệp
     - Luôn trả về đúng định dạng JSON object
     """
+
+
+# Sửa SYSTEM_INSTRUCTION -> phiên bản mới -> intent đã cache theo prompt cũ không còn dùng
+PROMPT_VERSION = prompt_version(SYSTEM_INSTRUCTION)
+
+
+def build_messages(request: ChatRequest, history: list = None) -> tuple:
+    """Xây dựng messages gửi cho AI (system + lịch sử đã rút gọn + tin nhắn mới) và ước lượng token"""
+    return history_manager.build(SYSTEM_INSTRUCTION, history if history is not None else request.history, request.message)
+
+
+def session_history(session) -> list:
+    """Lịch sử của phiên; phiên mới thì dùng history client gửi lên (client cũ)"""
+    return session.history() or None
+
+
+async def parse_intent(messages_for_ai: list, usage: dict = None) -> dict:
+    """Gọi AI phân tích intent, trả về JSON action (ghi số token thực tế vào usage nếu có)"""
+    return await llm_service.complete_json(messages_for_ai, usage)
+
+
+def intent_cache_key(request: ChatRequest, session) -> str:
+    """
+    Key cache intent: ngữ cảnh là các thực thể phiên đã nhắc (khách, sản phẩm, mã đơn) + câu trả lời
+    gần nhất của bot (câu ngắn như "Có"/"ok" trả lời cho câu hỏi đó); client cũ tự gửi history
+    -> dùng 2 tin nhắn gần nhất
+    """
+    if session.turns:
+        last_bot = next((t.get('content') for t in reversed(session.turns) if t.get('role') == 'bot'), None)
+        context = {'entities': session.entities, 'last_bot': last_bot}
+    else:
+        context = [m.get('content') for m in (request.history or [])[-2:] if isinstance(m, dict)]
+    return intent_cache.key(request.message, context, llm_service.model, PROMPT_VERSION)
+
+
+def cacheable_intent(data: dict) -> bool:
+    """Chỉ cache intent chỉ đọc: lệnh ghi (xác nhận/hủy/tạo đơn) luôn hỏi lại LLM"""
+    return isinstance(data, dict) and all(a.get('action') in READ_ACTIONS for a in normalize_actions(data))
+
+
+def cached_intent_usage() -> dict:
+    return {'fast_path': False, 'intent_cache': True, 'prompt_tokens_est': 0}
+
+
+def try_fast_intent(request: ChatRequest):
+    """Nhận diện lệnh có cấu trúc rõ ràng không qua LLM -> (intent, confidence) hoặc None"""
+    if not settings.FAST_INTENT_ENABLED:
+        return None
+    try:
+        result = fast_intent_parser.parse(request.message)
+    except Exception as e:
+        print(f"DEBUG - Fast intent error: {e}")
+        return None
+    if result:
+        print(f"Fast Intent ({result[1]:.2f}): {result[0]}")
+    return result
+
+
+def ai_error_reply(error: Exception) -> str:
+    """Câu trả lời khi không gọi được LLM (breaker mở -> gợi ý lệnh có cấu trúc vẫn chạy không cần AI)"""
+    if isinstance(error, CircuitOpenError):
+        return (f"Trợ lý AI đang gián đoạn ({error}). Các lệnh ngắn vẫn dùng được, "
+                "VD: 'Liệt kê sản phẩm', 'Xác nhận báo giá SO001', 'Hủy đơn SO005'.")
+    return "Hệ thống đang bận, vui lòng thử lại sau."
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest):
+    """Endpoint xử lý chat"""
+    print(f"User: {request.message}")
+    session = await run_in_threadpool(session_store.get_or_create, request.session_id)
+
+    # Gọi AI (bỏ qua nếu fast-path đã nhận diện được lệnh)
+    usage = {'fast_path': False}
+    try:
+        fast = await run_in_threadpool(try_fast_intent, request)
+        cache_key = intent_cache_key(request, session)
+        cached = None if fast else await run_in_threadpool(intent_cache.get, cache_key)
+        if fast:
+            data = fast[0]
+            usage = {'fast_path': True, 'prompt_tokens_est': 0}
+        elif cached is not None:
+            data = cached
+            usage = cached_intent_usage()
+            print(f"AI Intent (cache): {data}")
+        else:
+            messages_for_ai, estimate = build_messages(request, session_history(session))
+            usage.update(estimate)
+            start = time.perf_counter()
+            data = await parse_intent(messages_for_ai, usage)
+            if cacheable_intent(data):
+                await run_in_threadpool(intent_cache.put, cache_key, data, time.perf_counter() - start)
+            print(f"AI Intent: {data}")
+
+    except Exception as e:
+        print(f"Lỗi AI: {e}")
+        return ChatResponse(reply=ai_error_reply(e), session_id=session.session_id, usage=usage)
+
+    # Điều hướng action (service dùng odoorpc đồng bộ -> chạy trong threadpool để không chặn event loop)
+    bot_reply, timings = await execute_actions(normalize_actions(data), request)
+    await run_in_threadpool(session_store.record_turn, session, request.message, bot_reply, data, usage)
+    
+    return ChatResponse(reply=bot_reply, session_id=session.session_id, usage=usage, timings=timings)
+
+
+# ===== NHIỀU ACTION TRONG 1 TIN NHẮN =====
+
+# Action chỉ đọc -> chạy song song được; các action còn lại ghi dữ liệu -> chạy tuần tự
+READ_ACTIONS = {'list_products', 'suggest_price', 'get_customer_pricelist', 'check_orders', 'chat'}
+
+ACTION_SECONDS = registry.histogram('chat_action_duration_seconds', 'Thời gian xử lý mỗi action', ['action', 'ok'])
+
+
+def normalize_actions(data: dict) -> list:
+    """Intent {"action": ...} hoặc {"actions": [...]} -> danh sách action"""
+    actions = data.get('actions')
+    if isinstance(actions, list):
+        actions = [a for a in actions if isinstance(a, dict) and a.get('action')]
+        return actions or [{"action": "chat"}]
+    return [data]
+
+
+def parse_price(value):
+    """Giá trong intent (số hoặc chuỗi số, VD 10000000 / "10000000") -> float, không hợp lệ -> None"""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+def plan_batches(actions: list) -> list:
+    """
+    Gom các action đọc liền nhau thành 1 batch chạy song song;
+    mỗi action ghi là 1 batch riêng (rào chắn) để giữ đúng thứ tự
+    """
+    batches = []
+    for index, action in enumerate(actions):
+        if action.get('action') in READ_ACTIONS and batches and batches[-1]['parallel']:
+            batches[-1]['items'].append((index, action))
+        else:
+            batches.append({'parallel': action.get('action') in READ_ACTIONS, 'items': [(index, action)]})
+    return batches
+
+
+async def execute_actions(actions: list, request: ChatRequest, reporter=None) -> tuple:
+    """
+    Thực thi danh sách action, gộp kết quả thành 1 câu trả lời
+
+    Returns:
+        Tuple[str, dict]: (câu trả lời, thời gian từng action + tổng)
+    """
+    replies = [None] * len(actions)
+    timings = [None] * len(actions)
     
-    # Xây dựng messages
-    messages_for_ai = [{"role": "system", "content": system_instruction}]
+    def run_one(index: int, action: dict):
+        start = time.perf_counter()
+        ok = True
+        with progress_reporter(reporter) if reporter else nullcontext(), \
+                odoo_service.rpc_counter.attribute(action.get('action')), stale_reads() as stale:
+            try:
+                if action.get('action') not in READ_ACTIONS and odoo_service.breaker.is_open:
+                    # Odoo đang sập: từ chối ghi ngay thay vì chờ timeout
+                    raise CircuitOpenError('odoo', odoo_service.breaker.retry_after())
+                replies[index] = dispatch_action(action, request)
+            except CircuitOpenError as e:
+                replies[index] = f"⚠️ Chưa thực hiện được: {e}"
+                ok = False
+            except Exception as e:
+                print(f"Lỗi xử lý action {action.get('action')}: {e}")
+                replies[index] = f"❌ Lỗi hệ thống: {str(e)}"
+                ok = False
+        if stale and replies[index]:
+            # Đọc từ cache vì Odoo không phản hồi -> báo người dùng dữ liệu có thể cũ
+            replies[index] += f"\n\n{stale_note(stale)}"
+        elapsed = time.perf_counter() - start
+        ACTION_SECONDS.observe(elapsed, action=action.get('action'), ok=str(ok).lower())
+        timings[index] = {
+            'action': action.get('action'),
+            'ms': round(elapsed * 1000, 1),
+            'ok': ok,
+        }
+        if reporter and len(actions) > 1:
+            reporter('action_done', {
+                'stage': 'action_done', 'message': f"✔️ Xong {action.get('action')} ({timings[index]['ms']} ms)",
+                **timings[index]
+            })
     
-    for msg in request.history:
-        role = "assistant" if msg['role'] == "bot" else "user"
-        messages_for_ai.append({"role": role, "content": msg['content']})
+    wall_start = time.perf_counter()
+    for batch in plan_batches(actions):
+        if batch['parallel'] and len(batch['items']) > 1:
+            await asyncio.gather(*(run_in_threadpool(run_one, i, a) for i, a in batch['items']))
+        else:
+            for i, a in batch['items']:
+                await run_in_threadpool(run_one, i, a)
     
-    messages_for_ai.append({"role": "user", "content": user_msg})
+    wall_ms = round((time.perf_counter() - wall_start) * 1000, 1)
+    summary = {
+        'actions': timings,
+        'wall_ms': wall_ms,
+        'sequential_ms': round(sum(t['ms'] for t in timings), 1),
+    }
+    if len(actions) > 1:
+        print(f"DEBUG - {len(actions)} actions: {wall_ms} ms (tuần tự sẽ là {summary['sequential_ms']} ms)")
+    return "\n\n".join(r for r in replies if r), summary
 
-    # Gọi AI
-    try:
-        gpt_response = client.chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=messages_for_ai,
-            response_format={"type": "json_object"}
-        )
+
+# ===== STREAMING (Server-Sent Events) =====
+
+def sse_event(event: str, data: dict) -> str:
+    """Đóng gói 1 event SSE"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ChatReplyExtractor:
+    """
+    Trích field "response" từ JSON đang được stream về, chỉ khi action == "chat".
+    Cho phép đẩy từng token câu trả lời tới client trước khi JSON hoàn chỉnh.
+    """
+    
+    ACTION_CHAT = re.compile(r'"action"\s*:\s*"chat"')
+    RESPONSE_START = re.compile(r'"response"\s*:\s*"')
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f'}
+    
+    def __init__(self):
+        self.buffer = ""
+        self._pos = None     # vị trí đã giải mã tới trong giá trị "response"
+        self._done = False
+        self._is_chat = False
+    
+    def feed(self, chunk: str) -> str:
+        """Nhận thêm 1 đoạn JSON, trả về phần text câu trả lời mới giải mã được"""
+        self.buffer += chunk
+        if not self._is_chat:
+            if not self.ACTION_CHAT.search(self.buffer):
+                return ""
+            self._is_chat = True
+        
+        if self._pos is None:
+            match = self.RESPONSE_START.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
         
-        ai_content = gpt_response.choices[0].message.content
-        data = json.loads(ai_content)
-        print(f"AI Intent: {data}")
+        out = []
+        buffer = self.buffer
+        while not self._done and self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if ch == '"':
+                self._done = True
+            elif ch != '\\':
+                out.append(ch)
+                self._pos += 1
+            elif self._pos + 1 >= len(buffer):
+                break   # escape chưa về đủ, chờ chunk sau
+            elif buffer[self._pos + 1] == 'u':
+                if self._pos + 6 > len(buffer):
+                    break
+                out.append(chr(int(buffer[self._pos + 2:self._pos + 6], 16)))
+                self._pos += 6
+            else:
+                code = buffer[self._pos + 1]
+                out.append(self.ESCAPES.get(code, code))
+                self._pos += 2
+        return "".join(out)
+
 
+async def stream_intent(messages_for_ai: list, on_chunk, usage: dict = None) -> dict:
+    """Gọi AI ở chế độ stream, đẩy từng chunk cho on_chunk; lỗi trước khi có chunk nào thì gọi thường"""
+    received = []
+    
+    def forward(chunk: str):
+        received.append(chunk)
+        on_chunk(chunk)
+    
+    try:
+        return await llm_service.stream_json(messages_for_ai, forward, usage)
     except Exception as e:
-        print(f"Lỗi AI: {e}")
-        return ChatResponse(reply="Hệ thống đang bận, vui lòng thử lại sau.")
+        if received:
+            raise
+        print(f"DEBUG - Streaming not available ({e}), fallback to normal completion")
+        data = await parse_intent(messages_for_ai, usage)
+        on_chunk(json.dumps(data, ensure_ascii=False))
+        return data
+
 
-    # Điều hướng action
+async def chat_event_stream(request: ChatRequest):
+    """Sinh chuỗi event: token (action chat) -> stage (tiến trình) -> reply"""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: str, data: dict):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+    
+    async def drain_until(task: asyncio.Task):
+        """Đẩy event ra client cho tới khi task xong"""
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            while not queue.empty():
+                yield queue.get_nowait()
+            return
+    
+    print(f"User (stream): {request.message}")
+    session = await run_in_threadpool(session_store.get_or_create, request.session_id)
+    
+    # 1. PHÂN TÍCH INTENT: fast-path trước, không chắc thì hỏi AI (stream token nếu là chat thường)
+    fast = await run_in_threadpool(try_fast_intent, request)
+    cache_key = intent_cache_key(request, session)
+    cached = None if fast else await run_in_threadpool(intent_cache.get, cache_key)
+    if fast:
+        data, confidence = fast
+        usage = {'fast_path': True, 'prompt_tokens_est': 0}
+    elif cached is not None:
+        data, confidence = cached, None
+        usage = cached_intent_usage()
+        print(f"AI Intent (cache): {data}")
+        if data.get('action') == 'chat' and data.get('response'):
+            yield sse_event('token', {'text': data['response']})
+    else:
+        confidence = None
+        messages_for_ai, usage = build_messages(request, session_history(session))
+        usage['fast_path'] = False
+        extractor = ChatReplyExtractor()
+        
+        def on_chunk(chunk: str):
+            text = extractor.feed(chunk)
+            if text:
+                emit('token', {'text': text})
+        
+        start = time.perf_counter()
+        intent_task = asyncio.ensure_future(stream_intent(messages_for_ai, on_chunk, usage))
+        async for event, data in drain_until(intent_task):
+            yield sse_event(event, data)
+        
+        try:
+            data = intent_task.result()
+            if cacheable_intent(data):
+                await run_in_threadpool(intent_cache.put, cache_key, data, time.perf_counter() - start)
+            print(f"AI Intent: {data}")
+        except Exception as e:
+            print(f"Lỗi AI: {e}")
+            yield sse_event('reply', {
+                'reply': ai_error_reply(e), 'session_id': session.session_id, 'usage': usage
+            })
+            return
+    
+    actions = normalize_actions(data)
+    yield sse_event('stage', {
+        'stage': 'intent_parsed', 'message': "🧠 Đã phân tích yêu cầu",
+        'action': data.get('action'), 'actions': [a.get('action') for a in actions],
+        'fast_path': fast is not None, 'intent_cache': cached is not None, 'confidence': confidence
+    })
+    
+    # 2. THỰC THI ACTION (service báo tiến trình qua progress_reporter)
+    action_task = asyncio.ensure_future(
+        execute_actions(actions, request, lambda stage, payload: emit('stage', payload))
+    )
+    async for event, payload in drain_until(action_task):
+        yield sse_event(event, payload)
+    
+    try:
+        bot_reply, timings = action_task.result()
+    except Exception as e:
+        print(f"Lỗi xử lý action: {e}")
+        bot_reply, timings = f"❌ Lỗi hệ thống: {str(e)}", None
+    
+    await run_in_threadpool(session_store.record_turn, session, request.message, bot_reply, data, usage)
+    yield sse_event('reply', {'reply': bot_reply, 'session_id': session.session_id, 'usage': usage, 'timings': timings})
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Endpoint chat dạng Server-Sent Events: báo tiến trình từng bước"""
+    return StreamingResponse(
+        chat_event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def dispatch_action(data: dict, request: ChatRequest) -> str:
+    """Thực thi action đã phân tích từ AI, trả về câu trả lời cho người dùng"""
     bot_reply = ""
     
     if data['action'] == 'create_opportunity':
@@ -137,42 +505,39 @@ async def chat_endpoint(request: ChatRequest):
     elif data['action'] == 'list_products':
         # Liệt kê sản phẩm
         keyword = data.get('keyword')
+        min_price = parse_price(data.get('min_price'))
+        max_price = parse_price(data.get('max_price'))
+        in_stock = data.get('in_stock') is True
+        
+        if min_price is not None or max_price is not None or in_stock:
+            # Lọc theo giá sau thuế / tồn kho
+            from backend.utils.formatter import format_currency
+            conditions = [f"từ khóa '{keyword}'"] if keyword else []
+            if in_stock:
+                conditions.append("còn hàng")
+            if min_price is not None:
+                conditions.append(f"từ {format_currency(min_price)} VNĐ")
+            if max_price is not None:
+                conditions.append(f"tới {format_currency(max_price)} VNĐ")
+            
+            products = product_service.filter_products(keyword, min_price, max_price, in_stock, limit=20)
+            if products:
+                info_list = product_service.format_product_lines(products)
+                bot_reply = f"Tìm thấy {len(products)} sản phẩm ({', '.join(conditions)}):\n" + "\n".join(info_list)
+            else:
+                bot_reply = f"Không tìm thấy sản phẩm nào ({', '.join(conditions)})."
         
-        if keyword:
+        elif keyword:
             products = product_service.search_products(keyword, limit=20)
             if products:
-                from backend.utils.formatter import format_currency
-                info_list = []
-                for p in products:
-                    Product = product_service.Product
-                    product_obj = Product.browse(p['id'])
-                    tax_rate = 0
-                    if product_obj.taxes_id:
-                        tax = product_obj.taxes_id[0]
-                        tax_rate = tax.amount if hasattr(tax, 'amount') else 0
-                    
-                    price_with_tax = p['list_price'] * (1 + tax_rate / 100)
-                    price_display = format_currency(price_with_tax)
-                    info_list.append(f"- {p['name']} - Giá: {price_display} VNĐ (Kho: {p['qty_available']})")
+                info_list = product_service.format_product_lines(products)
                 bot_reply = f"Tìm thấy {len(products)} sản phẩm với từ khóa '{keyword}':\n" + "\n".join(info_list)
             else:
                 bot_reply = f"Không tìm thấy sản phẩm nào với từ khóa '{keyword}'."
         else:
             products = product_service.get_all_products(limit=10)
             if products:
-                from backend.utils.formatter import format_currency
-                info_list = []
-                for p in products:
-                    Product = product_service.Product
-                    product_obj = Product.browse(p['id'])
-                    tax_rate = 0
-                    if product_obj.taxes_id:
-                        tax = product_obj.taxes_id[0]
-                        tax_rate = tax.amount if hasattr(tax, 'amount') else 0
-                    
-                    price_with_tax = p['list_price'] * (1 + tax_rate / 100)
-                    price_display = format_currency(price_with_tax)
-                    info_list.append(f"- {p['name']} - Giá: {price_display} VNĐ (Kho: {p['qty_available']})")
+                info_list = product_service.format_product_lines(products)
                 bot_reply = "Danh sách sản phẩm đang có:\n" + "\n".join(info_list)
             else:
                 bot_reply = "Hiện tại không có sản phẩm nào."
@@ -263,4 +628,4 @@ async def chat_endpoint(request: ChatRequest):
     else:  # action == 'chat'
         bot_reply = data.get('response', "Em chưa hiểu ý anh chị lắm.")
     
-    return ChatResponse(reply=bot_reply)
\ No newline at end of file
+    return bot_reply
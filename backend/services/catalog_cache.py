@@ -0,0 +1,301 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.config import settings
+from backend.services.catalog_store import ProductColumns
+from backend.services.odoo_service import odoo_service
+from backend.services.product_index import ProductNameIndex
+from backend.services.result_cache import result_cache
+from backend.utils.circuit_breaker import note_stale
+
+# Field mirror từ product.product
+CATALOG_FIELDS = ['name', 'list_price', 'standard_price', 'qty_available',
+                  'taxes_id', 'product_tmpl_id', 'sale_ok', 'active', 'write_date']
+
+
+def after_watermark(rows: List[dict], last_write: Optional[str], seen_ids: Set[int]) -> List[dict]:
+    """Bỏ các dòng đã áp dụng: domain write_date >= watermark luôn trả lại các dòng có write_date = watermark"""
+    return [r for r in rows if not (r.get('write_date') == last_write and r['id'] in seen_ids)]
+
+
+def advance_watermark(rows: List[dict], last_write: Optional[str],
+                      seen_ids: Set[int]) -> Tuple[Optional[str], Set[int]]:
+    """Watermark mới: write_date lớn nhất + ID các dòng có đúng write_date đó"""
+    for row in rows:
+        write_date = row.get('write_date')
+        if not write_date:
+            continue
+        if not last_write or write_date > last_write:
+            last_write, seen_ids = write_date, {row['id']}
+        elif write_date == last_write:
+            seen_ids = seen_ids | {row['id']}
+    return last_write, seen_ids
+
+
+class ProductCatalog:
+    """
+    Bản sao product.product trong bộ nhớ.
+
+    - Lần đầu: load toàn bộ sản phẩm đang bán (1 search_read) + thuế suất
+    - Sau mỗi CATALOG_TTL giây: refresh tăng dần theo write_date
+      (product.product và product.template)
+    - Tồn kho (qty_available là field compute, không đổi write_date):
+      refresh riêng theo CATALOG_STOCK_TTL (ngắn hơn)
+    - Index trigram tên sản phẩm (bỏ dấu) cập nhật cùng lúc với catalog, dùng cho match()
+    - Sản phẩm/tồn kho đổi -> loại entry result cache có tag 'product:{id}' và 'products'
+      (kết quả không tìm thấy/mơ hồ/danh sách)
+    - Lưu dạng cột NumPy (ProductColumns): lọc giá/tồn kho, giá sau thuế tính theo mảng
+    - Refresh dựng bảng cột mới rồi thay self._store 1 lần; mỗi hàm tra cứu đọc self._store
+      đúng 1 lần (vị trí và dữ liệu cùng 1 phiên bản, không cần khóa)
+    """
+
+    def __init__(self, ttl: float = None, stock_ttl: float = None):
+        self.ttl = settings.CATALOG_TTL if ttl is None else ttl
+        self.stock_ttl = settings.CATALOG_STOCK_TTL if stock_ttl is None else stock_ttl
+
+        self._store = ProductColumns()
+        self._tax_amounts: Dict[int, float] = {}
+        self._index = ProductNameIndex()
+        self._lock = threading.RLock()
+
+        self._loaded = False
+        self._last_product_write = None
+        self._last_template_write = None
+        # ID đã áp dụng có write_date = watermark (không đếm/ghi lại ở lần refresh sau)
+        self._product_watermark_ids: Set[int] = set()
+        self._template_watermark_ids: Set[int] = set()
+        self._checked_at = 0.0
+        self._stock_at = 0.0
+
+        # Thống kê
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._stock_stale = 0
+        self._full_loads = 0
+        self._incremental_updates = 0
+
+    # ===== LOAD / REFRESH =====
+
+    def full_load(self):
+        """Load toàn bộ catalog (sản phẩm đang bán + thuế suất)"""
+        with self._lock:
+            Product = odoo_service.get_model('product.product')
+            Template = odoo_service.get_model('product.template')
+            Tax = odoo_service.get_model('account.tax')
+
+            rows = Product.search_read([('sale_ok', '=', True)], CATALOG_FIELDS, order='id')
+            taxes = Tax.search_read([], ['amount'], context={'active_test': False})
+            last_template = Template.search_read([], ['write_date'], order='write_date desc', limit=1)
+
+            self._tax_amounts = {t['id']: t.get('amount') or 0 for t in taxes}
+            store = ProductColumns.from_rows(rows, self._tax_amounts)
+            self._index.rebuild(store.iter_names())
+            self._store = store
+            result_cache.invalidate('products')
+            self._last_product_write, self._product_watermark_ids = advance_watermark(rows, None, set())
+            self._last_template_write, self._template_watermark_ids = advance_watermark(last_template, None, set())
+
+            now = time.monotonic()
+            self._checked_at = self._stock_at = now
+            self._loaded = True
+            self._full_loads += 1
+            print(f"✅ Catalog: đã load {len(self._store)} sản phẩm, {len(self._tax_amounts)} thuế")
+
+    def refresh_incremental(self):
+        """Chỉ lấy các sản phẩm/template có write_date mới hơn lần trước"""
+        with self._lock:
+            Product = odoo_service.get_model('product.product')
+            Template = odoo_service.get_model('product.template')
+            inactive = {'active_test': False}
+
+            changed = []
+            if self._last_product_write:
+                changed = after_watermark(Product.search_read(
+                    [('write_date', '>=', self._last_product_write)], CATALOG_FIELDS, context=inactive
+                ), self._last_product_write, self._product_watermark_ids)
+
+            # Giá/thuế nằm trên product.template -> template đổi thì reload các variant
+            if self._last_template_write:
+                templates = after_watermark(Template.search_read(
+                    [('write_date', '>=', self._last_template_write)], ['write_date'], context=inactive
+                ), self._last_template_write, self._template_watermark_ids)
+                if templates:
+                    self._last_template_write, self._template_watermark_ids = advance_watermark(
+                        templates, self._last_template_write, self._template_watermark_ids
+                    )
+                    seen = {r['id'] for r in changed}
+                    variants = Product.search_read(
+                        [('product_tmpl_id', 'in', [t['id'] for t in templates])], CATALOG_FIELDS, context=inactive
+                    )
+                    changed += [r for r in variants if r['id'] not in seen]
+
+            # Thuế mới trước (cột tax_rate tính lúc ghi vào bảng)
+            new_tax_ids = {t for r in changed for t in (r.get('taxes_id') or []) if t not in self._tax_amounts}
+            if new_tax_ids:
+                Tax = odoo_service.get_model('account.tax')
+                for t in Tax.read(list(new_tax_ids), ['amount']):
+                    self._tax_amounts[t['id']] = t.get('amount') or 0
+
+            selling, removed = [], []
+            for row in changed:
+                if row.get('active', True) and row.get('sale_ok'):
+                    selling.append(row)
+                    self._index.add(row['id'], row.get('name') or '')
+                else:
+                    removed.append(row['id'])
+                    self._index.remove(row['id'])
+            self._last_product_write, self._product_watermark_ids = advance_watermark(
+                changed, self._last_product_write, self._product_watermark_ids
+            )
+            # Dựng bảng mới rồi thay 1 lần (người đọc đang giữ bảng cũ không bị ảnh hưởng)
+            self._store = self._store.upsert(selling, self._tax_amounts).remove(removed)
+            if changed:
+                result_cache.invalidate('products', *(f"product:{r['id']}" for r in changed))
+
+            self._checked_at = time.monotonic()
+            self._incremental_updates += len(changed)
+
+    def refresh_stock(self):
+        """Cập nhật riêng qty_available (TTL ngắn hơn)"""
+        with self._lock:
+            Product = odoo_service.get_model('product.product')
+            rows = Product.search_read([('sale_ok', '=', True)], ['qty_available'])
+            store = self._store
+            ids = np.fromiter((r['id'] for r in rows), np.int64, len(rows))
+            qty = np.fromiter((r['qty_available'] or 0 for r in rows), np.float64, len(rows))
+            positions = store.positions(ids)
+            found = positions >= 0
+            restocked = ids[found][store.column('qty_available')[positions[found]] != qty[found]]
+            self._store = store.with_stock(ids, qty)
+            if len(restocked):
+                result_cache.invalidate('products', *(f"product:{pid}" for pid in restocked.tolist()))
+            self._stock_at = time.monotonic()
+
+    def _due(self, now: float) -> bool:
+        return not self._loaded or now - self._checked_at >= self.ttl or now - self._stock_at >= self.stock_ttl
+
+    def ensure_fresh(self):
+        """Load/refresh nếu dữ liệu đã quá TTL (đã có dữ liệu mà Odoo lỗi -> dùng tạm dữ liệu cũ)"""
+        if not self._due(time.monotonic()):
+            return
+        with self._lock:
+            # Luồng khác có thể vừa load/refresh xong trong lúc chờ khóa -> kiểm tra lại
+            if not self._loaded:
+                self.full_load()
+                return
+            now = time.monotonic()
+            try:
+                if now - self._checked_at >= self.ttl:
+                    self._stale += 1
+                    self.refresh_incremental()
+                if now - self._stock_at >= self.stock_ttl:
+                    self._stock_stale += 1
+                    self.refresh_stock()
+            except Exception as e:
+                print(f"⚠️ Catalog: không làm mới được ({e}), dùng dữ liệu cũ")
+                note_stale('catalog sản phẩm', now - min(self._checked_at, self._stock_at))
+
+    def invalidate(self):
+        """Bắt buộc load lại toàn bộ ở lần truy cập tiếp theo"""
+        with self._lock:
+            self._loaded = False
+
+    # ===== TRA CỨU =====
+
+    def get(self, product_id: int) -> Optional[dict]:
+        """Lấy 1 sản phẩm theo ID (None nếu không có trong catalog)"""
+        self.ensure_fresh()
+        product = self._store.get(product_id)
+        if product is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return product
+
+    def search(self, keyword: str = None, limit: int = None) -> List[dict]:
+        """Tìm theo tên (không phân biệt hoa thường, giống 'ilike')"""
+        self.ensure_fresh()
+        needle = (keyword or '').lower()
+        store = self._store
+        positions = []
+        for position, (_, name) in enumerate(store.iter_names()):
+            if needle in name.lower():
+                positions.append(position)
+                if limit and len(positions) >= limit:
+                    break
+        self._hits += 1
+        return store.rows(positions)
+
+    def match(self, keyword: str, limit: int = None, min_score: float = None) -> List[Tuple[dict, float]]:
+        """
+        Tìm theo tên qua index trigram: bỏ dấu, chịu lỗi gõ nhẹ, xếp hạng theo độ giống
+        -> [(sản phẩm, điểm 0..1)], điểm giảm dần
+        """
+        self.ensure_fresh()
+        min_score = settings.PRODUCT_MATCH_MIN_SCORE if min_score is None else min_score
+        matches = self._index.search(keyword, limit, min_score)
+        store = self._store
+        positions = store.positions([product_id for product_id, _ in matches])
+        self._hits += 1
+        return [(store.row(p), score) for p, (_, score) in zip(positions, matches) if p >= 0]
+
+    def filter(self, keyword: str = None, min_price: float = None, max_price: float = None,
+               in_stock: bool = False, limit: int = None) -> List[dict]:
+        """
+        Lọc sản phẩm theo khoảng giá sau thuế + còn hàng (VD 'còn hàng, dưới 10 triệu'), tính trên mảng
+
+        Có keyword -> chỉ xét sản phẩm khớp tên (thứ tự theo độ giống), không có -> theo ID
+        """
+        self.ensure_fresh()
+        store = self._store
+        positions = None
+        if keyword:
+            min_score = settings.PRODUCT_MATCH_MIN_SCORE
+            ids = [product_id for product_id, _ in self._index.search(keyword, None, min_score)]
+            positions = store.positions(ids)
+            positions = positions[positions >= 0]
+        positions = store.filter(min_price, max_price, in_stock, positions)
+        self._hits += 1
+        return store.rows(positions[:limit] if limit else positions)
+
+    def prices_with_tax(self, product_ids: List[int]) -> Dict[int, float]:
+        """Giá niêm yết sau thuế của nhiều sản phẩm (1 phép tính mảng), bỏ qua ID không có trong catalog"""
+        self.ensure_fresh()
+        store = self._store
+        positions = store.positions(product_ids)
+        found = positions >= 0
+        prices = store.prices_with_tax(positions[found])
+        return dict(zip(np.asarray(product_ids, dtype=np.int64)[found].tolist(), prices.tolist()))
+
+    def tax_amount(self, tax_id: int) -> Optional[float]:
+        """Thuế suất đã cache (None nếu chưa biết)"""
+        return self._tax_amounts.get(tax_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê hit/miss/staleness"""
+        now = time.monotonic()
+        store = self._store
+        lookups = self._hits + self._misses
+        return {
+            'products': len(store),
+            'taxes': len(self._tax_amounts),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+            'stale_refreshes': self._stale,
+            'stock_refreshes': self._stock_stale,
+            'full_loads': self._full_loads,
+            'incremental_updates': self._incremental_updates,
+            'name_index': self._index.stats(),
+            'store': store.stats(),
+            'age_seconds': round(now - self._checked_at, 1) if self._loaded else None,
+            'stock_age_seconds': round(now - self._stock_at, 1) if self._loaded else None,
+        }
+
+
+# Singleton instance
+product_catalog = ProductCatalog()
@@ -0,0 +1,293 @@
+import sys
+from array import array
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Cột số của bảng sản phẩm (sắp theo id để tra vị trí bằng searchsorted)
+COLUMNS = {
+    'id': np.int64,
+    'list_price': np.float64,
+    'standard_price': np.float64,
+    'qty_available': np.float64,
+    'tax_rate': np.float64,      # thuế suất (%) của thuế đầu tiên, 0 nếu không có thuế
+    'name': np.int32,            # chỉ số trong bảng tên
+    'tmpl_id': np.int64,
+    'tmpl_name': np.int32,       # chỉ số trong bảng tên
+    'taxes': np.int32,           # chỉ số trong bảng bộ thuế (tuple taxes_id)
+}
+# Dọn bảng tên khi số tên > RATIO x số tên đang dùng (tên sản phẩm + tên template) + MIN
+NAME_COMPACT_RATIO = 2
+NAME_COMPACT_MIN = 1024
+
+
+class StringTable:
+    """
+    Bảng tên: mọi chuỗi nối thành 1 khối UTF-8 + mảng offset (không giữ object str cho từng tên).
+    Trùng tên trong cùng 1 lô (VD tên template = tên sản phẩm) chỉ lưu 1 lần.
+    Chỉ nối thêm: chỉ số đã cấp không đổi nên các phiên bản bảng cột cũ vẫn đọc đúng.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array('q', [0])
+
+    def extend(self, values: Iterable[str]) -> List[int]:
+        """Thêm 1 lô chuỗi -> chỉ số của từng chuỗi"""
+        seen: Dict[str, int] = {}
+        indices = []
+        for value in values:
+            idx = seen.get(value)
+            if idx is None:
+                idx = seen[value] = len(self._offsets) - 1
+                self._blob += value.encode('utf-8')
+                self._offsets.append(len(self._blob))
+            indices.append(idx)
+        return indices
+
+    def __getitem__(self, idx: int) -> str:
+        return self._blob[self._offsets[idx]:self._offsets[idx + 1]].decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self._blob) + sys.getsizeof(self._offsets)
+
+
+class InternTable:
+    """Bảng giá trị dùng chung (VD bộ thuế): mỗi giá trị lưu 1 lần, cột chỉ giữ chỉ số int32"""
+
+    def __init__(self):
+        self.values: List[Hashable] = []
+        self._index: Dict[Hashable, int] = {}
+
+    def intern(self, value: Hashable) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+    def __getitem__(self, idx: int) -> Hashable:
+        return self.values[idx]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def nbytes(self) -> int:
+        """Bộ nhớ ước tính: danh sách + dict tra ngược + bản thân các giá trị"""
+        return (sys.getsizeof(self.values) + sys.getsizeof(self._index)
+                + sum(sys.getsizeof(v) for v in self.values))
+
+
+class ProductColumns:
+    """
+    Bảng sản phẩm dạng cột (NumPy) thay cho dict từng sản phẩm:
+    mỗi sản phẩm ~60 byte số + tên UTF-8 trong bảng tên + chỉ số bộ thuế dùng chung.
+
+    - Lọc (giá, tồn kho) và tính giá sau thuế cho nhiều sản phẩm là phép toán trên mảng
+    - Dòng sắp theo id: tra vị trí bằng np.searchsorted
+    - Bất biến: upsert/remove/with_stock trả về bảng mới (cột mới), không sửa mảng đang được đọc.
+      Người đọc giữ 1 tham chiếu bảng cho cả lần tra cứu -> vị trí và dữ liệu luôn cùng 1 phiên bản
+    - Bảng tên/bộ thuế chỉ nối thêm (dùng chung giữa các phiên bản); tên cũ được dọn khi số tên
+      vượt NAME_COMPACT_RATIO lần số tên đang dùng (tối đa ~NAME_COMPACT_RATIO x bộ nhớ tên)
+    - Đọc từng sản phẩm -> dict giống search_read (row/rows)
+    """
+
+    def __init__(self, cols: Dict[str, np.ndarray] = None, names: StringTable = None,
+                 tax_sets: InternTable = None):
+        self._names = names if names is not None else StringTable()
+        self._tax_sets = tax_sets if tax_sets is not None else InternTable()
+        self._cols: Dict[str, np.ndarray] = cols if cols is not None else {
+            c: np.empty(0, dtype) for c, dtype in COLUMNS.items()
+        }
+        for values in self._cols.values():
+            values.flags.writeable = False
+
+    # ===== GHI (trả về bảng mới) =====
+
+    @staticmethod
+    def _encode(rows: List[dict], tax_amounts: Dict[int, float], names: StringTable,
+                tax_sets: InternTable) -> Dict[str, np.ndarray]:
+        n = len(rows)
+        taxes = [tuple(r.get('taxes_id') or ()) for r in rows]
+        templates = [r.get('product_tmpl_id') or (0, '') for r in rows]
+        indices = names.extend([r.get('name') or '' for r in rows] + [t[1] for t in templates])
+        return {
+            'id': np.fromiter((r['id'] for r in rows), np.int64, n),
+            'list_price': np.fromiter((r.get('list_price') or 0 for r in rows), np.float64, n),
+            'standard_price': np.fromiter((r.get('standard_price') or 0 for r in rows), np.float64, n),
+            'qty_available': np.fromiter((r.get('qty_available') or 0 for r in rows), np.float64, n),
+            'tax_rate': np.fromiter(((tax_amounts.get(t[0]) or 0) if t else 0 for t in taxes), np.float64, n),
+            'name': np.array(indices[:n], dtype=np.int32),
+            'tmpl_id': np.fromiter((t[0] for t in templates), np.int64, n),
+            'tmpl_name': np.array(indices[n:], dtype=np.int32),
+            'taxes': np.fromiter((tax_sets.intern(t) for t in taxes), np.int32, n),
+        }
+
+    @staticmethod
+    def _sorted(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        order = np.argsort(cols['id'], kind='stable')
+        return {c: values[order] for c, values in cols.items()}
+
+    def _derive(self, cols: Dict[str, np.ndarray]) -> 'ProductColumns':
+        """Bảng mới dùng chung bảng tên/bộ thuế, dọn bảng tên khi quá nhiều tên không còn dùng"""
+        table = ProductColumns(cols, self._names, self._tax_sets)
+        if len(self._names) > NAME_COMPACT_RATIO * 2 * len(table) + NAME_COMPACT_MIN:
+            table = table.compacted()
+        return table
+
+    @classmethod
+    def from_rows(cls, rows: List[dict], tax_amounts: Dict[int, float]) -> 'ProductColumns':
+        """Bảng mới từ các dòng search_read (bảng tên/bộ thuế mới)"""
+        names, tax_sets = StringTable(), InternTable()
+        return cls(cls._sorted(cls._encode(rows, tax_amounts, names, tax_sets)), names, tax_sets)
+
+    def upsert(self, rows: List[dict], tax_amounts: Dict[int, float]) -> 'ProductColumns':
+        """Cập nhật sản phẩm đã có, thêm sản phẩm mới (1 lần sắp xếp cho cả lô)"""
+        if not rows:
+            return self
+        new = self._encode(rows, tax_amounts, self._names, self._tax_sets)
+        positions = self.positions(new['id'])
+        found = positions >= 0
+        cols = {c: values.copy() for c, values in self._cols.items()}
+        if found.any():
+            for c in COLUMNS:
+                cols[c][positions[found]] = new[c][found]
+        if not found.all():
+            added = ~found
+            cols = self._sorted({c: np.concatenate([cols[c], new[c][added]]) for c in COLUMNS})
+        return self._derive(cols)
+
+    def remove(self, product_ids: Iterable[int]) -> 'ProductColumns':
+        ids = np.fromiter(product_ids, np.int64)
+        if not len(ids):
+            return self
+        keep = ~np.isin(self._cols['id'], ids)
+        if keep.all():
+            return self
+        return self._derive({c: values[keep] for c, values in self._cols.items()})
+
+    def with_stock(self, product_ids: Iterable[int], quantities: Iterable[float]) -> 'ProductColumns':
+        """Bảng mới với qty_available cập nhật theo lô (bỏ qua ID không có trong bảng)"""
+        ids = np.fromiter(product_ids, np.int64)
+        qty = np.fromiter(quantities, np.float64, len(ids))
+        positions = self.positions(ids)
+        found = positions >= 0
+        stock = self._cols['qty_available'].copy()
+        stock[positions[found]] = qty[found]
+        return ProductColumns({**self._cols, 'qty_available': stock}, self._names, self._tax_sets)
+
+    def compacted(self) -> 'ProductColumns':
+        """Bảng mới với bảng tên/bộ thuế chỉ gồm giá trị đang dùng"""
+        cols = self._cols
+        names, tax_sets = StringTable(), InternTable()
+        n = len(self)
+        indices = names.extend([self._names[i] for i in cols['name'].tolist()]
+                               + [self._names[i] for i in cols['tmpl_name'].tolist()])
+        taxes = np.fromiter((tax_sets.intern(self._tax_sets[i]) for i in cols['taxes'].tolist()), np.int32, n)
+        compact = {**cols,
+                   'name': np.array(indices[:n], dtype=np.int32),
+                   'tmpl_name': np.array(indices[n:], dtype=np.int32),
+                   'taxes': taxes}
+        return ProductColumns(compact, names, tax_sets)
+
+    # ===== TRA CỨU =====
+
+    def positions(self, product_ids) -> np.ndarray:
+        """Vị trí dòng của từng ID, -1 nếu không có"""
+        ids = np.asarray(product_ids, dtype=np.int64)
+        column = self._cols['id']
+        if not len(column):
+            return np.full(len(ids), -1, dtype=np.int64)
+        idx = np.searchsorted(column, ids)
+        clipped = np.minimum(idx, len(column) - 1)
+        return np.where(column[clipped] == ids, clipped, -1)
+
+    def position(self, product_id: int) -> int:
+        column = self._cols['id']
+        idx = int(column.searchsorted(product_id))
+        return idx if idx < len(column) and column[idx] == product_id else -1
+
+    def row(self, position: int) -> Dict[str, Any]:
+        """1 dòng -> dict giống search_read: id, name, list_price, standard_price, qty_available, taxes_id, product_tmpl_id"""
+        cols = self._cols
+        tmpl_id = int(cols['tmpl_id'][position])
+        return {
+            'id': int(cols['id'][position]),
+            'name': self._names[cols['name'][position]],
+            'list_price': float(cols['list_price'][position]),
+            'standard_price': float(cols['standard_price'][position]),
+            'qty_available': float(cols['qty_available'][position]),
+            'taxes_id': list(self._tax_sets[cols['taxes'][position]]),
+            'product_tmpl_id': [tmpl_id, self._names[cols['tmpl_name'][position]]] if tmpl_id else False,
+        }
+
+    def rows(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.row(p) for p in positions]
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        position = self.position(product_id)
+        return self.row(position) if position >= 0 else None
+
+    def name(self, position: int) -> str:
+        return self._names[self._cols['name'][position]]
+
+    def iter_names(self) -> Iterator[Tuple[int, str]]:
+        """(id, tên) theo thứ tự id"""
+        names = self._names
+        return zip(self._cols['id'].tolist(), (names[i] for i in self._cols['name'].tolist()))
+
+    def column(self, name: str) -> np.ndarray:
+        return self._cols[name]
+
+    # ===== TÍNH TOÁN THEO MẢNG =====
+
+    def prices_with_tax(self, positions: np.ndarray = None, prices: np.ndarray = None) -> np.ndarray:
+        """Giá sau thuế = giá * (1 + thuế suất / 100); mặc định giá niêm yết của mọi dòng"""
+        tax_rate = self._cols['tax_rate'] if positions is None else self._cols['tax_rate'][positions]
+        if prices is None:
+            prices = self._cols['list_price'] if positions is None else self._cols['list_price'][positions]
+        return prices * (1 + tax_rate / 100)
+
+    def filter(self, min_price: float = None, max_price: float = None, in_stock: bool = False,
+               positions: np.ndarray = None, with_tax: bool = True) -> np.ndarray:
+        """
+        Vị trí các dòng thỏa điều kiện (giữ thứ tự của positions / thứ tự id)
+
+        Args:
+            min_price, max_price: khoảng giá (giá sau thuế nếu with_tax, ngược lại giá niêm yết)
+            in_stock: chỉ lấy sản phẩm còn hàng (qty_available > 0)
+            positions: chỉ xét các dòng này (VD kết quả tìm theo tên)
+        """
+        if positions is None:
+            positions = np.arange(len(self._cols['id']))
+        mask = np.ones(len(positions), dtype=bool)
+        if min_price is not None or max_price is not None:
+            prices = self.prices_with_tax(positions) if with_tax else self._cols['list_price'][positions]
+            if min_price is not None:
+                mask &= prices >= min_price
+            if max_price is not None:
+                mask &= prices <= max_price
+        if in_stock:
+            mask &= self._cols['qty_available'][positions] > 0
+        return positions[mask]
+
+    # ===== THỐNG KÊ =====
+
+    def __len__(self) -> int:
+        return len(self._cols['id'])
+
+    def nbytes(self) -> int:
+        """Bộ nhớ ước tính: các cột + bảng tên + bảng bộ thuế"""
+        return sum(values.nbytes for values in self._cols.values()) + self._names.nbytes() + self._tax_sets.nbytes()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rows': len(self),
+            'names': len(self._names),
+            'tax_sets': len(self._tax_sets),
+            'column_bytes': sum(values.nbytes for values in self._cols.values()),
+            'approx_bytes': self.nbytes(),
+        }
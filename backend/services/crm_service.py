@@ -1,12 +1,17 @@
+from backend.config import settings
 from backend.services.odoo_service import odoo_service
+from backend.services.customer_index import customer_index, PARTNER_FIELDS
 from backend.services.customer_service import customer_service
+from backend.services.result_cache import result_cache
 from backend.utils.formatter import format_currency
 
 class CRMService:
     """Service quản lý logic CRM"""
     
-    def __init__(self):
-        self.Lead = odoo_service.get_model('crm.lead')
+    @property
+    def Lead(self):
+        """Model crm.lead (lấy khi dùng, không kết nối Odoo lúc import)"""
+        return odoo_service.get_model('crm.lead')
     
     def create_opportunity(self, customer_name: str, phone: str = None, 
                           email: str = None, product_interest: str = None,
@@ -49,6 +54,14 @@ class CRMService:
                     
                     partner_id = Partner.create(partner_vals)
                     is_new_customer = True
+                    # Đưa khách mới vào index ngay (không chờ TTL); bỏ write_date để refresh tăng dần
+                    # không bỏ sót partner sửa trước đó mà chưa được refresh
+                    if settings.CUSTOMER_INDEX_ENABLED:
+                        fields = [f for f in PARTNER_FIELDS if f != 'write_date']
+                        for partner in Partner.read([partner_id], fields):
+                            customer_index.upsert(partner)
+                    # Kết quả tìm khách hàng (không thấy / trùng tên) đã cache không còn đúng
+                    result_cache.invalidate('customer:unresolved')
             
             # 2. XÂY DỰNG THÔNG TIN OPPORTUNITY
             opportunity_title = f"Cơ hội: {customer_name}"
@@ -0,0 +1,227 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set
+
+from backend.config import settings
+from backend.services.odoo_service import odoo_service
+from backend.utils.circuit_breaker import note_stale
+from backend.utils.formatter import normalize_phone, normalize_text
+
+PARTNER_FIELDS = ['name', 'display_name', 'phone', 'email',
+                  'property_product_pricelist', 'active', 'write_date']
+
+# Field trả ra cho service
+PUBLIC_FIELDS = ['id', 'name', 'phone', 'email', 'property_product_pricelist']
+
+
+class CustomerIndex:
+    """
+    Index khách hàng (res.partner) trong bộ nhớ.
+
+    - SĐT chuẩn hóa (normalize_phone) -> partner ids
+    - Email chữ thường -> partner ids
+    - Token tên đã bỏ dấu -> partner ids (tra theo tiền tố)
+
+    Build từ 1 lần search_read, sau đó refresh tăng dần theo write_date.
+    Không tìm thấy local -> service hỏi Odoo rồi upsert kết quả vào index.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = settings.CUSTOMER_INDEX_TTL if ttl is None else ttl
+        self._partners: Dict[int, dict] = {}
+        self._by_phone: Dict[str, Set[int]] = {}
+        self._by_email: Dict[str, Set[int]] = {}
+        self._by_token: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._lock = threading.RLock()
+
+        self._loaded = False
+        self._last_write = None
+        self._checked_at = 0.0
+
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+
+    # ===== BUILD / REFRESH =====
+
+    @staticmethod
+    def _remove_from(mapping: Dict[str, Set[int]], key: str, partner_id: int):
+        ids = mapping.get(key)
+        if ids is not None:
+            ids.discard(partner_id)
+            if not ids:
+                del mapping[key]
+
+    def _unindex(self, partner_id: int):
+        entry = self._partners.pop(partner_id, None)
+        if entry is None:
+            return
+        if entry['_phone']:
+            self._remove_from(self._by_phone, entry['_phone'], partner_id)
+        if entry['_email']:
+            self._remove_from(self._by_email, entry['_email'], partner_id)
+        for token in entry['_tokens']:
+            self._remove_from(self._by_token, token, partner_id)
+        self._vocabulary_dirty = True
+
+    def upsert(self, row: dict):
+        """Thêm/cập nhật 1 partner (row từ search_read)"""
+        with self._lock:
+            self._unindex(row['id'])
+            if row.get('active') is False:
+                return
+
+            folded_name = normalize_text(row.get('name'))
+            folded_display = normalize_text(row.get('display_name') or row.get('name'))
+            entry = {f: row.get(f) for f in PUBLIC_FIELDS}
+            entry.update({
+                '_phone': normalize_phone(row.get('phone')) if row.get('phone') else None,
+                '_email': (row.get('email') or '').strip().lower() or None,
+                '_names': (folded_name, folded_display),
+                '_tokens': set(folded_name.split()) | set(folded_display.split()),
+            })
+            self._partners[row['id']] = entry
+
+            if entry['_phone']:
+                self._by_phone.setdefault(entry['_phone'], set()).add(row['id'])
+            if entry['_email']:
+                self._by_email.setdefault(entry['_email'], set()).add(row['id'])
+            for token in entry['_tokens']:
+                self._by_token.setdefault(token, set()).add(row['id'])
+            self._vocabulary_dirty = True
+
+            if row.get('write_date') and (not self._last_write or row['write_date'] > self._last_write):
+                self._last_write = row['write_date']
+
+    def full_load(self):
+        """Build index từ 1 lần search_read toàn bộ partner"""
+        with self._lock:
+            Partner = odoo_service.get_model('res.partner')
+            rows = Partner.search_read([], PARTNER_FIELDS)
+            self._partners.clear()
+            self._by_phone.clear()
+            self._by_email.clear()
+            self._by_token.clear()
+            self._last_write = None
+            for row in rows:
+                self.upsert(row)
+            self._loaded = True
+            self._checked_at = time.monotonic()
+            print(f"✅ Customer index: đã index {len(self._partners)} khách hàng")
+
+    def refresh_incremental(self):
+        """Cập nhật các partner có write_date mới"""
+        with self._lock:
+            if self._last_write:
+                Partner = odoo_service.get_model('res.partner')
+                rows = Partner.search_read(
+                    [('write_date', '>=', self._last_write)], PARTNER_FIELDS,
+                    context={'active_test': False}
+                )
+                for row in rows:
+                    self.upsert(row)
+            self._checked_at = time.monotonic()
+            self._refreshes += 1
+
+    def ensure_fresh(self):
+        if self._loaded and time.monotonic() - self._checked_at < self.ttl:
+            return
+        with self._lock:
+            # Luồng khác có thể vừa load/refresh xong trong lúc chờ khóa -> kiểm tra lại
+            if not self._loaded:
+                self.full_load()
+            elif time.monotonic() - self._checked_at >= self.ttl:
+                try:
+                    self.refresh_incremental()
+                except Exception as e:
+                    print(f"⚠️ Customer index: không làm mới được ({e}), dùng dữ liệu cũ")
+                    note_stale('danh sách khách hàng', time.monotonic() - self._checked_at)
+
+    # ===== TRA CỨU =====
+
+    def _ids_with_prefix(self, prefix: str) -> Set[int]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._by_token)
+            self._vocabulary_dirty = False
+        ids = set()
+        idx = bisect_left(self._vocabulary, prefix)
+        while idx < len(self._vocabulary) and self._vocabulary[idx].startswith(prefix):
+            ids |= self._by_token[self._vocabulary[idx]]
+            idx += 1
+        return ids
+
+    def _name_candidates(self, folded_name: str) -> Set[int]:
+        candidates = None
+        for token in folded_name.split():
+            ids = self._ids_with_prefix(token)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def lookup(self, customer_name: str = None, phone: str = None, email: str = None) -> List[dict]:
+        """
+        Tìm khách hàng trong index (cùng điều kiện với find_customer).
+
+        Returns:
+            List[dict]: partner khớp (rỗng = không có trong index -> cần hỏi Odoo)
+        """
+        with self._lock:
+            self.ensure_fresh()
+            folded_name = normalize_text(customer_name)
+
+            if phone:
+                candidates = set(self._by_phone.get(normalize_phone(phone) or '', set()))
+            elif email:
+                candidates = set(self._by_email.get(email.strip().lower(), set()))
+            elif folded_name:
+                candidates = self._name_candidates(folded_name)
+            else:
+                candidates = set()
+
+            email_lower = email.strip().lower() if email else None
+            matched = []
+            for partner_id in sorted(candidates):
+                entry = self._partners[partner_id]
+                if folded_name and not any(folded_name in n for n in entry['_names']):
+                    continue
+                if email_lower and email_lower not in (entry['_email'] or ''):
+                    continue
+                matched.append({f: entry[f] for f in PUBLIC_FIELDS})
+
+            if matched:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return matched
+
+    def get(self, partner_id: int) -> Optional[dict]:
+        """Lấy partner theo ID (None nếu chưa index)"""
+        with self._lock:
+            self.ensure_fresh()
+            entry = self._partners.get(partner_id)
+            return {f: entry[f] for f in PUBLIC_FIELDS} if entry else None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            'partners': len(self._partners),
+            'phones': len(self._by_phone),
+            'emails': len(self._by_email),
+            'tokens': len(self._by_token),
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+            'incremental_refreshes': self._refreshes,
+        }
+
+
+# Singleton instance
+customer_index = CustomerIndex()
@@ -1,12 +1,19 @@
 from typing import Tuple, Optional
+from backend.config import settings
 from backend.services.odoo_service import odoo_service
+from backend.services.customer_index import customer_index, PARTNER_FIELDS
+from backend.services.pricelist_engine import pricelist_engine
+from backend.services.result_cache import result_cache
 from backend.utils.formatter import extract_core_digits
+from backend.utils.progress import report_progress
 
 class CustomerService:
     """Service quản lý logic khách hàng"""
     
-    def __init__(self):
-        self.Partner = odoo_service.get_model('res.partner')
+    @property
+    def Partner(self):
+        """Model res.partner (lấy khi dùng, không kết nối Odoo lúc import)"""
+        return odoo_service.get_model('res.partner')
     
     def find_customer(self, customer_name: str, phone: str = None, email: str = None) -> Tuple[bool, any]:
         """
@@ -18,47 +25,33 @@ class CustomerService:
             - success=False: result = error_message
         """
         try:
-            # XÂY DỰNG DOMAIN
-            domain = ['|', ('name', 'ilike', customer_name), ('display_name', 'ilike', customer_name)]
-
-            # Thêm điều kiện phone
-            if phone:
-                core_digits = extract_core_digits(phone)
-                if core_digits:
-                    patterns = [core_digits]
-                    
-                    if len(core_digits) >= 9:
-                        spaced = ' '.join([core_digits[i:i+3] for i in range(0, len(core_digits), 3)])
-                        patterns.append(spaced)
-                    
-                    if phone != core_digits:
-                        patterns.append(phone)
-                    
-                    phone_conditions = [('phone', 'ilike', p) for p in patterns]
-                    
-                    if len(phone_conditions) == 1:
-                        domain = ['&'] + domain + phone_conditions
-                    else:
-                        or_chain = ['|'] * (len(phone_conditions) - 1) + phone_conditions
-                        domain = ['&'] + domain + or_chain
-
-            # Thêm điều kiện email
-            if email:
-                domain = ['&'] + domain + [('email', 'ilike', email)]
-
-            # TÌM KIẾM
-            partners = self.Partner.search_read(domain, ['name', 'phone', 'email'], limit=5)
+            # TRA INDEX LOCAL (SĐT/email/tên đã chuẩn hóa) - chỉ khi không có mới hỏi Odoo
+            partners = []
+            if settings.CUSTOMER_INDEX_ENABLED:
+                try:
+                    partners = customer_index.lookup(customer_name, phone, email)[:5]
+                except Exception as e:
+                    print(f"DEBUG - Customer index unavailable, fallback to Odoo: {e}")
+            
+            if not partners:
+                partners = self._search_partners(customer_name, phone, email)
             
             # XỬ LÝ KẾT QUẢ
             if not partners:
+                # Kết quả cache dựa trên "không tìm thấy" -> loại khi có khách hàng mới
+                result_cache.tag('customer:unresolved')
                 return (False, f"Không tìm thấy khách hàng '{customer_name}'" +
                               (f" với SĐT {phone}" if phone else "") +
                               (f" với email {email}" if email else ""))
 
+            result_cache.tag(*(f"partner:{p['id']}" for p in partners))
             if len(partners) == 1:
+                report_progress('customer_resolved', f"👤 Đã xác định khách hàng: {partners[0]['name']}",
+                                partner_id=partners[0]['id'])
                 return (True, partners[0]['id'])
             
-            # Trùng nhiều người
+            # Trùng nhiều người (khách hàng mới cùng tên cũng làm kết quả này thay đổi)
+            result_cache.tag('customer:unresolved')
             error_msg = f"Tìm thấy {len(partners)} khách hàng phù hợp:\n"
             for p in partners:
                 contact = p.get('phone') or "Không SĐT"
@@ -69,8 +62,57 @@ class CustomerService:
         except Exception as e:
             return (False, f"❌ Lỗi hệ thống: {str(e)}")
     
+    def _search_partners(self, customer_name: str, phone: str = None, email: str = None) -> list:
+        """Tìm khách hàng trực tiếp trên Odoo (ilike) và bổ sung kết quả vào index"""
+        # XÂY DỰNG DOMAIN
+        domain = ['|', ('name', 'ilike', customer_name), ('display_name', 'ilike', customer_name)]
+
+        # Thêm điều kiện phone
+        if phone:
+            core_digits = extract_core_digits(phone)
+            if core_digits:
+                patterns = [core_digits]
+                
+                if len(core_digits) >= 9:
+                    spaced = ' '.join([core_digits[i:i+3] for i in range(0, len(core_digits), 3)])
+                    patterns.append(spaced)
+                
+                if phone != core_digits:
+                    patterns.append(phone)
+                
+                phone_conditions = [('phone', 'ilike', p) for p in patterns]
+                
+                if len(phone_conditions) == 1:
+                    domain = ['&'] + domain + phone_conditions
+                else:
+                    or_chain = ['|'] * (len(phone_conditions) - 1) + phone_conditions
+                    domain = ['&'] + domain + or_chain
+
+        # Thêm điều kiện email
+        if email:
+            domain = ['&'] + domain + [('email', 'ilike', email)]
+
+        # TÌM KIẾM
+        partners = self.Partner.search_read(domain, PARTNER_FIELDS, limit=5)
+        if settings.CUSTOMER_INDEX_ENABLED:
+            for partner in partners:
+                customer_index.upsert(partner)
+        return partners
+    
     def get_customer_pricelist(self, customer_name: str, phone: str = None, email: str = None) -> str:
-        """Lấy chính sách giá của khách hàng"""
+        """Lấy chính sách giá của khách hàng (qua result cache, tag theo khách hàng + 'pricelists')"""
+        try:
+            # Rule pricelist đổi -> engine reload và loại các entry tag 'pricelists'
+            pricelist_engine.ensure_fresh()
+        except Exception as e:
+            print(f"DEBUG - Pricelist check error: {e}")
+        return result_cache.get_or_compute(
+            'get_customer_pricelist', (customer_name, phone, email),
+            lambda: self._get_customer_pricelist(customer_name, phone, email),
+            tags=['pricelists'], cacheable=lambda reply: not reply.startswith('❌')
+        )
+    
+    def _get_customer_pricelist(self, customer_name: str, phone: str = None, email: str = None) -> str:
         try:
             # Tìm khách hàng
             success, result = self.find_customer(customer_name, phone, email)
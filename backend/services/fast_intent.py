@@ -0,0 +1,237 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.utils.formatter import normalize_text
+
+# Mã đơn/báo giá Odoo: S00042, SO001, SO-001 (không nhận mã model sản phẩm như S23: cần SO hoặc >= 3 chữ số)
+ORDER_CODE = re.compile(r'^(?:SO-?\d+|S-?\d{3,})$', re.IGNORECASE)
+NUMBER = re.compile(r'^\d+$')
+
+# Cụm từ (đã bỏ dấu) nhận diện từng loại lệnh
+CONFIRM_PHRASES = [['xac', 'nhan'], ['confirm'], ['dong', 'y']]
+CANCEL_PHRASES = [['huy'], ['cancel']]
+NEGATIONS = [['khong'], ['dung'], ['chua'], ['dont'], ['not']]
+CHECK_ORDER_PHRASES = [['xem', 'don'], ['tra', 'cuu', 'don'], ['danh', 'sach', 'don'],
+                       ['don', 'hang', 'gan', 'day'], ['check', 'orders'], ['check', 'order']]
+LIST_PRODUCT_PHRASES = [['liet', 'ke', 'san', 'pham'], ['danh', 'sach', 'san', 'pham'],
+                        ['show', 'products'], ['list', 'products']]
+SEARCH_PRODUCT_PHRASES = [['tim', 'san', 'pham'], ['liet', 'ke'], ['tim']]
+PRICE_PHRASES = [['goi', 'y', 'gia'], ['bao', 'gia', 'nhanh'], ['gia']]
+UNIT_WORDS = {'chiec', 'cai', 'may', 'bo', 'hop', 'sp', 'san', 'pham'}
+ORDER_FILLER_WORDS = {'hang', 'gan', 'day', 'moi', 'nhat', 'toi', 'em', 'cac', 'tat', 'ca', 'recent'}
+CUSTOMER_MARKERS = [['cua', 'khach', 'hang'], ['cua', 'khach'], ['khach', 'hang'], ['khach'], ['cua']]
+# Nhiều yêu cầu trong 1 câu -> để LLM tách (VD "Giá iPhone cho khách An và xem đơn của khách Bình")
+CONJUNCTIONS = {'va', 'and', 'roi', 'then'}
+LIST_SEPARATORS = (',', ';', '&', '+')
+# Động từ + tân ngữ ("Xác nhận báo giá", "Hủy đơn hàng") là 1 lệnh, 'báo giá' phía sau không phải lệnh thứ 2
+WRITE_OBJECTS = [['bao', 'gia'], ['don', 'hang'], ['don']]
+WRITE_COMMAND_PHRASES = [verb + obj for verb in CONFIRM_PHRASES + CANCEL_PHRASES for obj in WRITE_OBJECTS]
+# Cụm lệnh nếu xuất hiện giữa câu là dấu hiệu câu có lệnh thứ 2 (cùng vị trí: cụm đứng trước trong list được chọn)
+COMMAND_PHRASES = (WRITE_COMMAND_PHRASES + CHECK_ORDER_PHRASES + LIST_PRODUCT_PHRASES
+                   + [['xac', 'nhan'], ['huy', 'don'], ['goi', 'y', 'gia'], ['bao', 'gia'], ['tim', 'san', 'pham']])
+
+
+class FastIntentParser:
+    """
+    Nhận diện nhanh các lệnh có cấu trúc rõ ràng mà không cần gọi LLM.
+
+    Chỉ trả kết quả khi đủ chắc chắn (mã đơn hợp lệ, tên khách/sản phẩm có
+    trong index local); còn lại trả None để chatbot hỏi LLM như bình thường.
+    """
+
+    def __init__(self, threshold: float = None):
+        self.threshold = settings.FAST_INTENT_THRESHOLD if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._total = 0
+        self._hits = 0
+        self._confidence_sum = 0.0
+        self._by_action: Dict[str, int] = {}
+
+    # ===== TIỆN ÍCH =====
+
+    @staticmethod
+    def _tokenize(message: str) -> Tuple[List[str], List[str]]:
+        """Trả về (token gốc, token đã bỏ dấu) cùng vị trí"""
+        raw = [t.strip('.,;:!?"\'()') for t in message.split()]
+        raw = [t for t in raw if t]
+        folded = [normalize_text(t) for t in raw]
+        return raw, folded
+
+    @staticmethod
+    def _find(folded: List[str], phrases: List[List[str]], start: int = 0) -> Tuple[int, int]:
+        """Tìm cụm từ đầu tiên khớp, trả về (vị trí bắt đầu, vị trí kết thúc) hoặc (-1, -1)"""
+        best = (-1, -1)
+        for phrase in phrases:
+            for i in range(start, len(folded) - len(phrase) + 1):
+                if folded[i:i + len(phrase)] == phrase:
+                    if best[0] < 0 or i < best[0]:
+                        best = (i, i + len(phrase))
+                    break
+        return best
+
+    def _order_codes(self, raw: List[str]) -> List[str]:
+        return [t.upper().replace('-', '') for t in raw if ORDER_CODE.match(t)]
+
+    @staticmethod
+    def _customer_exists(name: str) -> bool:
+        from backend.services.customer_index import customer_index
+        if not settings.CUSTOMER_INDEX_ENABLED:
+            return False
+        try:
+            return bool(customer_index.lookup(name))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _product_exists(name: str) -> bool:
+        from backend.services.catalog_cache import product_catalog
+        if not settings.CATALOG_ENABLED:
+            return False
+        try:
+            return bool(product_catalog.match(name, limit=1))
+        except Exception:
+            return False
+
+    def _split_customer(self, raw: List[str], folded: List[str], start: int) -> Tuple[int, Optional[str]]:
+        """Tách tên khách sau 'khách'/'của' -> (vị trí marker, tên khách)"""
+        marker_start, marker_end = self._find(folded, CUSTOMER_MARKERS, start)
+        if marker_start < 0:
+            return -1, None
+        name = ' '.join(raw[marker_end:]).strip()
+        return marker_start, name or None
+
+    def _is_compound(self, message: str, folded: List[str]) -> bool:
+        """Câu có nhiều yêu cầu (liên từ, dấu liệt kê hoặc cụm lệnh thứ 2 giữa câu)"""
+        if any(sep in message for sep in LIST_SEPARATORS) or any(t in CONJUNCTIONS for t in folded):
+            return True
+        start, end = self._find(folded, COMMAND_PHRASES)
+        return self._find(folded, COMMAND_PHRASES, end if start == 0 else 1)[0] >= 0
+
+    # ===== CÁC LUẬT =====
+
+    def _match_order_command(self, raw, folded) -> Optional[Tuple[dict, float]]:
+        codes = self._order_codes(raw)
+        if len(codes) != 1 or self._find(folded, NEGATIONS)[0] >= 0:
+            return None
+
+        # Lệnh ghi: động từ phải đứng đầu câu và chỉ có 1 loại lệnh
+        # ("Xác nhận hủy SO001", "Hủy xác nhận SO001", "Khách đồng ý hủy SO001" -> để LLM hiểu)
+        confirm = self._find(folded, CONFIRM_PHRASES)[0]
+        cancel = self._find(folded, CANCEL_PHRASES)[0]
+        if confirm >= 0 and cancel >= 0:
+            return None
+        if confirm == 0:
+            return {"action": "confirm_quotation", "order_name": codes[0]}, 0.95
+        if cancel == 0:
+            return {"action": "cancel_order", "order_name": codes[0]}, 0.95
+        return None
+
+    def _match_check_orders(self, raw, folded) -> Optional[Tuple[dict, float]]:
+        start, end = self._find(folded, CHECK_ORDER_PHRASES)
+        if start != 0 or self._order_codes(raw):
+            return None
+
+        marker, customer = self._split_customer(raw, folded, end)
+        if marker < 0:
+            # Không nhắc khách hàng: phần còn lại chỉ được là từ đệm (VD: "Xem đơn hàng gần đây")
+            if any(t not in ORDER_FILLER_WORDS for t in folded[end:]):
+                return None
+            return {"action": "check_orders", "customer": None}, 0.9
+
+        if not customer or not self._customer_exists(customer):
+            return None
+        return {"action": "check_orders", "customer": customer}, 0.9
+
+    def _match_list_products(self, raw, folded) -> Optional[Tuple[dict, float]]:
+        start, end = self._find(folded, LIST_PRODUCT_PHRASES)
+        if start == 0 and end == len(folded):
+            return {"action": "list_products", "keyword": None}, 0.95
+
+        start, end = self._find(folded, SEARCH_PRODUCT_PHRASES)
+        if start != 0 or end >= len(folded):
+            return None
+        keyword = ' '.join(raw[end:])
+        if not self._product_exists(keyword):
+            return None
+        return {"action": "list_products", "keyword": keyword}, 0.85
+
+    def _match_price(self, raw, folded) -> Optional[Tuple[dict, float]]:
+        start, end = self._find(folded, PRICE_PHRASES)
+        if start != 0 or end >= len(folded):
+            return None
+
+        marker = -1
+        customer = None
+        cho = self._find(folded, [['cho']], end)[0]
+        if cho >= 0:
+            marker, customer = self._split_customer(raw, folded, cho)
+            if marker < 0:
+                customer = ' '.join(raw[cho + 1:]).strip() or None
+            marker = cho
+
+        product_tokens = raw[end:marker if marker >= 0 else len(raw)]
+        product_folded = folded[end:marker if marker >= 0 else len(folded)]
+
+        # Số lượng: "giá 15 chiếc iPhone"
+        qty = 1
+        if product_folded and NUMBER.match(product_folded[0]):
+            qty = int(product_folded[0])
+            product_tokens, product_folded = product_tokens[1:], product_folded[1:]
+            while product_folded and product_folded[0] in UNIT_WORDS:
+                product_tokens, product_folded = product_tokens[1:], product_folded[1:]
+
+        product = ' '.join(product_tokens).strip()
+        if not product or not self._product_exists(product):
+            return None
+        if customer and not self._customer_exists(customer):
+            return None
+
+        intent = {"action": "suggest_price", "product": product, "customer": customer, "qty": qty}
+        return intent, 0.9 if customer else 0.85
+
+    # ===== API =====
+
+    def parse(self, message: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Thử nhận diện lệnh mà không cần LLM
+
+        Returns:
+            (intent, confidence) nếu đủ chắc chắn, ngược lại None
+        """
+        raw, folded = self._tokenize(message or '')
+        result = None
+        if folded and len(folded) <= 20 and not self._is_compound(message, folded):
+            for rule in (self._match_order_command, self._match_check_orders,
+                         self._match_list_products, self._match_price):
+                result = rule(raw, folded)
+                if result:
+                    break
+
+        if result and result[1] < self.threshold:
+            result = None
+
+        with self._lock:
+            self._total += 1
+            if result:
+                self._hits += 1
+                self._confidence_sum += result[1]
+                action = result[0]['action']
+                self._by_action[action] = self._by_action.get(action, 0) + 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Tỉ lệ lệnh đi đường tắt (không gọi LLM) và độ tin cậy trung bình"""
+        return {
+            'messages': self._total,
+            'fast_path_hits': self._hits,
+            'hit_rate': round(self._hits / self._total, 4) if self._total else 0.0,
+            'avg_confidence': round(self._confidence_sum / self._hits, 3) if self._hits else 0.0,
+            'by_action': dict(self._by_action),
+            'threshold': self.threshold,
+        }
+
+
+# Singleton instance
+fast_intent_parser = FastIntentParser()
@@ -0,0 +1,151 @@
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+from backend.config import settings
+
+# Nhận diện thực thể trong câu trả lời của bot
+ORDER_CODE = re.compile(r'\bS[O]?\d{3,}\b')
+FIELD_LINE = re.compile(r'^(Mã báo giá|Mã đơn|Khách hàng|Sản phẩm|Tổng tiền|Trạng thái|Giá niêm yết|Giá sau thuế[^:]*|Giá ưu đãi|Giá bán|Giá điều chỉnh|Tổng thanh toán):\s*(.+)$')
+ORDER_LINE = re.compile(r'^•\s*(\S+)\s+-\s+(.+?)\s+-\s+(.+)$')
+PRODUCT_LINE = re.compile(r'^(?:-|\d+\.)\s*(.+?)\s+-\s+(?:Giá:\s*)?([\d,]+) VNĐ')
+
+# Mỗi message tốn thêm vài token cho role/phân tách
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (~4 byte UTF-8/token, tiếng Việt có dấu tốn hơn tiếng Anh)"""
+    if not text:
+        return 0
+    return len(text.encode('utf-8')) // 4 + 1
+
+
+class HistoryManager:
+    """
+    Cửa sổ hội thoại theo ngân sách token.
+
+    - System prompt luôn đứng đầu và không đổi (prefix ổn định -> provider cache được)
+    - Câu trả lời dài của bot (danh sách đơn, bảng giá...) được rút gọn thành
+      các dữ kiện (mã đơn, khách, tổng tiền) trước khi gửi lại cho LLM
+    - Vượt ngân sách thì bỏ các tin nhắn cũ nhất
+    """
+
+    def __init__(self, budget: int = None, compact_chars: int = None, max_facts: int = 8):
+        self.budget = settings.HISTORY_TOKEN_BUDGET if budget is None else budget
+        self.compact_chars = settings.HISTORY_COMPACT_CHARS if compact_chars is None else compact_chars
+        self.max_facts = max_facts
+        self._lock = threading.Lock()
+        self._turns = 0
+        self._prompt_tokens = 0
+        self._saved_tokens = 0
+        self._compacted = 0
+        self._dropped = 0
+
+    # ===== RÚT GỌN =====
+
+    def compact_reply(self, content: str) -> str:
+        """Rút gọn output của tool thành 1 dòng dữ kiện (giữ nguyên nếu đã ngắn)"""
+        if not content or len(content) <= self.compact_chars:
+            return content
+
+        lines = [l.strip() for l in content.splitlines() if l.strip()]
+        header = lines[0].rstrip(':')
+        facts = []
+        items = []
+        for line in lines[1:]:
+            field = FIELD_LINE.match(line)
+            if field:
+                facts.append(f"{field.group(1)}: {field.group(2)}")
+                continue
+            order = ORDER_LINE.match(line)
+            if order:
+                items.append(f"{order.group(1)} ({order.group(2)}, {order.group(3)})")
+                continue
+            product = PRODUCT_LINE.match(line)
+            if product:
+                items.append(f"{product.group(1)} ({product.group(2)} VNĐ)")
+
+        if not facts and not items:
+            # Không nhận ra cấu trúc: giữ phần đầu + các mã đơn được nhắc tới
+            codes = list(dict.fromkeys(ORDER_CODE.findall(content)))
+            summary = content[:self.compact_chars].rstrip() + '…'
+            if codes:
+                summary += f" [Mã: {', '.join(codes[:self.max_facts])}]"
+            return summary
+
+        parts = [header]
+        parts += facts
+        if items:
+            more = f" (+{len(items) - self.max_facts} khác)" if len(items) > self.max_facts else ""
+            parts.append('; '.join(items[:self.max_facts]) + more)
+        return "[Tóm tắt] " + ' | '.join(parts)
+
+    # ===== XÂY DỰNG PROMPT =====
+
+    def build(self, system_prompt: str, history: List[dict], message: str) -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        Xây dựng messages gửi cho AI trong ngân sách token
+
+        Returns:
+            Tuple[list, dict]: (messages, thống kê token của lượt này)
+        """
+        turns = []
+        raw_tokens = 0
+        compacted = 0
+        for msg in history or []:
+            role = "assistant" if msg.get('role') == "bot" else "user"
+            content = msg.get('content') or ''
+            raw_tokens += estimate_tokens(content) + MESSAGE_OVERHEAD
+            if role == "assistant":
+                short = self.compact_reply(content)
+                if short != content:
+                    compacted += 1
+                    content = short
+            turns.append({"role": role, "content": content})
+
+        # Bỏ tin nhắn cũ nhất cho tới khi vừa ngân sách
+        costs = [estimate_tokens(t['content']) + MESSAGE_OVERHEAD for t in turns]
+        history_tokens = sum(costs)
+        dropped = 0
+        while turns and history_tokens > self.budget:
+            history_tokens -= costs.pop(0)
+            turns.pop(0)
+            dropped += 1
+
+        system_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD
+        message_tokens = estimate_tokens(message) + MESSAGE_OVERHEAD
+        messages = [{"role": "system", "content": system_prompt}] + turns + [{"role": "user", "content": message}]
+
+        usage = {
+            'system_tokens': system_tokens,
+            'history_tokens': history_tokens,
+            'message_tokens': message_tokens,
+            'prompt_tokens_est': system_tokens + history_tokens + message_tokens,
+            'history_messages': len(history or []),
+            'history_kept': len(turns),
+            'compacted': compacted,
+            'saved_tokens': max(raw_tokens - history_tokens, 0),
+        }
+
+        with self._lock:
+            self._turns += 1
+            self._prompt_tokens += usage['prompt_tokens_est']
+            self._saved_tokens += usage['saved_tokens']
+            self._compacted += compacted
+            self._dropped += dropped
+        return messages, usage
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'turns': self._turns,
+            'avg_prompt_tokens_est': round(self._prompt_tokens / self._turns, 1) if self._turns else 0.0,
+            'saved_tokens': self._saved_tokens,
+            'compacted_replies': self._compacted,
+            'dropped_messages': self._dropped,
+            'budget': self.budget,
+        }
+
+
+# Singleton instance
+history_manager = HistoryManager()
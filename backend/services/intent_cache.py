@@ -0,0 +1,180 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import settings
+from backend.utils.formatter import normalize_text
+from backend.utils.metrics import registry
+
+INTENT_CACHE_REQUESTS = registry.counter('intent_cache_requests_total', 'Tra cứu cache intent LLM', ['result'])
+INTENT_CACHE_SAVED = registry.counter('intent_cache_saved_seconds_total', 'Thời gian gọi LLM ước tính tiết kiệm nhờ cache intent')
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Phiên bản system prompt = hash nội dung (sửa prompt -> cache cũ tự hết hiệu lực)"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:12]
+
+
+class SQLiteIntentBackend:
+    """Lưu intent đã cache xuống SQLite để giữ qua các lần khởi động lại"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS intent_cache ("
+                "cache_key TEXT PRIMARY KEY, intent TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def load(self, cache_key: str) -> Optional[Tuple[dict, float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT intent, latency, created_at FROM intent_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1], row[2]) if row else None
+
+    def save(self, cache_key: str, intent: dict, latency: float, created_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO intent_cache (cache_key, intent, latency, created_at) VALUES (?, ?, ?, ?)",
+                (cache_key, json.dumps(intent, ensure_ascii=False), latency, created_at)
+            )
+            self._conn.commit()
+
+    def delete(self, cache_key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM intent_cache WHERE cache_key = ?", (cache_key,))
+            self._conn.commit()
+
+    def purge(self, older_than: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM intent_cache WHERE created_at < ?", (older_than,))
+            self._conn.commit()
+
+
+class IntentCache:
+    """
+    Cache intent JSON do LLM phân tích (chỉ intent, không bao giờ cache kết quả thực thi action).
+
+    - Key: tin nhắn đã chuẩn hóa (bỏ dấu, chữ thường, gộp khoảng trắng) + hash ngữ cảnh gần đây
+      (thực thể của phiên) + model + phiên bản system prompt
+    - LRU trong bộ nhớ + TTL; backend SQLite tùy chọn (INTENT_CACHE_DB_PATH) để giữ qua restart
+    - Thời gian tiết kiệm = độ trễ LLM đã đo khi phân tích lần đầu của entry được hit
+    """
+
+    def __init__(self, capacity: int = None, ttl: float = None, backend=None, enabled: bool = None):
+        self.capacity = settings.INTENT_CACHE_SIZE if capacity is None else capacity
+        self.ttl = settings.INTENT_CACHE_TTL if ttl is None else ttl
+        self.enabled = settings.INTENT_CACHE_ENABLED if enabled is None else enabled
+        self.backend = backend
+        # key -> (intent, độ trễ LLM lúc phân tích, thời điểm tạo)
+        self._entries: "OrderedDict[str, Tuple[dict, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._backend_hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._saved_seconds = 0.0
+
+    @staticmethod
+    def key(message: str, context: Any, model: str, version: str) -> str:
+        """Key cache: hash của (tin nhắn chuẩn hóa, ngữ cảnh, model, phiên bản prompt)"""
+        context_hash = hashlib.sha256(
+            json.dumps(context, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        raw = json.dumps([normalize_text(message), context_hash, model, version], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _remember(self, cache_key: str, entry: Tuple[dict, float, float]):
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, cache_key: str) -> Optional[dict]:
+        """Intent đã cache (bản sao) hoặc None"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            from_backend = False
+            if entry is None and self.backend:
+                entry = self.backend.load(cache_key)
+                from_backend = entry is not None
+            if entry is not None and now - entry[2] > self.ttl:
+                self._entries.pop(cache_key, None)
+                if self.backend:
+                    self.backend.delete(cache_key)
+                self._expired += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                INTENT_CACHE_REQUESTS.inc(result='miss')
+                return None
+
+            self._remember(cache_key, entry)
+            self._hits += 1
+            self._backend_hits += from_backend
+            self._saved_seconds += entry[1]
+        INTENT_CACHE_REQUESTS.inc(result='hit')
+        INTENT_CACHE_SAVED.inc(entry[1])
+        # Bản sao: xử lý action có thể sửa dict intent
+        return json.loads(json.dumps(entry[0]))
+
+    def put(self, cache_key: str, intent: dict, latency: float):
+        """Lưu intent vừa phân tích (latency = thời gian gọi LLM, dùng để tính thời gian tiết kiệm)"""
+        if not self.enabled or not isinstance(intent, dict):
+            return
+        entry = (json.loads(json.dumps(intent)), latency, time.time())
+        with self._lock:
+            self._remember(cache_key, entry)
+            if self.backend:
+                self.backend.save(cache_key, *entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.backend:
+                self.backend.purge(time.time() + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            'enabled': self.enabled,
+            'entries_in_memory': len(self._entries),
+            'capacity': self.capacity,
+            'ttl_seconds': self.ttl,
+            'hits': self._hits,
+            'backend_hits': self._backend_hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+            'expired': self._expired,
+            'evictions': self._evictions,
+            'saved_seconds': round(self._saved_seconds, 3),
+            'avg_saved_ms': round(self._saved_seconds / self._hits * 1000, 1) if self._hits else 0.0,
+            'backend': type(self.backend).__name__ if self.backend else None,
+        }
+
+
+def create_intent_cache() -> IntentCache:
+    """Tạo cache theo cấu hình (INTENT_CACHE_DB_PATH rỗng -> chỉ giữ trong bộ nhớ)"""
+    backend = SQLiteIntentBackend(settings.INTENT_CACHE_DB_PATH) if settings.INTENT_CACHE_DB_PATH else None
+    if backend:
+        # Dọn entry hết hạn từ lần chạy trước
+        backend.purge(time.time() - settings.INTENT_CACHE_TTL)
+    return IntentCache(backend=backend)
+
+
+# Singleton instance
+intent_cache = create_intent_cache()
@@ -0,0 +1,345 @@
+import asyncio
+import json
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from backend.config import settings
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.metrics import registry
+
+
+class StreamInterrupted(Exception):
+    """Stream LLM đứt sau khi đã nhận chunk (lỗi mạng/backend, SDK không bọc thành APIConnectionError)"""
+
+
+def transient_errors() -> tuple:
+    """
+    Lỗi tạm thời -> thử lại (lỗi 4xx khác như sai key/sai request thì không).
+    openai import lười: mất ~0.5s, không để chặn lúc import app.
+    """
+    import openai
+
+    return (
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+        asyncio.TimeoutError,
+        StreamInterrupted,
+    )
+
+
+LLM_SECONDS = registry.histogram('llm_request_duration_seconds', 'Độ trễ request LLM', ['model', 'kind'])
+LLM_ERRORS = registry.counter('llm_errors_total', 'Số request LLM lỗi (sau khi hết retry)', ['model', 'error'])
+LLM_RETRIES = registry.counter('llm_retries_total', 'Số lần retry request LLM', ['model'])
+LLM_TOKENS = registry.counter('llm_tokens_total', 'Số token LLM đã dùng', ['model', 'type'])
+
+
+class LatencyHistogram:
+    """Histogram độ trễ (bucket cố định, ms) + mẫu gần nhất để tính percentile"""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self, window: int = 500):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=window)
+        self.total = 0
+        self.sum_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.samples.append(ms)
+        self.total += 1
+        self.sum_ms += ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentile (ms) trên cửa sổ mẫu gần nhất, None nếu chưa có mẫu"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {f"le_{b}": c for b, c in zip(self.BUCKETS_MS, self.counts)}
+        buckets['le_inf'] = self.counts[-1]
+        return {
+            'count': self.total,
+            'avg_ms': round(self.sum_ms / self.total, 1) if self.total else 0.0,
+            'p50_ms': round(self.percentile(50), 1) if self.samples else None,
+            'p95_ms': round(self.percentile(95), 1) if self.samples else None,
+            'p99_ms': round(self.percentile(99), 1) if self.samples else None,
+            'buckets': buckets,
+        }
+
+
+class LLMService:
+    """
+    Lớp gọi LLM bất đồng bộ (AsyncOpenAI, dùng chung 1 pool HTTP keep-alive).
+
+    - Deadline cho mỗi request (LLM_TIMEOUT)
+    - Retry có jitter với lỗi tạm thời (timeout, mất kết nối, 429, 5xx)
+    - Hedged request (tùy chọn): nếu request đầu chưa xong sau p95 độ trễ
+      thì gửi thêm 1 bản sao, lấy kết quả về trước
+    - Histogram độ trễ theo model
+    """
+
+    def __init__(self, base_url: str = None, api_key: str = None, model: str = None,
+                 timeout: float = None, max_retries: int = None, hedge_enabled: bool = None,
+                 hedge_min_delay: float = None, pool_size: int = None,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.base_url = base_url or settings.OPENAI_BASE_URL
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.model = model or settings.OPENAI_MODEL
+        self.timeout = settings.LLM_TIMEOUT if timeout is None else timeout
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge_enabled = settings.LLM_HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+        self.hedge_min_delay = settings.LLM_HEDGE_MIN_DELAY if hedge_min_delay is None else hedge_min_delay
+        self.pool_size = settings.LLM_POOL_SIZE if pool_size is None else pool_size
+        self.retry_base_delay = 0.25
+        self.hedge_min_samples = 20
+        self._transport = transport
+        self.breaker = CircuitBreaker(
+            'llm', window=settings.BREAKER_WINDOW, min_calls=settings.BREAKER_MIN_CALLS,
+            failure_ratio=settings.BREAKER_FAILURE_RATIO, slow_call_seconds=settings.LLM_SLOW_CALL,
+            slow_ratio=settings.BREAKER_SLOW_RATIO, open_seconds=settings.BREAKER_OPEN_SECONDS,
+            # Lỗi 4xx (sai request/key) không phải do backend quá tải
+            is_failure=lambda error: isinstance(error, transient_errors())
+        )
+
+        self._client: Optional['AsyncOpenAI'] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+        # Thống kê
+        self._calls = 0
+        self._errors = 0
+        self._retries = 0
+        self._timeouts = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    @staticmethod
+    def preload():
+        """Import SDK openai trước (warmup nền lúc khởi động)"""
+        transient_errors()
+
+    @property
+    def client(self) -> 'AsyncOpenAI':
+        """AsyncOpenAI dùng chung (tạo lần đầu khi cần, tạo lại nếu event loop đã đổi)"""
+        import openai
+        from openai import AsyncOpenAI
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=self.timeout,
+                transport=self._transport
+            )
+            self._client = AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, timeout=self.timeout,
+                max_retries=0, http_client=http_client
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+
+    def histogram(self, model: str) -> LatencyHistogram:
+        if model not in self._histograms:
+            self._histograms[model] = LatencyHistogram()
+        return self._histograms[model]
+
+    # ===== RETRY / HEDGE =====
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Thời gian chờ trước khi gửi request dự phòng (p95 của model), None = không hedge"""
+        if not self.hedge_enabled:
+            return None
+        histogram = self.histogram(model)
+        if len(histogram.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, histogram.percentile(95) / 1000)
+
+    async def _attempt(self, model: str, call: Callable):
+        """1 lần gọi có deadline, ghi độ trễ vào histogram"""
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise
+        elapsed = time.perf_counter() - start
+        self.histogram(model).observe(elapsed)
+        name, _, kind = model.partition(':')
+        LLM_SECONDS.observe(elapsed, model=name, kind=kind or 'complete')
+        return result
+
+    async def _hedged(self, model: str, call: Callable):
+        """Gửi request; quá p95 mà chưa xong thì gửi thêm 1 bản, lấy kết quả thành công đầu tiên"""
+        delay = self._hedge_delay(model)
+        primary = asyncio.ensure_future(self._attempt(model, call))
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._hedges += 1
+        backup = asyncio.ensure_future(self._attempt(model, call))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _with_retries(self, model: str, call: Callable, hedge: bool = True, consume: Callable = None):
+        """
+        Gọi có retry; cả chuỗi retry tính là 1 lần gọi với circuit breaker.
+        consume: coroutine đọc tiếp kết quả (VD stream) -> lỗi lúc đọc cũng tính vào breaker
+        """
+        self.breaker.allow()
+        start = time.perf_counter()
+        try:
+            result = await self._retry_loop(model, call, hedge)
+            if consume is not None:
+                result = await consume(result)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.breaker.record(time.perf_counter() - start, e)
+            raise
+        self.breaker.record(time.perf_counter() - start)
+        return result
+
+    async def _retry_loop(self, model: str, call: Callable, hedge: bool):
+        self._calls += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                if hedge:
+                    return await self._hedged(model, call)
+                return await self._attempt(model, call)
+            except transient_errors() as e:
+                if attempt >= self.max_retries:
+                    self._errors += 1
+                    LLM_ERRORS.inc(model=model.partition(':')[0], error=type(e).__name__)
+                    raise
+                self._retries += 1
+                LLM_RETRIES.inc(model=model.partition(':')[0])
+                backoff = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"DEBUG - LLM transient error ({type(e).__name__}), retry {attempt + 1} sau {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+            except Exception as e:
+                self._errors += 1
+                LLM_ERRORS.inc(model=model.partition(':')[0], error=type(e).__name__)
+                raise
+
+    # ===== API =====
+
+    @staticmethod
+    def _record_usage(response, usage: Optional[dict], model: str):
+        if not getattr(response, 'usage', None):
+            return
+        LLM_TOKENS.inc(response.usage.prompt_tokens or 0, model=model, type='prompt')
+        LLM_TOKENS.inc(response.usage.completion_tokens or 0, model=model, type='completion')
+        details = getattr(response.usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) if details is not None else None
+        if cached is not None:
+            LLM_TOKENS.inc(cached, model=model, type='cached')
+        if usage is None:
+            return
+        usage['prompt_tokens'] = response.usage.prompt_tokens
+        usage['completion_tokens'] = response.usage.completion_tokens
+        if cached is not None:
+            usage['cached_tokens'] = cached
+
+    async def complete_json(self, messages: List[dict], usage: dict = None, model: str = None) -> dict:
+        """Gọi LLM ở chế độ JSON object, trả về dict đã parse"""
+        model = model or self.model
+
+        def call():
+            return self.client.chat.completions.create(
+                model=model, messages=messages, response_format={"type": "json_object"}
+            )
+
+        response = await self._with_retries(model, call)
+        self._record_usage(response, usage, model)
+        return json.loads(response.choices[0].message.content)
+
+    async def stream_json(self, messages: List[dict], on_chunk: Callable[[str], None],
+                          usage: dict = None, model: str = None) -> dict:
+        """
+        Gọi LLM dạng stream, đẩy từng đoạn cho on_chunk; trả về dict đã parse.
+        Chỉ retry khi lỗi xảy ra trước khi nhận được chunk đầu tiên (không hedge);
+        lỗi giữa stream vẫn tính vào circuit breaker.
+        """
+        model = model or self.model
+
+        def call():
+            return self.client.chat.completions.create(
+                model=model, messages=messages, response_format={"type": "json_object"}, stream=True,
+                # Chunk cuối mang số token (choices rỗng)
+                stream_options={"include_usage": True}
+            )
+
+        async def consume(stream) -> str:
+            content = []
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, 'usage', None):
+                        self._record_usage(chunk, usage, model)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        content.append(delta)
+                        on_chunk(delta)
+            except Exception as e:
+                self._errors += 1
+                LLM_ERRORS.inc(model=model, error=type(e).__name__)
+                raise StreamInterrupted(f"{type(e).__name__}: {e}") from e
+            return "".join(content)
+
+        start = time.perf_counter()
+        content = await self._with_retries(f"{model}:first_byte", call, hedge=False, consume=consume)
+        elapsed = time.perf_counter() - start
+        self.histogram(f"{model}:stream").observe(elapsed)
+        LLM_SECONDS.observe(elapsed, model=model, kind='stream')
+        return json.loads(content)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'calls': self._calls,
+            'errors': self._errors,
+            'retries': self._retries,
+            'timeouts': self._timeouts,
+            'hedged_requests': self._hedges,
+            'hedge_wins': self._hedge_wins,
+            'breaker': self.breaker.stats(),
+            'latency': {model: h.snapshot() for model, h in self._histograms.items()},
+        }
+
+
+# Singleton instance
+llm_service = LLMService()
@@ -1,12 +1,159 @@
 import odoorpc
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict
 from urllib.parse import urlparse
 from backend.config import settings
+from backend.utils.circuit_breaker import CircuitBreaker
+from backend.utils.metrics import registry
+
+# Danh sách RPC của khối code đang được theo dõi (xem RPCCounter.track)
+_current_tally: ContextVar = ContextVar('odoo_rpc_tally', default=None)
+# Action chatbot đang chạy (xem RPCCounter.attribute)
+_current_action: ContextVar = ContextVar('odoo_rpc_action', default=None)
+
+RPC_TOTAL = registry.counter('odoo_rpc_total', 'Số RPC gửi tới Odoo', ['model', 'method', 'action'])
+RPC_ERRORS = registry.counter('odoo_rpc_errors_total', 'Số RPC tới Odoo bị lỗi', ['model', 'method'])
+RPC_SECONDS = registry.histogram('odoo_rpc_duration_seconds', 'Thời gian mỗi RPC tới Odoo', ['model', 'method'])
+RPC_IN_FLIGHT = registry.gauge('odoo_rpc_in_flight', 'Số RPC tới Odoo đang chạy song song')
+
+
+class RPCCounter:
+    """Đếm + đo thời gian mọi RPC gửi tới Odoo (kể cả lazy load field khi browse)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.seconds = 0.0
+        self.by_method = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            in_flight = self.in_flight
+        RPC_IN_FLIGHT.set(in_flight)
+    
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+            in_flight = self.in_flight
+        RPC_IN_FLIGHT.set(in_flight)
+    
+    def record(self, model: str, method: str, seconds: float = 0.0, error: bool = False):
+        with self._lock:
+            self.total += 1
+            self.seconds += seconds
+            self.by_method[(model, method)] += 1
+        RPC_TOTAL.inc(model=model, method=method, action=_current_action.get() or 'none')
+        RPC_SECONDS.observe(seconds, model=model, method=method)
+        if error:
+            RPC_ERRORS.inc(model=model, method=method)
+        for tally in _current_tally.get() or ():
+            tally.append((model, method, seconds))
+    
+    @contextmanager
+    def track(self):
+        """
+        Theo dõi các RPC trong 1 khối code (dùng cho test/benchmark và header debug)
+        
+        VD:
+            with odoo_service.rpc_counter.track() as calls:
+                order_service.get_sale_orders(limit=10)
+            assert len(calls) <= 3
+        """
+        tally = []
+        # Lồng nhau (VD middleware HTTP bên trong benchmark): RPC được ghi cho mọi khối đang theo dõi
+        token = _current_tally.set((_current_tally.get() or ()) + (tally,))
+        try:
+            yield tally
+        finally:
+            _current_tally.reset(token)
+    
+    @contextmanager
+    def attribute(self, action: str):
+        """Gắn các RPC trong khối code cho 1 action (label 'action' của odoo_rpc_total)"""
+        token = _current_action.set(action)
+        try:
+            yield
+        finally:
+            _current_action.reset(token)
+    
+    @staticmethod
+    def summarize(calls: list) -> str:
+        """Tóm tắt RPC của 1 request (giá trị header X-Odoo-RPC)"""
+        by_method = Counter(f"{model}:{method}" for model, method, _ in calls)
+        total_ms = sum(seconds for _, _, seconds in calls) * 1000
+        parts = [f"count={len(calls)}", f"ms={total_ms:.1f}"]
+        parts += [f"{name}={count}" for name, count in by_method.most_common()]
+        return "; ".join(parts)
+    
+    @staticmethod
+    def _method_label(method: str, args: tuple, kwargs: dict) -> str:
+        """odoorpc browse() đọc field bằng read(..., load='_classic_write') -> tách riêng thành 'browse'"""
+        options = args[1] if len(args) > 1 else kwargs.get('kwargs')
+        if method == 'read' and isinstance(options, dict) and options.get('load') == '_classic_write':
+            return 'browse'
+        return method
+    
+    def stats(self) -> Dict[str, Any]:
+        """Tổng RPC, số RPC đang chạy song song (hiện tại/cao nhất), các method gọi nhiều nhất"""
+        with self._lock:
+            return {
+                'total': self.total,
+                'seconds': round(self.seconds, 3),
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'top_methods': {f"{model}:{method}": count for (model, method), count in self.by_method.most_common(10)},
+            }
+    
+    def wrap(self, func):
+        """Bọc ODOO.execute_kw / ODOO.execute để đếm + đo thời gian"""
+        def counted(model, method, *args, **kwargs):
+            label = self._method_label(method, args, kwargs)
+            self._enter()
+            start = time.perf_counter()
+            error = False
+            try:
+                return func(model, method, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                self._exit()
+                self.record(model, label, time.perf_counter() - start, error)
+        return counted
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """Lỗi nghiệp vụ do Odoo trả về (UserError, ValidationError...) không tính là Odoo gặp sự cố"""
+    return not isinstance(error, odoorpc.error.RPCError)
+
 
 class OdooService:
-    """Service quản lý kết nối Odoo"""
+    """
+    Service quản lý kết nối Odoo
+
+    Service gọi odoorpc đồng bộ trong threadpool (run_in_threadpool/run_concurrently); odoorpc mở
+    1 request HTTP cho mỗi RPC nên N chat đồng thời -> N RPC song song trên cùng 1 phiên đăng nhập
+    (theo dõi bằng rpc_counter.in_flight / odoo_rpc_in_flight).
+    """
     
     _instance = None
     _odoo = None
+    _connect_lock = threading.Lock()
+    rpc_counter = RPCCounter()
+    breaker = CircuitBreaker(
+        'odoo', window=settings.BREAKER_WINDOW, min_calls=settings.BREAKER_MIN_CALLS,
+        failure_ratio=settings.BREAKER_FAILURE_RATIO, slow_call_seconds=settings.ODOO_SLOW_CALL,
+        slow_ratio=settings.BREAKER_SLOW_RATIO, open_seconds=settings.BREAKER_OPEN_SECONDS,
+        is_failure=is_backend_failure
+    )
     
     def __new__(cls):
         """Singleton pattern - Chỉ tạo 1 instance duy nhất"""
@@ -15,12 +162,18 @@ class OdooService:
         return cls._instance
     
     def __init__(self):
-        """Khởi tạo kết nối Odoo"""
-        if self._odoo is None:
-            self._connect()
+        """Không kết nối khi import: đăng nhập lần đầu khi cần (hoặc warmup trong lifespan)"""
     
     def _connect(self):
-        """Kết nối đến Odoo"""
+        """Kết nối đến Odoo (1 thread đăng nhập, các thread khác chờ dùng chung kết nối)"""
+        with self._connect_lock:
+            if self._odoo is not None:
+                return
+            settings.validate()
+            # Odoo đang sập -> không để mọi request chờ timeout đăng nhập
+            self.breaker.call(self._login)
+    
+    def _login(self):
         try:
             parsed_url = urlparse(settings.ODOO_URL)
             odoo_host = parsed_url.hostname or 'localhost'
@@ -32,14 +185,29 @@ class OdooService:
                 odoo_protocol = 'jsonrpc'
                 odoo_port = parsed_url.port or 8069
             
-            self._odoo = odoorpc.ODOO(odoo_host, protocol=odoo_protocol, port=odoo_port)
-            self._odoo.login(settings.ODOO_DB, settings.ODOO_USERNAME, settings.ODOO_PASSWORD)
+            odoo = odoorpc.ODOO(odoo_host, protocol=odoo_protocol, port=odoo_port, timeout=settings.ODOO_RPC_TIMEOUT)
+            odoo.login(settings.ODOO_DB, settings.ODOO_USERNAME, settings.ODOO_PASSWORD)
+            self._instrument(odoo)
+            self._odoo = odoo
             
-            print(f"✅ Đã kết nối Odoo thành công! UID: {self._odoo.env.uid}")
+            print(f"✅ Đã kết nối Odoo thành công! UID: {odoo.env.uid}")
         except Exception as e:
             print(f"❌ Lỗi kết nối Odoo: {e}")
             raise
     
+    def use_connection(self, odoo):
+        """Thay kết nối odoorpc (VD: fake odoorpc khi test/benchmark)"""
+        self._instrument(odoo)
+        self._odoo = odoo
+    
+    def _instrument(self, odoo):
+        """
+        Mọi RPC của odoorpc (model method, browse field load) đều đi qua execute_kw/execute
+        -> đếm/đo thời gian + circuit breaker (breaker mở thì từ chối trước khi gửi)
+        """
+        odoo.execute_kw = self.breaker.wrap(self.rpc_counter.wrap(odoo.execute_kw))
+        odoo.execute = self.breaker.wrap(self.rpc_counter.wrap(odoo.execute))
+    
     @property
     def odoo(self):
         """Trả về Odoo connection"""
@@ -47,6 +215,15 @@ class OdooService:
             self._connect()
         return self._odoo
     
+    @property
+    def connected(self) -> bool:
+        return self._odoo is not None
+    
+    def connect(self):
+        """Đăng nhập Odoo ngay (dùng cho warmup lúc khởi động)"""
+        if self._odoo is None:
+            self._connect()
+    
     def get_model(self, model_name: str):
         """Lấy Odoo model"""
         return self.odoo.env[model_name]
@@ -1,13 +1,137 @@
+from backend.config import settings
 from backend.services.odoo_service import odoo_service
+from backend.services.customer_index import customer_index
 from backend.services.customer_service import customer_service
+from backend.services.order_snapshot import order_snapshots
 from backend.services.product_service import product_service
+from backend.services.result_cache import result_cache
 from backend.utils.formatter import format_order_response, format_currency
+from backend.utils.progress import report_progress
+from backend.utils.concurrency import run_concurrently
+from backend.utils.metrics import registry
+
+LINE_OPS = registry.counter('quotation_line_ops_total', 'Số lệnh dòng báo giá gửi Odoo khi cập nhật', ['op'])
 
 class OrderService:
     """Service quản lý logic đơn hàng"""
     
-    def __init__(self):
-        self.SaleOrder = odoo_service.get_model('sale.order')
+    @property
+    def SaleOrder(self):
+        """Model sale.order (lấy khi dùng, không kết nối Odoo lúc import)"""
+        return odoo_service.get_model('sale.order')
+    
+    def _price_order_lines(self, products: list, quantities: list, partner_id: int):
+        """
+        Gợi ý giá cho tất cả sản phẩm trong đơn.
+        Khách hàng & bảng giá chỉ xác định 1 lần, sản phẩm/tồn kho/thuế đọc theo lô.
+        
+        Returns:
+            Tuple[list, list, dict, str]: (order_lines, pricings, context khách hàng/bảng giá, error_message)
+        """
+        lines = list(zip(products, quantities))
+        context, resolution = run_concurrently(
+            lambda: product_service.get_pricing_context(partner_id),
+            lambda: product_service.resolve_products(lines)
+        )
+        pricings = product_service.price_resolved(lines, resolution, context)
+        
+        order_lines = []
+        for prod_name, qty, pricing in zip(products, quantities, pricings):
+            error = self._line_error(prod_name, pricing)
+            if error:
+                return [], [], context, error
+            
+            # DÙNG SUGGESTED_PRICE TỪ PRICING (QUAN TRỌNG!)
+            order_lines.append((0, 0, {
+                'product_id': pricing['product_id'],
+                'product_uom_qty': qty,
+                'price_unit': pricing['suggested_price'],
+            }))
+        
+        return order_lines, pricings, context, None
+    
+    @staticmethod
+    def _invalidate(partner_id: int, product_ids: list = ()):
+        """Loại kết quả đã cache liên quan tới đơn vừa ghi (danh sách đơn, khách hàng, sản phẩm)"""
+        result_cache.invalidate('orders', f"partner:{partner_id}", *(f"product:{pid}" for pid in product_ids if pid))
+    
+    @staticmethod
+    def _line_error(prod_name: str, pricing: dict):
+        """Thông báo lỗi của 1 dòng (sản phẩm mơ hồ / không tìm thấy / hết hàng), None nếu dòng hợp lệ"""
+        if pricing.get('is_ambiguous'):
+            return f"❌ Sản phẩm '{prod_name}' mơ hồ.\n{pricing['message']}"
+        
+        if not pricing.get('product_id'):
+            return f"❌ Không tìm thấy sản phẩm '{prod_name}'.\n{pricing['message']}"
+        return None
+    
+    def _diff_order_lines(self, existing: list, lines: list, resolution: dict, context: dict,
+                          keep_others: bool = False):
+        """
+        So khớp dòng yêu cầu với dòng có sẵn của báo giá (theo sản phẩm) -> lệnh order_line tối thiểu:
+        
+        - cùng sản phẩm, cùng số lượng: giữ nguyên, không tính lại giá
+        - cùng sản phẩm, khác số lượng: (1, id, vals), tính lại giá
+        - sản phẩm chưa có: (0, 0, vals)
+        - dòng cũ không còn trong yêu cầu: (2, id), trừ khi keep_others
+        
+        Args:
+            existing: dòng của snapshot (order_snapshot)
+            lines: [(tên sản phẩm, số lượng)], resolution: kết quả resolve_products/resolve_product_ids
+        
+        Returns:
+            Tuple[list, list, dict, str]: (commands, details, ops, error_message)
+        """
+        for (prod_name, _), result in zip(lines, resolution['results']):
+            if result:
+                return [], [], {}, self._line_error(prod_name, result)
+        
+        # Ghép theo sản phẩm: mỗi dòng cũ chỉ khớp 1 lần (đơn có thể có 2 dòng cùng sản phẩm)
+        unmatched = {}
+        for line in existing:
+            unmatched.setdefault(line['product_id'], []).append(line)
+        
+        matches = {}
+        changed = {}
+        for idx, product_id in resolution['resolved'].items():
+            candidates = unmatched.get(product_id)
+            line = candidates.pop(0) if candidates else None
+            matches[idx] = line
+            if line is None or line['product_uom_qty'] != lines[idx][1]:
+                changed[idx] = product_id
+        
+        # Chỉ tính giá các dòng thay đổi
+        pricings = product_service.price_resolved(lines, dict(resolution, resolved=changed), context) if changed else []
+        
+        commands, details = [], []
+        ops = {'update': 0, 'create': 0, 'delete': 0}
+        for idx, (prod_name, qty) in enumerate(lines):
+            line = matches[idx]
+            if idx not in changed:
+                details.append(f"  • {line['product_name']} x {qty} - {format_currency(line['price_unit'] * qty)} VNĐ")
+                continue
+            
+            pricing = pricings[idx]
+            error = self._line_error(prod_name, pricing)
+            if error:
+                return [], [], {}, error
+            
+            vals = {'product_uom_qty': qty, 'price_unit': pricing['suggested_price']}
+            if line is None:
+                commands.append((0, 0, dict(vals, product_id=pricing['product_id'])))
+                ops['create'] += 1
+            else:
+                commands.append((1, line['id'], vals))
+                ops['update'] += 1
+            details.append(f"  • {pricing['product_name']} x {qty} - {format_currency(pricing['suggested_price'] * qty)} VNĐ")
+        
+        if not keep_others:
+            for leftover in unmatched.values():
+                for line in leftover:
+                    commands.append((2, line['id']))
+                    ops['delete'] += 1
+        
+        return commands, details, ops, None
     
     def create_quotation(self, customer_name: str, product_name: str, quantity,
                         sales_rep_name: str = "Admin", customer_phone: str = None, 
@@ -46,40 +170,24 @@ class OrderService:
             if len(products) != len(quantities):
                 return f"❌ Số sản phẩm ({len(products)}) và số lượng ({len(quantities)}) không khớp. VD: 'iPhone 15;Samsung' với '2;5'"
             
-            # 3. GỢI Ý GIÁ VÀ TẠO ORDER LINES (GIỐNG MAIN_OLD.PY)
-            order_lines = []
-            product_details = []
-            
-            for idx, prod_name in enumerate(products):
-                qty = quantities[idx]
-                
-                # GỌI SUGGEST_PRICING CHO TỪNG SẢN PHẨM
-                pricing = product_service.suggest_pricing(prod_name, customer_name, qty, customer_phone, customer_email)
-                
-                if pricing.get('is_ambiguous'):
-                    return f"❌ Sản phẩm '{prod_name}' mơ hồ.\n{pricing['message']}"
-                
-                if not pricing.get('product_id'):
-                    return f"❌ Không tìm thấy sản phẩm '{prod_name}'.\n{pricing['message']}"
-                
-                # DÙNG SUGGESTED_PRICE TỪ SUGGEST_PRICING (QUAN TRỌNG!)
-                order_lines.append((0, 0, {
-                    'product_id': pricing['product_id'],
-                    'product_uom_qty': qty,
-                    'price_unit': pricing['suggested_price'],  # ✅ Lấy giá từ suggest_pricing
-                }))
-                
-                product_details.append(f"{pricing['product_name']} x {qty}")
-            
-            # 4. TẠO QUOTATION (DRAFT)
-            SaleOrder = self.SaleOrder
-            order_id = SaleOrder.create({
-                'partner_id': partner_id,
-                'note': f'Báo giá tạo bởi Chatbot AI - Sales Rep: {sales_rep_name}\nGồm {len(products)} sản phẩm',
-                'order_line': order_lines
-            })
+            # 3. GỢI Ý GIÁ VÀ TẠO ORDER LINES (1 LẦN CHO CẢ ĐƠN)
+            order_lines, pricings, context, error = self._price_order_lines(products, quantities, partner_id)
+            if error:
+                return error
+            
+            # 4. TẠO QUOTATION (DRAFT): create + 1 read tổng tiền
+            with odoo_service.rpc_counter.track() as calls:
+                order_id = self.SaleOrder.create({
+                    'partner_id': partner_id,
+                    'note': f'Báo giá tạo bởi Chatbot AI - Sales Rep: {sales_rep_name}\nGồm {len(products)} sản phẩm',
+                    'order_line': order_lines
+                })
+                order = order_snapshots.created(order_id, partner_id, context['partner_name'], pricings, quantities)
+            self._invalidate(partner_id, [p['product_id'] for p in pricings])
             
-            order = SaleOrder.browse(order_id)
+            print(f"DEBUG - Quotation: {order['name']}, Total: {order['amount_total']}, RPC: {len(calls)}")
+            report_progress('order_created', f"📝 Đã tạo báo giá {order['name']}", order_id=order_id,
+                            order_name=order['name'], rpc=len(calls))
             
             # 5. TRẢ VỀ RESPONSE
             return format_order_response(order, "📝 Chờ xác nhận (Draft)", sales_rep_name, is_quotation=True)
@@ -89,26 +197,26 @@ class OrderService:
     def confirm_quotation(self, order_name: str, sales_rep_name: str = "Admin") -> str:
         """Xác nhận báo giá"""
         try:
-            SaleOrder = self.SaleOrder
-            orders = SaleOrder.search([('name', '=', order_name)])
+            # 1 snapshot: đơn + dòng đơn (số RPC cố định)
+            order = order_snapshots.load(order_name)
             
-            if not orders:
+            if not order:
                 return f"❌ Không tìm thấy báo giá '{order_name}'"
             
-            order = SaleOrder.browse(orders[0])
-            
             # Kiểm tra trạng thái
-            if order.state == 'sale':
+            if order['state'] == 'sale':
                 return f"⚠️ Báo giá {order_name} đã được xác nhận trước đó rồi!"
             
-            if order.state == 'cancel':
+            if order['state'] == 'cancel':
                 return f"❌ Báo giá {order_name} đã bị hủy, không thể xác nhận!"
             
-            if order.state not in ['draft', 'sent']:
-                return f"⚠️ Báo giá {order_name} có trạng thái '{order.state}', không thể xác nhận!"
+            if order['state'] not in ['draft', 'sent']:
+                return f"⚠️ Báo giá {order_name} có trạng thái '{order['state']}', không thể xác nhận!"
             
             # XÁC NHẬN QUOTATION → SALE ORDER
-            order.action_confirm()
+            self.SaleOrder.action_confirm([order['id']])
+            self._invalidate(order['partner_id'], [line['product_id'] for line in order['lines']])
+            order_snapshots.refresh_totals(order)
             
             return format_order_response(order, "✅ Đã xác nhận", f"Nhân viên xác nhận: {sales_rep_name}", is_quotation=False)
             
@@ -119,20 +227,17 @@ class OrderService:
                         quantity = None, sales_rep_name: str = "Admin") -> str:
         """Cập nhật báo giá (chỉ khi ở trạng thái draft/sent). Hỗ trợ nhiều sản phẩm với format 'product1;product2' và 'qty1;qty2'"""
         try:
-            SaleOrder = self.SaleOrder
-            orders = SaleOrder.search([('name', '=', order_name)])
+            order = order_snapshots.load(order_name)
             
-            if not orders:
+            if not order:
                 return f"❌ Không tìm thấy báo giá '{order_name}'"
             
-            order = SaleOrder.browse(orders[0])
-            
             # Chỉ cho phép sửa khi còn draft/sent
-            if order.state not in ['draft', 'sent']:
-                return f"⚠️ Chỉ có thể sửa báo giá ở trạng thái Nháp hoặc Đã gửi. Báo giá {order_name} đang ở trạng thái '{order.state}'"
+            if order['state'] not in ['draft', 'sent']:
+                return f"⚠️ Chỉ có thể sửa báo giá ở trạng thái Nháp hoặc Đã gửi. Báo giá {order_name} đang ở trạng thái '{order['state']}'"
             
             # Lấy thông tin khách hàng
-            customer_name = order.partner_id.name
+            partner_id = order['partner_id']
             
             # Parse multiple products và quantities
             products = []
@@ -161,65 +266,62 @@ class OrderService:
             if products and quantities and len(products) != len(quantities):
                 return f"❌ Số sản phẩm ({len(products)}) và số lượng ({len(quantities)}) không khớp. VD đúng: 'iPhone 15;iPhone 14' với số lượng '2;20'"
             
-            # Nếu không có product, chỉ đổi số lượng dòng đầu tiên
-            if not products and quantities and len(quantities) == 1 and order.order_line:
-                order.order_line[0].write({'product_uom_qty': quantities[0]})
-                product_display = f"{order.order_line[0].product_id.name} x {quantities[0]}"
-            
-            # Nếu có products - Xóa tất cả và tạo lại
+            # Nếu không có product, chỉ đổi số lượng dòng đầu tiên (các dòng khác giữ nguyên)
+            if not products and quantities and len(quantities) == 1 and order['lines']:
+                first_line = order['lines'][0]
+                lines = [(first_line['product_name'], quantities[0])]
+                context, resolution = run_concurrently(
+                    lambda: product_service.get_pricing_context(partner_id),
+                    lambda: product_service.resolve_product_ids([first_line['product_id']])
+                )
+                commands, product_details, ops, error = self._diff_order_lines(
+                    order['lines'][:1], lines, resolution, context, keep_others=True
+                )
+            
+            # Nếu có products - So khớp với dòng cũ, chỉ gửi phần thay đổi
             elif products:
-                # Xóa dòng cũ
-                if order.order_line:
-                    order.order_line.unlink()
-                
-                # Thêm từng dòng mới
-                new_lines = []
-                product_details = []
-                
-                for idx, prod_name in enumerate(products):
-                    qty = quantities[idx] if idx < len(quantities) else 1
-                    
-                    pricing = product_service.suggest_pricing(
-                        prod_name, 
-                        customer_name, 
-                        qty
-                    )
-                    
-                    if pricing.get('is_ambiguous'):
-                        return f"❌ Sản phẩm '{prod_name}' mơ hồ.\n{pricing['message']}"
-                    
-                    if not pricing.get('product_id'):
-                        return f"❌ Không tìm thấy sản phẩm '{prod_name}'.\n{pricing['message']}"
-                    
-                    new_lines.append((0, 0, {
-                        'product_id': pricing['product_id'],
-                        'product_uom_qty': qty,
-                        'price_unit': pricing['suggested_price'],
-                    }))
-                    
-                    product_details.append(f"  • {pricing['product_name']} x {qty} - {format_currency(pricing['suggested_price'] * qty)} VNĐ")
-                
-                # Cập nhật order
-                order.write({
-                    'order_line': new_lines,
-                    'note': f"Báo giá cập nhật bởi Chatbot AI - Sales Rep: {sales_rep_name}\nCập nhật {len(products)} sản phẩm"
-                })
-                
-                product_display = "\n".join(product_details)
+                line_quantities = [quantities[idx] if idx < len(quantities) else 1 for idx in range(len(products))]
+                lines = list(zip(products, line_quantities))
+                context, resolution = run_concurrently(
+                    lambda: product_service.get_pricing_context(partner_id),
+                    lambda: product_service.resolve_products(lines)
+                )
+                commands, product_details, ops, error = self._diff_order_lines(
+                    order['lines'], lines, resolution, context
+                )
             else:
                 return "⚠️ Vui lòng cung cấp sản phẩm hoặc số lượng cần thay đổi"
             
-            # Refresh order để lấy giá mới
-            order = SaleOrder.browse(order.id)
+            if error:
+                return error
+            
+            # 1 write cho cả báo giá (lệnh dòng + ghi chú), rồi đọc lại tổng tiền
+            if commands:
+                self.SaleOrder.write([order['id']], {
+                    'order_line': commands,
+                    'note': f"Báo giá cập nhật bởi Chatbot AI - Sales Rep: {sales_rep_name}\nCập nhật {len(lines)} sản phẩm"
+                })
+                touched = [c[2].get('product_id') for c in commands if c[0] == 0]
+                self._invalidate(partner_id, touched + [line['product_id'] for line in order['lines']])
+                order_snapshots.refresh_totals(order, ['amount_total'])
+            for op, count in ops.items():
+                if count:
+                    LINE_OPS.inc(count, op=op)
+            print(f"DEBUG - Update {order_name}: {len(commands)} line ops {ops}")
+            
+            product_display = "\n".join(product_details)
+            changes = (f"🔧 Thay đổi: {ops['update']} dòng sửa, {ops['create']} dòng thêm, {ops['delete']} dòng xóa"
+                       if commands else "🔧 Không có dòng nào thay đổi")
             
             return f"""✅ ĐÃ CẬP NHẬT BÁO GIÁ {order_name}
 
 📋 Thông tin mới:
-Khách hàng: {order.partner_id.name}
+Khách hàng: {order['partner_name']}
 Danh sách sản phẩm:
 {product_display}
+{changes}
 
-💰 Tổng tiền: {format_currency(order.amount_total)} VNĐ
+💰 Tổng tiền: {format_currency(order['amount_total'])} VNĐ
 📝 Cập nhật bởi: {sales_rep_name}"""
             
         except Exception as e:
@@ -262,51 +364,62 @@ Danh sách sản phẩm:
             if len(products) != len(quantities):
                 return f"❌ Số sản phẩm ({len(products)}) và số lượng ({len(quantities)}) không khớp. VD: 'iPhone 15;Samsung' với '2;5'"
             
-            # 3. GỢI Ý GIÁ VÀ TẠO ORDER LINES
-            order_lines = []
-            product_details = []
+            # 3. GỢI Ý GIÁ VÀ TẠO ORDER LINES (1 LẦN CHO CẢ ĐƠN)
+            order_lines, pricings, context, error = self._price_order_lines(products, quantities, partner_id)
+            if error:
+                return error
             
-            for idx, prod_name in enumerate(products):
-                qty = quantities[idx]
-                
-                pricing = product_service.suggest_pricing(prod_name, customer_name, qty, customer_phone, customer_email)
-                
-                if pricing.get('is_ambiguous'):
-                    return f"❌ Sản phẩm '{prod_name}' mơ hồ.\n{pricing['message']}"
-                
-                if not pricing.get('product_id'):
-                    return f"❌ Không tìm thấy sản phẩm '{prod_name}'.\n{pricing['message']}"
-                
-                order_lines.append((0, 0, {
-                    'product_id': pricing['product_id'],
-                    'product_uom_qty': qty,
-                    'price_unit': pricing['suggested_price'],
-                }))
-                
-                product_details.append(f"{pricing['product_name']} x {qty}")
+            for pricing in pricings:
                 print(f"DEBUG - Product: {pricing['product_name']}, List Price: {pricing['base_price']}, Suggested: {pricing['suggested_price']}, Pricelist: {pricing.get('pricelist', 'N/A')}")
             
-            # 4. TẠO VÀ XÁC NHẬN ĐƠN HÀNG
+            # 4. TẠO VÀ XÁC NHẬN ĐƠN HÀNG: create + action_confirm + 1 read tổng tiền
             SaleOrder = self.SaleOrder
-            order_id = SaleOrder.create({
-                'partner_id': partner_id,
-                'note': f'Đơn hàng tạo bởi Chatbot AI - Sales Rep: {sales_rep_name}\nGồm {len(products)} sản phẩm',
-                'order_line': order_lines
-            })
+            with odoo_service.rpc_counter.track() as calls:
+                order_id = SaleOrder.create({
+                    'partner_id': partner_id,
+                    'note': f'Đơn hàng tạo bởi Chatbot AI - Sales Rep: {sales_rep_name}\nGồm {len(products)} sản phẩm',
+                    'order_line': order_lines
+                })
+                SaleOrder.action_confirm([order_id])
+                order = order_snapshots.created(order_id, partner_id, context['partner_name'], pricings, quantities)
+            self._invalidate(partner_id, [p['product_id'] for p in pricings])
             
-            order = SaleOrder.browse(order_id)
-            order.action_confirm()
+            report_progress('order_created', f"📝 Đã tạo và xác nhận đơn {order['name']}", order_id=order_id,
+                            order_name=order['name'], rpc=len(calls))
             
-            print(f"DEBUG - Order: {order.name}, Untaxed: {order.amount_untaxed}, Total: {order.amount_total}")
+            print(f"DEBUG - Order: {order['name']}, Untaxed: {order['amount_untaxed']}, Total: {order['amount_total']}, RPC: {len(calls)}")
             
             return format_order_response(order, "Tạo đơn hàng thành công", sales_rep_name, is_quotation=False)
             
         except Exception as e:
             return f"❌ Lỗi khi tạo đơn hàng: {str(e)}. Vui lòng liên hệ quản trị viên."
     
+    def _partner_names(self, partner_ids: list) -> dict:
+        """Tên khách hàng theo ID: lấy từ index, phần thiếu đọc 1 lần từ Odoo"""
+        names = {}
+        if settings.CUSTOMER_INDEX_ENABLED:
+            for partner_id in set(partner_ids):
+                partner = customer_index.get(partner_id)
+                if partner:
+                    names[partner_id] = partner['name']
+        
+        missing_ids = list(set(partner_ids) - set(names))
+        if missing_ids:
+            Partner = odoo_service.get_model('res.partner')
+            names.update({p['id']: p['name'] for p in Partner.read(missing_ids, ['name'])})
+        return names
+    
     def get_sale_orders(self, customer_name: str = None, limit: int = 5,
                        customer_phone: str = None, customer_email: str = None) -> str:
-        """Tra cứu đơn hàng"""
+        """Tra cứu đơn hàng (qua result cache, mọi action ghi đơn hàng đều loại tag 'orders')"""
+        return result_cache.get_or_compute(
+            'check_orders', (customer_name, limit, customer_phone, customer_email),
+            lambda: self._get_sale_orders(customer_name, limit, customer_phone, customer_email),
+            tags=['orders'], cacheable=lambda reply: not reply.startswith('❌')
+        )
+    
+    def _get_sale_orders(self, customer_name: str = None, limit: int = 5,
+                         customer_phone: str = None, customer_email: str = None) -> str:
         try:
             domain = []
             
@@ -316,11 +429,14 @@ Danh sách sản phẩm:
                     return partner_id
                 domain.append(('partner_id', '=', partner_id))
             
-            # Tìm đơn hàng (không dùng search_read để có thể browse picking_ids)
+            # 1. ĐỌC ĐƠN HÀNG (1 search_read)
             SaleOrder = self.SaleOrder
-            order_ids = SaleOrder.search(domain, limit=limit, order='id desc')
+            orders = SaleOrder.search_read(
+                domain, ['name', 'partner_id', 'amount_total', 'state', 'invoice_status'],
+                limit=limit, order='id desc'
+            )
             
-            if not order_ids:
+            if not orders:
                 return "Không tìm thấy đơn hàng nào."
             
             # Map trạng thái đơn hàng
@@ -348,27 +464,31 @@ Danh sách sản phẩm:
                 'no': 'Không giao'
             }
             
+            # 2. TÊN KHÁCH HÀNG (index local, thiếu thì 1 lần read)
+            partner_names = self._partner_names([o['partner_id'][0] for o in orders if o['partner_id']])
+            
+            # 3. TRẠNG THÁI PHIẾU GIAO HÀNG (1 search_read, gom theo sale_id)
+            Picking = odoo_service.get_model('stock.picking')
+            pickings = Picking.search_read([('sale_id', 'in', [o['id'] for o in orders])], ['sale_id', 'state'])
+            picking_states = {}
+            for pick in pickings:
+                picking_states.setdefault(pick['sale_id'][0], []).append(pick['state'])
+            
             result = []
-            for order_id in order_ids:
-                order = SaleOrder.browse(order_id)
-                
-                # Lấy thông tin sản phẩm
-                products_info = []
-                for line in order.order_line:
-                    products_info.append(f"{line.product_id.name} x {int(line.product_uom_qty)}")
-                
+            for order in orders:
                 # Xác định trạng thái giao hàng
                 delivery_status = 'no'
-                if order.picking_ids:
-                    picking_states = [p.state for p in order.picking_ids]
-                    if all(s == 'done' for s in picking_states):
+                states = picking_states.get(order['id'])
+                if states:
+                    if all(s == 'done' for s in states):
                         delivery_status = 'full'
-                    elif any(s == 'done' for s in picking_states):
+                    elif any(s == 'done' for s in states):
                         delivery_status = 'partial'
                     else:
                         delivery_status = 'pending'
                 
-                order_info = f"• {order.name} - {order.partner_id.name} - {format_currency(order.amount_total)} VNĐ\n  [{state_map.get(order.state, order.state)}] [{invoice_map.get(order.invoice_status, order.invoice_status)}] [{delivery_map.get(delivery_status, delivery_status)}]"
+                customer = partner_names.get(order['partner_id'][0]) if order['partner_id'] else False
+                order_info = f"• {order['name']} - {customer} - {format_currency(order['amount_total'])} VNĐ\n  [{state_map.get(order['state'], order['state'])}] [{invoice_map.get(order['invoice_status'], order['invoice_status'])}] [{delivery_map.get(delivery_status, delivery_status)}]"
                 result.append(order_info)
             
             return "DANH SÁCH ĐƠN HÀNG:\n\n" + "\n\n".join(result)
@@ -379,33 +499,31 @@ Danh sách sản phẩm:
     def cancel_sale_order(self, order_name: str) -> str:
         """Hủy đơn hàng"""
         try:
-            SaleOrder = self.SaleOrder
-            orders = SaleOrder.search([('name', '=', order_name)])
+            # 1. KIỂM TRA TỒN TẠI (1 snapshot: đơn + hóa đơn + phiếu giao hàng)
+            order = order_snapshots.load(order_name, lines=False, documents=True)
             
-            # 1. KIỂM TRA TỒN TẠI
-            if not orders:
+            if not order:
                 return f"❌ Không tìm thấy đơn hàng '{order_name}'"
             
-            order = SaleOrder.browse(orders[0])
-            print(f"DEBUG - Cancel Order: {order.name}, State: {order.state}")
+            print(f"DEBUG - Cancel Order: {order['name']}, State: {order['state']}")
             
             # 2. KIỂM TRA TRẠNG THÁI CƠ BẢN
-            if order.state == 'cancel':
+            if order['state'] == 'cancel':
                 return f"⚠️ Đơn hàng {order_name} đã bị hủy trước đó rồi!"
             
-            if order.state == 'done':
+            if order['state'] == 'done':
                 return f"❌ Không thể hủy đơn hàng {order_name} vì đã hoàn tất (done). Vui lòng liên hệ quản trị viên."
             
             # 3. KIỂM TRA HÓA ĐƠN (INVOICE)
-            if order.invoice_ids:
-                invoice_states = [inv.state for inv in order.invoice_ids]
+            if order['invoices']:
+                invoice_states = [inv['state'] for inv in order['invoices']]
                 
                 # Kiểm tra có hóa đơn đã xác nhận (posted)
                 if 'posted' in invoice_states:
                     invoices_info = []
-                    for inv in order.invoice_ids:
-                        if inv.state == 'posted':
-                            invoices_info.append(f"{inv.name} ({inv.state})")
+                    for inv in order['invoices']:
+                        if inv['state'] == 'posted':
+                            invoices_info.append(f"{inv['name']} ({inv['state']})")
                     
                     return f"""❌ KHÔNG THỂ HỦY ĐƠN HÀNG {order_name}
 
@@ -423,15 +541,15 @@ Lý do: Đã có hóa đơn được xác nhận:
                     print(f"INFO - Order {order_name} has only draft invoices, can proceed to cancel")
             
             # 4. KIỂM TRA PHIẾU GIAO HÀNG (DELIVERY/PICKING)
-            if order.picking_ids:
-                picking_states = [pick.state for pick in order.picking_ids]
+            if order['pickings']:
+                picking_states = [pick['state'] for pick in order['pickings']]
                 
                 # Kiểm tra có phiếu đã giao hàng (done)
                 if 'done' in picking_states:
                     pickings_info = []
-                    for pick in order.picking_ids:
-                        if pick.state == 'done':
-                            pickings_info.append(f"{pick.name} ({pick.state})")
+                    for pick in order['pickings']:
+                        if pick['state'] == 'done':
+                            pickings_info.append(f"{pick['name']} ({pick['state']})")
                     
                     return f"""❌ KHÔNG THỂ HỦY ĐƠN HÀNG {order_name}
 
@@ -446,21 +564,22 @@ Lý do: Đã có phiếu giao hàng hoàn tất:
             
             # 5. THỰC HIỆN HỦY ĐƠN HÀNG
             print(f"DEBUG - All checks passed, proceeding to cancel order {order_name}")
-            order.action_cancel()
+            self.SaleOrder.action_cancel([order['id']])
+            self._invalidate(order['partner_id'])
             
             # 6. XÁC NHẬN ĐÃ HỦY THÀNH CÔNG
-            order_after = SaleOrder.browse(order.id)
-            if order_after.state == 'cancel':
+            state_after = order_snapshots.refresh_totals(dict(order), ['state'])['state']
+            if state_after == 'cancel':
                 return f"""✅ ĐÃ HỦY ĐƠN HÀNG THÀNH CÔNG
 
 Mã đơn: {order_name}
-Khách hàng: {order.partner_id.name}
-Tổng tiền: {format_currency(order.amount_total)} VNĐ
+Khách hàng: {order['partner_name']}
+Tổng tiền: {format_currency(order['amount_total'])} VNĐ
 Trạng thái: Đã hủy (Cancelled)
 
  Tồn kho đã được hoàn lại (nếu đã reserve)"""
             else:
-                return f"⚠️ Lệnh hủy đã thực thi nhưng trạng thái vẫn là '{order_after.state}'. Vui lòng kiểm tra lại trong Odoo."
+                return f"⚠️ Lệnh hủy đã thực thi nhưng trạng thái vẫn là '{state_after}'. Vui lòng kiểm tra lại trong Odoo."
             
         except Exception as e:
             error_msg = str(e)
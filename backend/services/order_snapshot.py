@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+from backend.services.catalog_cache import product_catalog
+from backend.services.odoo_service import odoo_service
+from backend.utils.concurrency import run_concurrently
+from backend.utils.metrics import registry
+
+ORDER_FIELDS = ['name', 'state', 'partner_id', 'amount_untaxed', 'amount_total',
+                'order_line', 'invoice_ids', 'picking_ids']
+LINE_FIELDS = ['product_id', 'product_uom_qty', 'price_unit']
+DOCUMENT_FIELDS = ['name', 'state']
+# Field do server tính sau khi tạo đơn (mã SO, trạng thái, tổng tiền, ID dòng)
+CREATED_FIELDS = ['name', 'state', 'amount_untaxed', 'amount_total', 'order_line']
+
+ORDER_ID_LOOKUPS = registry.counter('order_name_cache_total', 'Tra mã đơn -> ID (hit/miss)', ['result'])
+
+
+class OrderSnapshotLoader:
+    """
+    Đọc trạng thái 1 đơn hàng theo mã (SO...) bằng số RPC cố định thay vì lazy load từng field:
+
+    1. sale.order: read theo ID (nhớ mã -> ID trong LRU) hoặc search_read theo mã
+    2. Song song: dòng đơn, hóa đơn, phiếu giao hàng (mỗi loại 1 read, bỏ qua nếu rỗng)
+
+    Snapshot là dict thuần (không phải odoorpc record) nên kiểm tra trạng thái không tốn RPC.
+    """
+
+    def __init__(self, capacity: int = None):
+        self.capacity = settings.ORDER_NAME_CACHE_SIZE if capacity is None else capacity
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._id_hits = 0
+        self._id_misses = 0
+        self._loads = 0
+
+    # ===== MÃ ĐƠN -> ID =====
+
+    def _cached_id(self, order_name: str) -> Optional[int]:
+        with self._lock:
+            order_id = self._ids.get(order_name)
+            if order_id is not None:
+                self._ids.move_to_end(order_name)
+            return order_id
+
+    def remember(self, order_name: str, order_id: int):
+        """Ghi nhớ mã -> ID (VD: ngay sau khi tạo đơn)"""
+        with self._lock:
+            self._ids[order_name] = order_id
+            self._ids.move_to_end(order_name)
+            while len(self._ids) > self.capacity:
+                self._ids.popitem(last=False)
+
+    def forget(self, order_name: str):
+        with self._lock:
+            self._ids.pop(order_name, None)
+
+    def _read_order(self, order_name: str) -> Optional[dict]:
+        SaleOrder = odoo_service.get_model('sale.order')
+        order_id = self._cached_id(order_name)
+        if order_id is not None:
+            try:
+                rows = SaleOrder.read([order_id], ORDER_FIELDS)
+            except Exception as e:
+                # Đơn đã bị xóa -> tìm lại theo mã
+                print(f"DEBUG - Order {order_name} (#{order_id}) không đọc được: {e}")
+                rows = []
+            if rows and rows[0].get('name') == order_name:
+                self._id_hits += 1
+                ORDER_ID_LOOKUPS.inc(result='hit')
+                return rows[0]
+            self.forget(order_name)
+
+        self._id_misses += 1
+        ORDER_ID_LOOKUPS.inc(result='miss')
+        rows = SaleOrder.search_read([('name', '=', order_name)], ORDER_FIELDS, limit=1)
+        if not rows:
+            return None
+        self.remember(order_name, rows[0]['id'])
+        return rows[0]
+
+    # ===== SNAPSHOT =====
+
+    @staticmethod
+    def _read_many(model: str, ids: List[int], fields: List[str]) -> List[dict]:
+        if not ids:
+            return []
+        return odoo_service.get_model(model).read(list(ids), fields)
+
+    @staticmethod
+    def _product_name(product) -> str:
+        """Tên sản phẩm: ưu tiên catalog (giống product_id.name), không có thì dùng display_name"""
+        if not product:
+            return ''
+        if settings.CATALOG_ENABLED:
+            try:
+                cached = product_catalog.get(product[0])
+                if cached:
+                    return cached['name']
+            except Exception:
+                pass
+        return product[1]
+
+    def load(self, order_name: str, lines: bool = True, documents: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot đơn hàng theo mã, None nếu không có.
+
+        Args:
+            lines: đọc dòng đơn (sản phẩm, số lượng, đơn giá)
+            documents: đọc trạng thái hóa đơn + phiếu giao hàng (dùng khi hủy đơn)
+        """
+        order = self._read_order(order_name)
+        if order is None:
+            return None
+        self._loads += 1
+
+        tasks = [
+            lambda: self._read_many('sale.order.line', order['order_line'], LINE_FIELDS) if lines else [],
+            lambda: self._read_many('account.move', order['invoice_ids'], DOCUMENT_FIELDS) if documents else [],
+            lambda: self._read_many('stock.picking', order['picking_ids'], DOCUMENT_FIELDS) if documents else [],
+        ]
+        line_rows, invoices, pickings = run_concurrently(*tasks)
+
+        partner = order.get('partner_id') or [False, '']
+        return {
+            'id': order['id'],
+            'name': order['name'],
+            'state': order['state'],
+            'partner_id': partner[0],
+            'partner_name': partner[1],
+            'amount_untaxed': order.get('amount_untaxed') or 0.0,
+            'amount_total': order.get('amount_total') or 0.0,
+            'lines': [{
+                'id': row['id'],
+                'product_id': row['product_id'][0] if row.get('product_id') else False,
+                'product_name': self._product_name(row.get('product_id')),
+                'product_uom_qty': row.get('product_uom_qty') or 0.0,
+                'price_unit': row.get('price_unit') or 0.0,
+            } for row in line_rows],
+            'invoices': [{'id': r['id'], 'name': r['name'], 'state': r['state']} for r in invoices],
+            'pickings': [{'id': r['id'], 'name': r['name'], 'state': r['state']} for r in pickings],
+        }
+
+    def created(self, order_id: int, partner_id: int, partner_name: str, pricings: List[dict],
+                quantities: List[int]) -> Dict[str, Any]:
+        """
+        Snapshot cho đơn vừa tạo: dòng đơn dựng từ kết quả tính giá (tên, số lượng, đơn giá),
+        chỉ 1 read cho phần server tính. Dùng sau create/action_confirm thay cho browse.
+        """
+        row = odoo_service.get_model('sale.order').read([order_id], CREATED_FIELDS)[0]
+        self.remember(row['name'], order_id)
+        line_ids = list(row.get('order_line') or [])
+        return {
+            'id': order_id,
+            'name': row['name'],
+            'state': row['state'],
+            'partner_id': partner_id,
+            'partner_name': partner_name,
+            'amount_untaxed': row.get('amount_untaxed') or 0.0,
+            'amount_total': row.get('amount_total') or 0.0,
+            'lines': [{
+                'id': line_ids[idx] if idx < len(line_ids) else False,
+                'product_id': pricing['product_id'],
+                'product_name': pricing['product_name'],
+                'product_uom_qty': qty,
+                'price_unit': pricing['suggested_price'],
+            } for idx, (pricing, qty) in enumerate(zip(pricings, quantities))],
+            'invoices': [],
+            'pickings': [],
+        }
+
+    def refresh_totals(self, snapshot: Dict[str, Any], fields: List[str] = None) -> Dict[str, Any]:
+        """Đọc lại các field do server tính (tổng tiền, trạng thái) sau khi ghi, 1 RPC"""
+        fields = fields or ['state', 'amount_untaxed', 'amount_total']
+        rows = odoo_service.get_model('sale.order').read([snapshot['id']], fields)
+        if rows:
+            snapshot.update({f: rows[0].get(f) for f in fields})
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._id_hits + self._id_misses
+        return {
+            'cached_names': len(self._ids),
+            'capacity': self.capacity,
+            'id_hits': self._id_hits,
+            'id_misses': self._id_misses,
+            'id_hit_ratio': round(self._id_hits / lookups, 4) if lookups else 0.0,
+            'snapshots': self._loads,
+        }
+
+
+# Singleton instance
+order_snapshots = OrderSnapshotLoader()
@@ -0,0 +1,209 @@
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.services.odoo_service import odoo_service
+from backend.services.result_cache import result_cache
+from backend.utils.circuit_breaker import note_stale
+
+ITEM_FIELDS = ['applied_on', 'product_id', 'product_tmpl_id', 'compute_price',
+               'fixed_price', 'percent_price', 'price_discount', 'min_quantity', 'base']
+
+
+class RuleBucket:
+    """Các rule cùng phạm vi, sắp theo min_quantity để tra bằng bisect"""
+
+    def __init__(self, rules: List[dict]):
+        rules = sorted(rules, key=lambda r: r.get('min_quantity') or 0)
+        self.breakpoints = [r.get('min_quantity') or 0 for r in rules]
+        self.rules = rules
+
+    def find(self, quantity: float) -> Optional[dict]:
+        """Rule có min_quantity lớn nhất mà <= quantity"""
+        idx = bisect_right(self.breakpoints, quantity) - 1
+        return self.rules[idx] if idx >= 0 else None
+
+
+class PricelistIndex:
+    """
+    Rule của 1 pricelist đã biên dịch sẵn.
+
+    Thứ tự ưu tiên giữ như logic cũ: sản phẩm (variant) -> template -> global,
+    trong mỗi phạm vi chọn bậc min_quantity cao nhất thỏa số lượng.
+    """
+
+    def __init__(self, pricelist_id: int, items: List[dict], signature: Tuple = None):
+        self.pricelist_id = pricelist_id
+        self.signature = signature
+
+        by_product: Dict[int, List[dict]] = {}
+        by_template: Dict[int, List[dict]] = {}
+        global_rules: List[dict] = []
+        for item in items:
+            if item.get('product_id'):
+                by_product.setdefault(item['product_id'][0], []).append(item)
+            elif item.get('product_tmpl_id'):
+                by_template.setdefault(item['product_tmpl_id'][0], []).append(item)
+            elif item.get('applied_on') == '3_global':
+                global_rules.append(item)
+
+        self.by_product = {k: RuleBucket(v) for k, v in by_product.items()}
+        self.by_template = {k: RuleBucket(v) for k, v in by_template.items()}
+        self.global_bucket = RuleBucket(global_rules) if global_rules else None
+        self.size = len(items)
+
+    def find_rule(self, product_id: int, template_id: Optional[int], quantity: float) -> Optional[dict]:
+        for bucket in (self.by_product.get(product_id),
+                       self.by_template.get(template_id) if template_id else None,
+                       self.global_bucket):
+            if bucket:
+                rule = bucket.find(quantity)
+                if rule:
+                    return rule
+        return None
+
+
+def compute_rule_price(rule: Optional[dict], list_price: float, standard_price: float = 0) -> float:
+    """Tính giá theo rule (fixed / percentage / formula), không có rule -> giá niêm yết"""
+    if not rule:
+        return list_price
+
+    compute_price = rule.get('compute_price', 'fixed')
+    if compute_price == 'fixed':
+        return rule.get('fixed_price', list_price)
+    if compute_price == 'percentage':
+        return list_price * (1 - (rule.get('percent_price') or 0) / 100)
+    if compute_price == 'formula':
+        base_for_formula = standard_price if rule.get('base') == 'standard_price' else list_price
+        return base_for_formula * (1 - (rule.get('price_discount') or 0) / 100)
+    return list_price
+
+
+class PricelistEngine:
+    """
+    Cache rule pricelist: load 1 lần/pricelist, tính giá hoàn toàn local.
+
+    Mỗi PRICELIST_CHECK_INTERVAL giây kiểm tra (count, max write_date) của
+    item để biết pricelist có thay đổi không; trong khoảng đó không tốn RPC nào.
+    """
+
+    def __init__(self, check_interval: float = None):
+        self.check_interval = settings.PRICELIST_CHECK_INTERVAL if check_interval is None else check_interval
+        self._indexes: Dict[int, PricelistIndex] = {}
+        self._checked_at: Dict[int, float] = {}
+        self._default_id = None
+        self._default_checked_at = 0.0
+        self._lock = threading.RLock()
+
+        self._hits = 0
+        self._loads = 0
+        self._checks = 0
+
+    def _signature(self, pricelist_id: int) -> Tuple:
+        PricelistItem = odoo_service.get_model('product.pricelist.item')
+        domain = [('pricelist_id', '=', pricelist_id)]
+        count = PricelistItem.search_count(domain)
+        last = PricelistItem.search_read(domain, ['write_date'], order='write_date desc', limit=1)
+        return (count, last[0]['write_date'] if last else None)
+
+    def _load(self, pricelist_id: int, signature: Tuple = None) -> PricelistIndex:
+        PricelistItem = odoo_service.get_model('product.pricelist.item')
+        items = PricelistItem.search_read([('pricelist_id', '=', pricelist_id)], ITEM_FIELDS)
+        index = PricelistIndex(pricelist_id, items, signature or self._signature(pricelist_id))
+        if pricelist_id in self._indexes:
+            # Rule đổi -> giá/chính sách giá đã cache không còn đúng
+            result_cache.invalidate('pricelists')
+        self._indexes[pricelist_id] = index
+        self._checked_at[pricelist_id] = time.monotonic()
+        self._loads += 1
+        print(f"DEBUG - Pricelist {pricelist_id}: compiled {index.size} rules")
+        return index
+
+    def get_index(self, pricelist_id: int) -> PricelistIndex:
+        """Lấy index đã biên dịch (load/reload khi cần)"""
+        with self._lock:
+            index = self._indexes.get(pricelist_id)
+            if index is None:
+                return self._load(pricelist_id)
+
+            if time.monotonic() - self._checked_at[pricelist_id] >= self.check_interval:
+                self._checks += 1
+                try:
+                    signature = self._signature(pricelist_id)
+                except Exception as e:
+                    print(f"⚠️ Pricelist {pricelist_id}: không kiểm tra được thay đổi ({e}), dùng rule cũ")
+                    note_stale('bảng giá', time.monotonic() - self._checked_at[pricelist_id])
+                    return index
+                if signature != index.signature:
+                    return self._load(pricelist_id, signature)
+                self._checked_at[pricelist_id] = time.monotonic()
+
+            self._hits += 1
+            return index
+
+    def default_pricelist_id(self) -> Optional[int]:
+        """Pricelist mặc định (pricelist active đầu tiên), cache theo check_interval"""
+        with self._lock:
+            if self._default_id is None or time.monotonic() - self._default_checked_at >= self.check_interval:
+                Pricelist = odoo_service.get_model('product.pricelist')
+                try:
+                    default_pricelists = Pricelist.search([('active', '=', True)], limit=1)
+                except Exception:
+                    if self._default_id is None:
+                        raise
+                    note_stale('bảng giá', time.monotonic() - self._default_checked_at)
+                    return self._default_id
+                default_id = default_pricelists[0] if default_pricelists else None
+                if self._default_id is not None and default_id != self._default_id:
+                    result_cache.invalidate('pricelists')
+                self._default_id = default_id
+                self._default_checked_at = time.monotonic()
+            return self._default_id
+
+    def ensure_fresh(self):
+        """Kiểm tra thay đổi các pricelist đã load (nếu quá check_interval) trước khi đọc result cache"""
+        now = time.monotonic()
+        with self._lock:
+            due = [pid for pid, checked_at in self._checked_at.items() if now - checked_at >= self.check_interval]
+        for pricelist_id in due:
+            self.get_index(pricelist_id)
+
+    def compute_price(self, pricelist_id: int, product: dict, quantity: float) -> Tuple[float, Optional[dict]]:
+        """
+        Tính giá cho sản phẩm (dict có list_price, standard_price, product_tmpl_id)
+
+        Returns:
+            Tuple[float, dict]: (giá sau pricelist, rule áp dụng hoặc None)
+        """
+        template = product.get('product_tmpl_id')
+        template_id = template[0] if isinstance(template, (list, tuple)) else template
+        rule = self.get_index(pricelist_id).find_rule(product['id'], template_id, quantity)
+        price = compute_rule_price(rule, product['list_price'], product.get('standard_price') or 0)
+        return price, rule
+
+    def invalidate(self, pricelist_id: int = None):
+        """Xóa cache 1 pricelist (hoặc tất cả)"""
+        with self._lock:
+            result_cache.invalidate('pricelists')
+            if pricelist_id is None:
+                self._indexes.clear()
+                self._checked_at.clear()
+                self._default_id = None
+            else:
+                self._indexes.pop(pricelist_id, None)
+                self._checked_at.pop(pricelist_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pricelists': len(self._indexes),
+            'rules': sum(i.size for i in self._indexes.values()),
+            'hits': self._hits,
+            'loads': self._loads,
+            'change_checks': self._checks,
+        }
+
+
+# Singleton instance
+pricelist_engine = PricelistEngine()
@@ -0,0 +1,258 @@
+import bisect
+import heapq
+import math
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.config import settings
+from backend.utils.formatter import normalize_text
+
+# Điểm = 0.7 * độ phủ từ khóa + 0.3 * tỉ lệ từ của tên sản phẩm được khớp (ưu tiên tên ngắn, sát từ khóa)
+COVERAGE_WEIGHT = 0.7
+PRECISION_WEIGHT = 0.3
+# Từ gõ sai: chỉ nhận từ trong catalog có độ giống trigram >= ngưỡng và không kém từ giống nhất
+# quá FUZZY_SPREAD, tối đa N từ
+TOKEN_MIN_SIMILARITY = 0.5
+FUZZY_SPREAD = 0.1
+MAX_FUZZY_TOKENS = 5
+# Từ khóa là 1 phần của từ trong catalog ('iph' -> 'iphone', 'ip' -> 'ipad', 'phone' -> 'iphone'),
+# như 'ilike' của Odoo: độ giống = BASE + 0.3 * tỉ lệ độ dài; xét tối đa N từ ngắn nhất
+PREFIX_BASE_SIMILARITY = 0.7
+SUBSTRING_BASE_SIMILARITY = 0.6
+MAX_PARTIAL_TOKENS = 50
+
+
+def trigrams(token: str) -> Set[str]:
+    """Trigram của 1 từ, có đệm đầu/cuối (VD 'dien' -> '  d', ' di', 'die', 'ien', 'en ')"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def pick_best(matches: List[Tuple[Any, float]], min_score: float = None, margin: float = None) -> Optional[Any]:
+    """
+    Tự chọn ứng viên đầu khi vượt rõ ràng ứng viên thứ 2, None nếu còn mơ hồ.
+
+    - Chỉ 1 ứng viên đạt ngưỡng khớp PRODUCT_MATCH_MIN_SCORE -> chọn (như 'ilike' trả đúng 1 kết quả)
+    - Trùng khớp tên (điểm 1.0) và ứng viên thứ 2 không trùng khớp -> chọn
+    - Điểm >= min_score và hơn ứng viên thứ 2 ít nhất margin -> chọn
+    """
+    if not matches:
+        return None
+    if sum(score >= settings.PRODUCT_MATCH_MIN_SCORE for _, score in matches) == 1 \
+            and matches[0][1] >= settings.PRODUCT_MATCH_MIN_SCORE:
+        return matches[0][0]
+    min_score = settings.PRODUCT_AUTOPICK_SCORE if min_score is None else min_score
+    margin = settings.PRODUCT_AUTOPICK_MARGIN if margin is None else margin
+    top = matches[0][1]
+    runner_up = matches[1][1] if len(matches) > 1 else 0.0
+    if top >= 1.0 > runner_up:
+        return matches[0][0]
+    if top >= min_score and top - runner_up >= margin:
+        return matches[0][0]
+    return None
+
+
+class ProductNameIndex:
+    """
+    Index tên sản phẩm đã bỏ dấu (normalize_text): 'dien thoai' khớp 'Điện thoại',
+    chịu lỗi gõ nhẹ ('samsng' vẫn khớp 'Samsung').
+
+    - Từ -> tập ID sản phẩm; trigram -> tập từ (chỉ trên từ vựng catalog, nhỏ hơn nhiều so với số sản phẩm)
+    - Từ khóa có trong từ vựng -> khớp chính xác; không có -> các từ giống nhất theo trigram
+      + các từ bắt đầu bằng / chứa từ khóa ('iph', 'ip' -> 'iphone'; từ vựng sắp xếp + bisect)
+    - Ứng viên: giao các tập sản phẩm của từng từ khóa (tập nhỏ nhất trước); rỗng thì nới dần
+      (thiếu 1, 2... từ) tới ngưỡng PRODUCT_MATCH_MIN_COVERAGE
+    - Cập nhật tăng dần: add/remove từng sản phẩm, từ không còn sản phẩm nào bị gỡ khỏi từ vựng
+    """
+
+    def __init__(self, min_coverage: float = None):
+        self.min_coverage = settings.PRODUCT_MATCH_MIN_COVERAGE if min_coverage is None else min_coverage
+
+        self._postings: Dict[str, Set[int]] = {}
+        self._token_grams: Dict[str, Set[str]] = {}
+        # Từ vựng đã sắp xếp (tìm theo tiền tố), dựng lại khi từ vựng đổi
+        self._vocabulary: Optional[List[str]] = None
+        # product_id -> (các từ, tên đã bỏ dấu)
+        self._docs: Dict[int, Tuple[Tuple[str, ...], str]] = {}
+        self._lock = threading.RLock()
+
+        self._queries = 0
+        self._fuzzy_lookups = 0
+
+    # ===== CẬP NHẬT =====
+
+    def _insert(self, product_id: int, folded: str):
+        tokens = tuple(sys.intern(t) for t in dict.fromkeys(folded.split()))
+        self._docs[product_id] = (tokens, folded)
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                self._vocabulary = None
+                for gram in trigrams(token):
+                    self._token_grams.setdefault(gram, set()).add(token)
+            ids.add(product_id)
+
+    def _discard(self, product_id: int):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        for token in doc[0]:
+            ids = self._postings[token]
+            ids.discard(product_id)
+            if not ids:
+                del self._postings[token]
+                self._vocabulary = None
+                for gram in trigrams(token):
+                    tokens = self._token_grams[gram]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._token_grams[gram]
+
+    def add(self, product_id: int, name: str):
+        """Thêm/cập nhật 1 sản phẩm (tên không đổi -> bỏ qua)"""
+        folded = normalize_text(name)
+        with self._lock:
+            doc = self._docs.get(product_id)
+            if doc is not None and doc[1] == folded:
+                return
+            self._discard(product_id)
+            self._insert(product_id, folded)
+
+    def remove(self, product_id: int):
+        """Bỏ 1 sản phẩm khỏi index (ngừng bán/lưu trữ)"""
+        with self._lock:
+            self._discard(product_id)
+
+    def rebuild(self, items: Iterable[Tuple[int, str]]):
+        """Dựng lại toàn bộ từ (product_id, tên)"""
+        with self._lock:
+            self._postings = {}
+            self._token_grams = {}
+            self._vocabulary = None
+            self._docs = {}
+            for product_id, name in items:
+                self._insert(product_id, normalize_text(name))
+
+    # ===== TÌM KIẾM =====
+
+    def _similar_tokens(self, token: str) -> Dict[str, float]:
+        """Từ trong catalog giống từ gõ sai nhất -> {từ: độ giống Dice trigram}"""
+        self._fuzzy_lookups += 1
+        grams = trigrams(token)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._token_grams.get(gram, ()))
+        similar = []
+        for candidate, common in counts.items():
+            # Dice: từ dài L (đệm '  ' + ' ') có L + 1 trigram
+            similarity = 2 * common / (len(grams) + len(trigrams(candidate)))
+            if similarity >= TOKEN_MIN_SIMILARITY:
+                similar.append((similarity, candidate))
+        best = heapq.nlargest(MAX_FUZZY_TOKENS, similar)
+        return {candidate: similarity for similarity, candidate in best if similarity >= best[0][0] - FUZZY_SPREAD}
+
+    def _partial_tokens(self, token: str) -> Dict[str, float]:
+        """Từ trong catalog bắt đầu bằng / chứa từ khóa -> {từ: độ giống}"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, token)
+        end = bisect.bisect_left(vocabulary, token + '\uffff', start)
+        found = {t: PREFIX_BASE_SIMILARITY for t in vocabulary[start:end]}
+
+        # Chứa từ khóa ở giữa: ứng viên = các từ có đủ trigram bên trong của từ khóa
+        if len(token) >= 3:
+            inner = [self._token_grams.get(token[i:i + 3], set()) for i in range(len(token) - 2)]
+            for candidate in set.intersection(*sorted(inner, key=len)):
+                if candidate not in found and token in candidate:
+                    found[candidate] = SUBSTRING_BASE_SIMILARITY
+
+        shortest = heapq.nsmallest(MAX_PARTIAL_TOKENS, found, key=len)
+        return {t: found[t] + 0.3 * len(token) / len(t) for t in shortest}
+
+    def search(self, query: str, limit: int = 10, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Ứng viên xếp hạng [(product_id, điểm 0..1)] theo điểm giảm dần (trùng tên = 1.0).
+
+        Chỉ trả sản phẩm khớp ít nhất min_coverage số từ của từ khóa và điểm >= min_score.
+        """
+        folded = normalize_text(query)
+        query_tokens = list(dict.fromkeys(folded.split()))
+        if not query_tokens:
+            return []
+        with self._lock:
+            self._queries += 1
+            docs = self._docs
+
+            # Mỗi từ khóa -> (độ giống theo từ catalog, None = khớp chính xác; tập sản phẩm)
+            usable = []
+            for token in query_tokens:
+                ids = self._postings.get(token)
+                if ids is not None:
+                    usable.append((None, ids))
+                    continue
+                similar = self._similar_tokens(token)
+                for candidate, similarity in self._partial_tokens(token).items():
+                    similar[candidate] = max(similarity, similar.get(candidate, 0.0))
+                if len(similar) == 1:
+                    usable.append((similar, self._postings[next(iter(similar))]))
+                elif similar:
+                    usable.append((similar, set().union(*(self._postings[t] for t in similar))))
+
+            need = max(1, math.ceil(self.min_coverage * len(query_tokens)))
+            if len(usable) < need:
+                return []
+            usable.sort(key=lambda item: len(item[1]))
+            sets = [ids for _, ids in usable]
+
+            # Khớp đủ mọi từ trước
+            candidates = set.intersection(*sets)
+            required = len(sets)
+            # Ít hơn 2 ứng viên, không trùng tên -> thêm sản phẩm thiếu đúng 1 từ
+            # (cần ứng viên thứ 2 để biết có mơ hồ không); giao trong C, chạy theo tập nhỏ nhất
+            if (len(candidates) < 2 and required > need
+                    and not any(docs[pid][1] == folded for pid in candidates)):
+                required -= 1
+                for skip in range(len(sets)):
+                    candidates |= set.intersection(*(sets[:skip] + sets[skip + 1:]))
+            # Vẫn rỗng -> nới tiếp tới ngưỡng: khớp >= required từ thì chắc chắn nằm trong
+            # 1 trong (len - required + 1) tập nhỏ nhất
+            while not candidates and required > need:
+                required -= 1
+                pool = set().union(*sets[:len(sets) - required + 1])
+                candidates = {pid for pid in pool if sum(pid in ids for ids in sets) >= required}
+
+            scored = []
+            total = len(query_tokens)
+            for product_id in candidates:
+                tokens, name = docs[product_id]
+                matched = 0.0
+                for similar, ids in usable:
+                    if product_id in ids:
+                        matched += 1.0 if similar is None else max(similar.get(t, 0.0) for t in tokens)
+                if name == folded:
+                    score = 1.0
+                else:
+                    # Không trùng tên -> tối đa 0.99 để trùng tên luôn đứng đầu
+                    score = min(0.99, COVERAGE_WEIGHT * matched / total
+                                + PRECISION_WEIGHT * min(1.0, matched / len(tokens)))
+                if score >= min_score:
+                    scored.append((score, -len(name), product_id))
+
+        top = heapq.nlargest(limit, scored) if limit else sorted(scored, reverse=True)
+        return [(product_id, round(score, 4)) for score, _, product_id in top]
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'products': len(self._docs),
+            'tokens': len(self._postings),
+            'trigrams': len(self._token_grams),
+            'queries': self._queries,
+            'fuzzy_lookups': self._fuzzy_lookups,
+        }
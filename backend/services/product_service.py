@@ -1,12 +1,122 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
+from backend.config import settings
 from backend.services.odoo_service import odoo_service
+from backend.services.catalog_cache import product_catalog
+from backend.services.customer_index import customer_index
+from backend.services.pricelist_engine import pricelist_engine
+from backend.services.product_index import pick_best
+from backend.services.result_cache import result_cache
 from backend.utils.formatter import format_currency, format_discount_message
+from backend.utils.progress import report_progress
+from backend.utils.concurrency import run_concurrently
+
+# Field đọc khi liệt kê sản phẩm (kèm taxes_id để tính thuế theo lô)
+PRODUCT_LIST_FIELDS = ['name', 'list_price', 'qty_available', 'taxes_id']
 
 class ProductService:
     """Service quản lý logic sản phẩm"""
     
-    def __init__(self):
-        self.Product = odoo_service.get_model('product.product')
+    @property
+    def Product(self):
+        """Model product.product (lấy khi dùng, không kết nối Odoo lúc import)"""
+        return odoo_service.get_model('product.product')
+    
+    def _find_products(self, keyword: str = None, limit: int = None) -> List[dict]:
+        """Tìm sản phẩm đang bán: ưu tiên catalog trong bộ nhớ, lỗi thì hỏi Odoo"""
+        return self._rank_products(keyword, limit)[0]
+    
+    def _rank_products(self, keyword: str = None, limit: int = None) -> Tuple[List[dict], Optional[int]]:
+        """
+        Tìm sản phẩm đang bán, xếp hạng theo độ giống tên
+        
+        - Catalog: index trigram bỏ dấu ('dien thoai' khớp 'Điện thoại', chịu lỗi gõ nhẹ)
+        - Catalog lỗi/tắt: Odoo 'name ilike'
+        
+        Returns:
+            Tuple[List[dict], Optional[int]]: (sản phẩm, ID tự chọn khi ứng viên đầu vượt rõ ràng, ngược lại None)
+        """
+        if settings.CATALOG_ENABLED:
+            try:
+                if not keyword:
+                    return product_catalog.search(None, limit), None
+                matches = product_catalog.match(keyword, limit)
+                picked = pick_best([(p['id'], score) for p, score in matches])
+                if picked is None:
+                    print(f"DEBUG - Product match '{keyword}': {[(p['name'], score) for p, score in matches[:3]]}")
+                return [p for p, _ in matches], picked
+            except Exception as e:
+                print(f"DEBUG - Catalog unavailable, fallback to Odoo: {e}")
+        
+        domain = [('sale_ok', '=', True)]
+        if keyword:
+            domain.append(('name', 'ilike', keyword))
+        products = self.Product.search_read(domain, PRODUCT_LIST_FIELDS, limit=limit)
+        return products, (products[0]['id'] if len(products) == 1 else None)
+    
+    def resolve_tax_rates(self, products: List[dict]) -> Dict[int, float]:
+        """
+        Lấy thuế suất (thuế đầu tiên) cho nhiều sản phẩm cùng lúc
+        
+        - Sản phẩm đã có 'taxes_id' (từ search_read) -> dùng luôn
+        - Sản phẩm thiếu 'taxes_id' -> 1 lần search_read cho tất cả
+        - Thuế suất account.tax -> 1 lần read
+        
+        Returns:
+            Dict[int, float]: {product_id: tax_rate}
+        """
+        tax_ids_by_product = {p['id']: p['taxes_id'] for p in products if 'taxes_id' in p}
+        
+        missing_ids = [p['id'] for p in products if 'taxes_id' not in p]
+        if missing_ids:
+            rows = self.Product.search_read([('id', 'in', missing_ids)], ['taxes_id'])
+            tax_ids_by_product.update({r['id']: r['taxes_id'] for r in rows})
+        
+        first_tax_ids = {pid: tax_ids[0] for pid, tax_ids in tax_ids_by_product.items() if tax_ids}
+        
+        # Thuế suất đã có trong catalog -> không cần RPC
+        amounts = {}
+        for tax_id in set(first_tax_ids.values()):
+            amount = product_catalog.tax_amount(tax_id) if settings.CATALOG_ENABLED else None
+            if amount is not None:
+                amounts[tax_id] = amount
+        
+        unknown_tax_ids = list(set(first_tax_ids.values()) - set(amounts))
+        if unknown_tax_ids:
+            Tax = odoo_service.get_model('account.tax')
+            taxes = Tax.read(unknown_tax_ids, ['amount'])
+            amounts.update({t['id']: t.get('amount') or 0 for t in taxes})
+        
+        return {p['id']: amounts.get(first_tax_ids.get(p['id']), 0) for p in products}
+    
+    def prices_with_tax(self, products: List[dict]) -> Dict[int, float]:
+        """
+        Giá niêm yết sau thuế cho nhiều sản phẩm
+        
+        - Catalog: 1 phép tính trên mảng NumPy (thuế suất lưu sẵn theo sản phẩm)
+        - Sản phẩm không có trong catalog: resolve_tax_rates (RPC theo lô)
+        
+        Returns:
+            Dict[int, float]: {product_id: giá sau thuế}
+        """
+        prices = {}
+        if settings.CATALOG_ENABLED:
+            try:
+                prices = product_catalog.prices_with_tax([p['id'] for p in products])
+            except Exception as e:
+                print(f"DEBUG - Catalog unavailable, fallback to Odoo: {e}")
+        
+        missing = [p for p in products if p['id'] not in prices]
+        if missing:
+            tax_rates = self.resolve_tax_rates(missing)
+            for p in missing:
+                prices[p['id']] = p['list_price'] * (1 + tax_rates.get(p['id'], 0) / 100)
+        return prices
+    
+    def format_product_lines(self, products: List[dict]) -> List[str]:
+        """Format danh sách sản phẩm kèm giá sau thuế (dùng cho list_products)"""
+        prices = self.prices_with_tax(products)
+        return [f"- {p['name']} - Giá: {format_currency(prices[p['id']])} VNĐ (Kho: {p['qty_available']})"
+                for p in products]
     
     def handle_ambiguous_product(self, product_name: str) -> Tuple[bool, any]:
         """
@@ -18,29 +128,21 @@ class ProductService:
             - is_single=False: result = message (nhiều sản phẩm hoặc không tìm thấy)
         """
         try:
-            products = self.Product.search_read(
-                [('name', 'ilike', product_name), ('sale_ok', '=', True)],
-                ['name', 'list_price', 'qty_available'],
-                limit=15
-            )
+            products, picked = self._rank_products(product_name, limit=15)
             
             if len(products) == 0:
                 return (False, f"❌ Không tìm thấy sản phẩm '{product_name}' trong hệ thống.")
             
-            elif len(products) == 1:
-                return (True, products[0]['id'])
+            elif picked is not None:
+                # Duy nhất 1 sản phẩm / ứng viên đầu vượt rõ ràng
+                return (True, picked)
             
             else:
-                # Nhiều sản phẩm -> Hiển thị danh sách
+                # Mơ hồ -> Hiển thị danh sách (giống nhất trước)
+                prices = self.prices_with_tax(products)
                 product_list = []
                 for i, p in enumerate(products, 1):
-                    product_obj = self.Product.browse(p['id'])
-                    tax_rate = 0
-                    if product_obj.taxes_id:
-                        tax = product_obj.taxes_id[0]
-                        tax_rate = tax.amount if hasattr(tax, 'amount') else 0
-                    
-                    price_with_tax = p['list_price'] * (1 + tax_rate / 100)
+                    price_with_tax = prices[p['id']]
                     stock_status = f"Kho: {p['qty_available']}" if p['qty_available'] > 0 else "⚠️ Hết hàng"
                     product_list.append(
                         f"{i}. {p['name']} - {format_currency(price_with_tax)} VNĐ ({stock_status})"
@@ -57,152 +159,180 @@ class ProductService:
         except Exception as e:
             return (False, f"❌ Lỗi hệ thống: {str(e)}")
     
-    def suggest_pricing(self, product_name: str, customer_name: str = None, 
-                       quantity: int = 1, customer_phone: str = None, 
-                       customer_email: str = None) -> Dict[str, Any]:
+    def get_pricing_context(self, partner_id: int = None) -> Dict[str, Any]:
         """
-        Gợi ý giá chuẩn Odoo + Xử lý sản phẩm mơ hồ
+        Xác định khách hàng + bảng giá 1 lần, dùng lại cho mọi dòng sản phẩm
         
         Returns:
-            dict với các field: is_ambiguous, product_id, product_name, 
-            base_price, suggested_price, price_with_tax, tax_rate, 
-            quantity, pricelist, message
+            dict: partner_id, partner_name, pricelist_id, pricelist_name
         """
-        try:
-            # Import customer_service ở đây để tránh circular import
-            from backend.services.customer_service import customer_service
+        context = {
+            "partner_id": partner_id,
+            "partner_name": None,
+            "pricelist_id": None,
+            "pricelist_name": "Giá niêm yết (Mặc định)"
+        }
+        
+        if partner_id:
+            partner = customer_index.get(partner_id) if settings.CUSTOMER_INDEX_ENABLED else None
+            if partner is None:
+                Partner = odoo_service.get_model('res.partner')
+                partner = Partner.read([partner_id], ['name', 'property_product_pricelist'])[0]
             
-            # 1. VALIDATE SẢN PHẨM
+            context["partner_name"] = partner['name']
+            if partner.get('property_product_pricelist'):
+                context["pricelist_id"], context["pricelist_name"] = partner['property_product_pricelist']
+        
+        # Nếu không có pricelist, dùng pricelist mặc định (đã cache)
+        if not context["pricelist_id"]:
+            context["pricelist_id"] = pricelist_engine.default_pricelist_id()
+        
+        # Nạp sẵn rule pricelist (chạy song song với tra cứu sản phẩm)
+        if context["pricelist_id"]:
+            try:
+                pricelist_engine.get_index(context["pricelist_id"])
+            except Exception as e:
+                print(f"DEBUG - Pricelist preload error: {e}")
+        
+        return context
+    
+    def resolve_customer_context(self, customer_name: str = None, customer_phone: str = None,
+                                 customer_email: str = None) -> Dict[str, Any]:
+        """Tìm khách hàng rồi xác định bảng giá (không tìm thấy -> bảng giá mặc định)"""
+        # Import customer_service ở đây để tránh circular import
+        from backend.services.customer_service import customer_service
+        
+        partner_id = None
+        if customer_name:
+            success, result = customer_service.find_customer(customer_name, customer_phone, customer_email)
+            if success:
+                partner_id = result
+        return self.get_pricing_context(partner_id)
+    
+    def _get_products(self, product_ids: List[int]) -> Dict[int, dict]:
+        """Lấy chi tiết nhiều sản phẩm: catalog trước, phần thiếu đọc 1 lần từ Odoo"""
+        products = {}
+        if settings.CATALOG_ENABLED:
+            try:
+                for product_id in product_ids:
+                    product = product_catalog.get(product_id)
+                    if product:
+                        products[product_id] = product
+            except Exception as e:
+                print(f"DEBUG - Catalog unavailable, fallback to Odoo: {e}")
+        
+        missing_ids = [pid for pid in dict.fromkeys(product_ids) if pid not in products]
+        if missing_ids:
+            rows = self.Product.read(
+                missing_ids,
+                ['name', 'list_price', 'standard_price', 'qty_available', 'taxes_id', 'product_tmpl_id']
+            )
+            products.update({r['id']: r for r in rows})
+        return products
+    
+    @staticmethod
+    def _pricing_error(message: str, is_ambiguous: bool = False, base_price: float = 0) -> Dict[str, Any]:
+        return {
+            "is_ambiguous": is_ambiguous,
+            "product_id": None,
+            "suggested_price": 0,
+            "message": message,
+            "base_price": base_price
+        }
+    
+    def resolve_products(self, lines: List[Tuple[str, int]]) -> Dict[str, Any]:
+        """
+        Tra cứu phần sản phẩm của các dòng (không phụ thuộc khách hàng):
+        xử lý tên mơ hồ (song song giữa các dòng), đọc sản phẩm + thuế theo lô
+        
+        Returns:
+            dict: results (lỗi từng dòng hoặc None), resolved {idx: product_id}, products, tax_rates
+        """
+        # 1. XỬ LÝ SẢN PHẨM MƠ HỒ
+        results: List[Dict[str, Any]] = [None] * len(lines)
+        names = {}
+        for idx, (product_name, _) in enumerate(lines):
             if not product_name or not str(product_name).strip():
-                return {
-                    "is_ambiguous": False,
-                    "product_id": None,
-                    "suggested_price": 0,
-                    "message": "❌ Vui lòng cung cấp tên sản phẩm",
-                    "base_price": 0
-                }
-            
-            # 2. XỬ LÝ SẢN PHẨM MƠ HỒ
-            is_single, result = self.handle_ambiguous_product(product_name)
+                results[idx] = self._pricing_error("❌ Vui lòng cung cấp tên sản phẩm")
+            else:
+                names[idx] = product_name
+        
+        lookups = run_concurrently(*(
+            (lambda name=name: self.handle_ambiguous_product(name)) for name in names.values()
+        ))
+        resolved = {}
+        for idx, (is_single, result) in zip(names, lookups):
             if not is_single:
                 # Nhiều sản phẩm hoặc không tìm thấy
-                return {
-                    "is_ambiguous": True,
-                    "product_id": None,
-                    "suggested_price": 0,
-                    "message": result,
-                    "base_price": 0
-                }
-            
-            product_id = result
-            
-            # 3. LẤY SẢN PHẨM
-            product = self.Product.browse(product_id)
-            base_price = product.list_price
-            
-            # 4. KIỂM TRA TỒN KHO (nếu có quantity)
-            if quantity and product.qty_available < quantity:
-                return {
-                    "is_ambiguous": False,
-                    "product_id": None,
-                    "suggested_price": 0,
-                    "message": f"❌ Sản phẩm '{product.name}' không đủ tồn kho.\n" +
-                              f"Yêu cầu: {quantity} | Có sẵn: {product.qty_available}",
-                    "base_price": base_price
-                }
-            
-            # 5. Lấy thông tin thuế của sản phẩm
-            tax_rate = 0
-            if product.taxes_id:
-                tax = product.taxes_id[0]
-                tax_rate = tax.amount if hasattr(tax, 'amount') else 0
-            
-            # 6. XÁC ĐỊNH BẢNG GIÁ & KHÁCH HÀNG
-            pricelist_id = None
-            partner_id = None
-            pricelist_name = "Giá niêm yết (Mặc định)"
+                results[idx] = self._pricing_error(result, is_ambiguous=True)
+                continue
+            resolved[idx] = result
+        
+        # 2. LẤY SẢN PHẨM + THUẾ THEO LÔ
+        products = self._get_products(list(resolved.values())) if resolved else {}
+        tax_rates = self.resolve_tax_rates(list(products.values())) if products else {}
+        return {"results": results, "resolved": resolved, "products": products, "tax_rates": tax_rates}
+
+    def resolve_product_ids(self, product_ids: List[int]) -> Dict[str, Any]:
+        """Giống resolve_products nhưng đã biết ID sản phẩm (VD dòng có sẵn trong báo giá): bỏ bước tra tên"""
+        products = self._get_products(product_ids) if product_ids else {}
+        tax_rates = self.resolve_tax_rates(list(products.values())) if products else {}
+        results: List[Dict[str, Any]] = [None] * len(product_ids)
+        resolved = {}
+        for idx, product_id in enumerate(product_ids):
+            if product_id in products:
+                resolved[idx] = product_id
+            else:
+                results[idx] = self._pricing_error(f"❌ Không tìm thấy sản phẩm ID {product_id}")
+        return {"results": results, "resolved": resolved, "products": products, "tax_rates": tax_rates}
 
-            if customer_name:
-                success, result = customer_service.find_customer(
-                    customer_name, customer_phone, customer_email
+    def price_lines(self, lines: List[Tuple[str, int]], context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Gợi ý giá cho nhiều dòng (tên sản phẩm, số lượng) với cùng 1 khách hàng/bảng giá
+        
+        - Khách hàng & pricelist: lấy từ context (get_pricing_context), không tra lại
+        - Sản phẩm, tồn kho, thuế: đọc theo lô cho tất cả các dòng
+        
+        Returns:
+            List[dict]: kết quả từng dòng, cùng format với suggest_pricing
+        """
+        return self.price_resolved(lines, self.resolve_products(lines), context)
+    
+    def price_resolved(self, lines: List[Tuple[str, int]], resolution: Dict[str, Any],
+                       context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Tính giá từ kết quả resolve_products + context khách hàng/bảng giá"""
+        results = list(resolution["results"])
+        resolved = resolution["resolved"]
+        products = resolution["products"]
+        tax_rates = resolution["tax_rates"]
+        
+        pricelist_id = context.get("pricelist_id")
+        pricelist_name = context.get("pricelist_name") or "Giá niêm yết (Mặc định)"
+        
+        for idx, product_id in resolved.items():
+            quantity = lines[idx][1]
+            product = products[product_id]
+            base_price = product['list_price']
+            
+            # 3. KIỂM TRA TỒN KHO (nếu có quantity)
+            if quantity and product['qty_available'] < quantity:
+                results[idx] = self._pricing_error(
+                    f"❌ Sản phẩm '{product['name']}' không đủ tồn kho.\n" +
+                    f"Yêu cầu: {quantity} | Có sẵn: {product['qty_available']}",
+                    base_price=base_price
                 )
-                
-                if success:
-                    partner_id = result
-                    Partner = odoo_service.get_model('res.partner')
-                    partner = Partner.browse(partner_id)
-                    
-                    if partner.property_product_pricelist:
-                        pricelist_id = partner.property_product_pricelist.id
-                        pricelist_name = partner.property_product_pricelist.name
+                continue
             
-            # Nếu không có pricelist, dùng pricelist mặc định
-            if not pricelist_id:
-                Pricelist = odoo_service.get_model('product.pricelist')
-                default_pricelists = Pricelist.search([('active', '=', True)], limit=1)
-                if default_pricelists:
-                    pricelist_id = default_pricelists[0]
+            tax_rate = tax_rates.get(product_id, 0)
             
-            # 7. TÍNH GIÁ THEO PRICELIST ITEMS (LOGIC TỪ MAIN_OLD.PY)
+            # 4. TÍNH GIÁ THEO PRICELIST (rule đã biên dịch sẵn, tính local)
             final_price = base_price
             
             if pricelist_id:
                 try:
-                    PricelistItem = odoo_service.get_model('product.pricelist.item')
-                    
-                    # Tìm pricelist items áp dụng cho sản phẩm này
-                    domain = [
-                        ('pricelist_id', '=', pricelist_id),
-                        '|', ('product_id', '=', product.id),
-                        '|', ('product_tmpl_id', '=', product.product_tmpl_id.id),
-                             ('applied_on', '=', '3_global')
-                    ]
-                    
-                    items = PricelistItem.search_read(
-                        domain,
-                        ['applied_on', 'fixed_price', 'percent_price', 'price_discount', 
-                         'compute_price', 'min_quantity', 'base'],
-                        order='applied_on, min_quantity desc'
-                    )
-                    
-                    # Lọc items phù hợp với quantity
-                    applicable_item = None
-                    for item in items:
-                        if item.get('min_quantity', 0) <= quantity:
-                            applicable_item = item
-                            break
-                    
+                    final_price, applicable_item = pricelist_engine.compute_price(pricelist_id, product, quantity)
                     if applicable_item:
-                        compute_price = applicable_item.get('compute_price', 'fixed')
-                        
-                        if compute_price == 'fixed':
-                            # Giá cố định
-                            final_price = applicable_item.get('fixed_price', base_price)
-                            print(f"DEBUG - Fixed price: {final_price}")
-                            
-                        elif compute_price == 'percentage':
-                            # Giá theo phần trăm
-                            percent = applicable_item.get('percent_price', 0)
-                            final_price = base_price * (1 - percent / 100)
-                            print(f"DEBUG - Percentage: {percent}% off -> {final_price} (base: {base_price})")
-                            
-                        elif compute_price == 'formula':
-                            # Giá theo công thức
-                            base_type = applicable_item.get('base', 'list_price')
-                            price_discount = applicable_item.get('price_discount', 0)
-                            
-                            if base_type == 'list_price':
-                                base_for_formula = base_price
-                            elif base_type == 'standard_price':
-                                base_for_formula = product.standard_price
-                            else:
-                                base_for_formula = base_price
-                            
-                            final_price = base_for_formula * (1 - price_discount / 100)
-                            print(f"DEBUG - Formula: base={base_for_formula}, discount={price_discount}% -> {final_price}")
-                        
-                        else:
-                            print(f"DEBUG - Unknown compute_price: {compute_price}, using base price")
+                        print(f"DEBUG - Pricelist rule ({applicable_item.get('compute_price')}): {base_price} -> {final_price}")
                     else:
                         print(f"DEBUG - No applicable pricelist item found, using base price")
                         
@@ -210,10 +340,10 @@ class ProductService:
                     print(f"DEBUG - Pricelist calculation error: {e}, using base price")
                     final_price = base_price
 
-            # 8. TÍNH TOÁN GIÁ CÓ THUẾ
+            # 5. TÍNH TOÁN GIÁ CÓ THUẾ
             price_with_tax = final_price * (1 + tax_rate / 100)
             
-            # 9. TÍNH TOÁN HIỂN THỊ RÕ RÀNG
+            # 6. TÍNH TOÁN HIỂN THỊ RÕ RÀNG
             message_parts = [
                 f"Giá niêm yết: {format_currency(base_price)} VNĐ",
                 format_discount_message(base_price, final_price, pricelist_name)
@@ -223,49 +353,146 @@ class ProductService:
             if tax_rate > 0:
                 message_parts.append(f"Giá sau thuế ({tax_rate}%): {format_currency(price_with_tax)} VNĐ")
             
-            message = "\n".join(message_parts)
-            
-            return {
+            results[idx] = {
                 "is_ambiguous": False,
                 "product_id": product_id,
-                "product_name": product.name,
+                "product_name": product['name'],
                 "base_price": base_price,
                 "suggested_price": final_price,
                 "price_with_tax": price_with_tax,
                 "tax_rate": tax_rate,
                 "quantity": quantity,
                 "pricelist": pricelist_name,
-                "message": message
+                "message": "\n".join(message_parts)
             }
+        
+        priced = [r['product_name'] for r in results if r and r.get('product_id')]
+        if priced:
+            report_progress('products_priced', f"💰 Đã tính giá {len(priced)} sản phẩm: {', '.join(priced)}",
+                            products=priced, pricelist=pricelist_name)
+        return results
+    
+    def suggest_pricing(self, product_name: str, customer_name: str = None, 
+                       quantity: int = 1, customer_phone: str = None, 
+                       customer_email: str = None) -> Dict[str, Any]:
+        """
+        Gợi ý giá chuẩn Odoo + Xử lý sản phẩm mơ hồ (qua result cache, tag theo sản phẩm/khách hàng)
+        
+        Returns:
+            dict với các field: is_ambiguous, product_id, product_name, 
+            base_price, suggested_price, price_with_tax, tax_rate, 
+            quantity, pricelist, message
+        """
+        self._sync_catalog()
+        self._sync_pricelists()
+        return result_cache.get_or_compute(
+            'suggest_price', (product_name, customer_name, quantity, customer_phone, customer_email),
+            lambda: self._suggest_pricing(product_name, customer_name, quantity, customer_phone, customer_email),
+            # Không tìm thấy/mơ hồ -> tag 'products' (catalog loại khi sản phẩm/tồn kho đổi)
+            tags=lambda pricing: ([f"product:{pricing['product_id']}"] if pricing.get('product_id') else ['products'])
+            + ['pricelists'],
+            cacheable=lambda pricing: 'Lỗi hệ thống' not in pricing['message']
+        )
+    
+    def _suggest_pricing(self, product_name: str, customer_name: str = None, quantity: int = 1,
+                         customer_phone: str = None, customer_email: str = None) -> Dict[str, Any]:
+        try:
+            # 1. VALIDATE SẢN PHẨM
+            if not product_name or not str(product_name).strip():
+                return self._pricing_error("❌ Vui lòng cung cấp tên sản phẩm")
+            
+            # 2. TRA CỨU SONG SONG: sản phẩm/tồn kho/thuế || khách hàng -> bảng giá
+            #    (không tìm thấy khách -> dùng bảng giá mặc định)
+            lines = [(product_name, quantity)]
+            resolution, context = run_concurrently(
+                lambda: self.resolve_products(lines),
+                lambda: self.resolve_customer_context(customer_name, customer_phone, customer_email)
+            )
+            
+            # 3. TÍNH GIÁ
+            return self.price_resolved(lines, resolution, context)[0]
 
         except Exception as e:
-            return {
-                "is_ambiguous": False,
-                "product_id": None,
-                "suggested_price": 0, 
-                "message": f"❌ Lỗi hệ thống: {str(e)}",
-                "base_price": 0
-            }
+            return self._pricing_error(f"❌ Lỗi hệ thống: {str(e)}")
+    
+    @staticmethod
+    def _sync_catalog():
+        """Làm mới catalog (nếu quá TTL) trước khi đọc result cache: sản phẩm/tồn kho đổi -> entry liên quan bị loại"""
+        if settings.CATALOG_ENABLED:
+            try:
+                product_catalog.ensure_fresh()
+            except Exception as e:
+                print(f"DEBUG - Catalog unavailable: {e}")
+    
+    @staticmethod
+    def _sync_pricelists():
+        """Kiểm tra rule pricelist đã load (nếu quá check_interval) trước khi đọc result cache: rule đổi -> giá đã cache bị loại"""
+        try:
+            pricelist_engine.ensure_fresh()
+        except Exception as e:
+            print(f"DEBUG - Pricelist check error: {e}")
+    
+    @staticmethod
+    def _product_tags(products: List[dict]) -> List[str]:
+        return ['products'] + [f"product:{p['id']}" for p in products]
     
     def search_products(self, keyword: str, limit: int = 20) -> List[dict]:
         """Tìm kiếm sản phẩm theo từ khóa"""
         try:
-            products = self.Product.search_read(
-                [('sale_ok', '=', True), ('name', 'ilike', keyword)],
-                ['name', 'list_price', 'qty_available'],
-                limit=limit
+            self._sync_catalog()
+            products = result_cache.get_or_compute(
+                'list_products', ('search', keyword, limit),
+                lambda: self._find_products(keyword, limit=limit), tags=self._product_tags
             )
             return products
         except Exception as e:
             print(f"Lỗi tìm kiếm sản phẩm: {e}")
             return []
     
+    def _filter_products(self, keyword: str = None, min_price: float = None, max_price: float = None,
+                         in_stock: bool = False, limit: int = None) -> List[dict]:
+        """Lọc theo giá sau thuế + tồn kho: catalog tính trên mảng, lỗi thì hỏi Odoo rồi lọc lại"""
+        if settings.CATALOG_ENABLED:
+            try:
+                return product_catalog.filter(keyword, min_price, max_price, in_stock, limit)
+            except Exception as e:
+                print(f"DEBUG - Catalog unavailable, fallback to Odoo: {e}")
+        
+        # Giá trước thuế <= giá sau thuế -> lọc max_price trên list_price ở Odoo không bỏ sót
+        domain = [('sale_ok', '=', True)]
+        if keyword:
+            domain.append(('name', 'ilike', keyword))
+        if max_price is not None:
+            domain.append(('list_price', '<=', max_price))
+        products = self.Product.search_read(domain, PRODUCT_LIST_FIELDS)
+        prices = self.prices_with_tax(products)
+        result = [
+            p for p in products
+            if (min_price is None or prices[p['id']] >= min_price)
+            and (max_price is None or prices[p['id']] <= max_price)
+            and (not in_stock or p['qty_available'] > 0)
+        ]
+        return result[:limit] if limit else result
+    
+    def filter_products(self, keyword: str = None, min_price: float = None, max_price: float = None,
+                        in_stock: bool = False, limit: int = 20) -> List[dict]:
+        """Sản phẩm theo từ khóa (tùy chọn), khoảng giá sau thuế, chỉ còn hàng (VD 'còn hàng dưới 10 triệu')"""
+        try:
+            self._sync_catalog()
+            return result_cache.get_or_compute(
+                'list_products', ('filter', keyword, min_price, max_price, bool(in_stock), limit),
+                lambda: self._filter_products(keyword, min_price, max_price, in_stock, limit),
+                tags=self._product_tags
+            )
+        except Exception as e:
+            print(f"Lỗi lọc sản phẩm: {e}")
+            return []
+    
     def get_all_products(self, limit: int = 10) -> List[dict]:
         """Lấy danh sách top sản phẩm đang bán"""
-        products = self.Product.search_read(
-            [('sale_ok', '=', True)],
-            ['name', 'list_price', 'qty_available'],
-            limit=limit
+        self._sync_catalog()
+        products = result_cache.get_or_compute(
+            'list_products', ('all', limit), lambda: self._find_products(limit=limit), tags=self._product_tags
         )
         return products
 
@@ -0,0 +1,206 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+from backend.config import settings
+from backend.utils.circuit_breaker import note_stale, stale_reads
+from backend.utils.metrics import registry
+
+CACHE_REQUESTS = registry.counter('result_cache_requests_total', 'Tra cứu result cache', ['action', 'result'])
+CACHE_EVICTIONS = registry.counter('result_cache_evictions_total', 'Số entry bị loại khỏi result cache', ['reason'])
+CACHE_ENTRIES = registry.gauge('result_cache_entries', 'Số entry trong result cache')
+CACHE_BYTES = registry.gauge('result_cache_bytes', 'Bộ nhớ ước tính của result cache (byte)')
+CACHE_HIT_RATIO = registry.gauge('result_cache_hit_ratio', 'Tỉ lệ hit của result cache', ['action'])
+
+# Tag của các entry đang được tính (xem ResultCache.tag)
+_collecting_tags: ContextVar = ContextVar('result_cache_tags', default=None)
+
+
+def _approx_size(value: Any) -> int:
+    """Ước tính bộ nhớ (byte) của kết quả: chuỗi, số, dict/list lồng nhau"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_approx_size(v) for v in value)
+    return size
+
+
+def _normalize_key(value: Any) -> Any:
+    """Chữ thường + gộp khoảng trắng để 'Giá  iPhone' và 'giá iphone' dùng chung 1 entry"""
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    return value
+
+
+class ResultCache:
+    """
+    Cache kết quả của các action chỉ đọc (list_products, suggest_price, get_customer_pricelist, check_orders).
+
+    - Key: (action, tham số đã chuẩn hóa); TTL riêng theo action (RESULT_CACHE_TTL), LRU giới hạn số entry
+    - Tag: mỗi entry gắn tag thực thể đã dùng (VD 'partner:7', 'product:12', 'orders');
+      action ghi gọi invalidate(tag...) để loại các entry liên quan
+    - Không cache khi kết quả dùng dữ liệu cũ (Odoo gián đoạn) hoặc là lỗi hệ thống
+    - Ghi xảy ra trong lúc đang tính -> bỏ kết quả đó (có thể đã cũ)
+    """
+
+    def __init__(self, capacity: int = None, ttls: Dict[str, float] = None, enabled: bool = None):
+        self.capacity = settings.RESULT_CACHE_SIZE if capacity is None else capacity
+        self.ttls = dict(settings.RESULT_CACHE_TTL if ttls is None else ttls)
+        self.enabled = settings.RESULT_CACHE_ENABLED if enabled is None else enabled
+
+        # key -> (value, expires_at, tags, size)
+        self._entries: "OrderedDict[tuple, Tuple[Any, float, Set[str], int]]" = OrderedDict()
+        self._by_tag: Dict[str, Set[tuple]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._bytes = 0
+
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self._evictions = {'lru': 0, 'ttl': 0, 'invalidate': 0}
+
+        registry.add_collector(self._collect_metrics)
+
+    # ===== ĐỌC =====
+
+    def get_or_compute(self, action: str, key: Iterable, compute: Callable[[], Any],
+                       tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+                       cacheable: Callable[[Any], bool] = None) -> Any:
+        """
+        Trả kết quả đã cache hoặc tính mới rồi lưu lại.
+
+        Args:
+            key: tham số của action (chuỗi được chuẩn hóa chữ thường/khoảng trắng)
+            tags: tag cố định hoặc hàm (kết quả) -> tag; cộng với tag do service gọi tag() trong lúc tính
+            cacheable: hàm (kết quả) -> có lưu không (VD bỏ qua lỗi hệ thống)
+
+        Lưu ý: kết quả trả về được dùng chung giữa các request, không sửa trực tiếp.
+        """
+        ttl = self.ttls.get(action, 0)
+        if not self.enabled or ttl <= 0:
+            return compute()
+
+        cache_key = (action,) + tuple(_normalize_key(v) for v in key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(cache_key)
+                    self._hits[action] = self._hits.get(action, 0) + 1
+                    CACHE_REQUESTS.inc(action=action, result='hit')
+                    return entry[0]
+                self._remove(cache_key, 'ttl')
+            self._misses[action] = self._misses.get(action, 0) + 1
+            generation = self._generation
+        CACHE_REQUESTS.inc(action=action, result='miss')
+
+        collected: Set[str] = set()
+        token = _collecting_tags.set((_collecting_tags.get() or ()) + (collected,))
+        try:
+            with stale_reads() as stale:
+                value = compute()
+        finally:
+            _collecting_tags.reset(token)
+        # Báo tiếp cho khối stale_reads bên ngoài (chat router)
+        for source, age in stale:
+            note_stale(source, age)
+
+        if stale or (cacheable is not None and not cacheable(value)):
+            return value
+        entry_tags = collected | set(tags(value) if callable(tags) else tags)
+        self._store(cache_key, value, now + ttl, entry_tags, generation)
+        return value
+
+    @staticmethod
+    def tag(*tags: str):
+        """Service gọi trong lúc tính kết quả để gắn tag thực thể đã dùng (VD khách hàng tìm được)"""
+        for collected in _collecting_tags.get() or ():
+            collected.update(tags)
+
+    # ===== GHI / LOẠI =====
+
+    def _store(self, cache_key: tuple, value: Any, expires_at: float, tags: Set[str], generation: int):
+        size = _approx_size(value)
+        with self._lock:
+            if generation != self._generation:
+                # Có action ghi trong lúc đang tính -> kết quả có thể đã cũ
+                return
+            if cache_key in self._entries:
+                self._remove(cache_key, None)
+            self._entries[cache_key] = (value, expires_at, tags, size)
+            self._bytes += size
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(cache_key)
+            while len(self._entries) > self.capacity:
+                self._remove(next(iter(self._entries)), 'lru')
+
+    def _remove(self, cache_key: tuple, reason: Optional[str]):
+        _, _, tags, size = self._entries.pop(cache_key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(cache_key)
+                if not keys:
+                    del self._by_tag[tag]
+        if reason:
+            self._evictions[reason] += 1
+            CACHE_EVICTIONS.inc(reason=reason)
+
+    def invalidate(self, *tags: str) -> int:
+        """Loại mọi entry mang 1 trong các tag (gọi sau action ghi), trả về số entry đã loại"""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for tag in tags:
+                keys |= self._by_tag.get(tag, set())
+            for cache_key in keys:
+                self._remove(cache_key, 'invalidate')
+        if keys:
+            print(f"DEBUG - Result cache: loại {len(keys)} entry theo tag {', '.join(tags)}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+            self._bytes = 0
+
+    # ===== THỐNG KÊ =====
+
+    def _hit_ratio(self, action: str = None) -> float:
+        if action is None:
+            hits, misses = sum(self._hits.values()), sum(self._misses.values())
+        else:
+            hits, misses = self._hits.get(action, 0), self._misses.get(action, 0)
+        return round(hits / (hits + misses), 4) if hits + misses else 0.0
+
+    def _collect_metrics(self):
+        CACHE_ENTRIES.set(len(self._entries))
+        CACHE_BYTES.set(self._bytes)
+        for action in set(self._hits) | set(self._misses):
+            CACHE_HIT_RATIO.set(self._hit_ratio(action), action=action)
+
+    def stats(self) -> Dict[str, Any]:
+        actions = sorted(set(self._hits) | set(self._misses))
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'capacity': self.capacity,
+            'approx_bytes': self._bytes,
+            'tags': len(self._by_tag),
+            'hit_ratio': self._hit_ratio(),
+            'actions': {a: {'hits': self._hits.get(a, 0), 'misses': self._misses.get(a, 0),
+                            'hit_ratio': self._hit_ratio(a), 'ttl': self.ttls.get(a, 0)} for a in actions},
+            'evictions': dict(self._evictions),
+        }
+
+
+# Singleton instance
+result_cache = ResultCache()
@@ -0,0 +1,166 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+
+# Các field intent được ghi nhớ làm ngữ cảnh của phiên
+ENTITY_FIELDS = ['customer', 'phone', 'email', 'product', 'order_name']
+
+
+class ChatSession:
+    """Trạng thái 1 phiên chat: các lượt hội thoại, thực thể đã xác định, token đã dùng"""
+
+    def __init__(self, session_id: str, data: dict = None):
+        data = data or {}
+        self.session_id = session_id
+        self.turns: List[dict] = data.get('turns', [])
+        self.entities: Dict[str, Any] = data.get('entities', {})
+        self.usage: Dict[str, int] = data.get('usage', {})
+        self.created_at: float = data.get('created_at', time.time())
+        self.updated_at: float = data.get('updated_at', self.created_at)
+
+    def history(self) -> List[dict]:
+        """Lịch sử theo định dạng client vẫn gửi ({'role': 'user'|'bot', 'content'})"""
+        return list(self.turns)
+
+    def to_dict(self) -> dict:
+        return {
+            'turns': self.turns,
+            'entities': self.entities,
+            'usage': self.usage,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+
+class SQLiteSessionBackend:
+    """Lưu phiên xuống SQLite (1 bảng, dữ liệu JSON)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_session ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM chat_session WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id: str, data: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_session (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data, ensure_ascii=False), data.get('updated_at', time.time()))
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM chat_session WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+
+class SessionStore:
+    """
+    Kho phiên chat: LRU trong bộ nhớ + backend lưu trữ (tùy chọn).
+
+    Ghi xuyên (write-through) xuống backend sau mỗi lượt, nên phiên bị đẩy
+    khỏi LRU vẫn load lại được. Backend chỉ cần có load/save/delete.
+    """
+
+    def __init__(self, capacity: int = None, max_turns: int = None, backend=None):
+        self.capacity = settings.SESSION_CAPACITY if capacity is None else capacity
+        self.max_turns = settings.SESSION_MAX_TURNS if max_turns is None else max_turns
+        self.backend = backend
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._hits = 0
+        self._backend_loads = 0
+        self._created = 0
+        self._evictions = 0
+
+    def get_or_create(self, session_id: str = None) -> ChatSession:
+        """Lấy phiên theo ID (LRU -> backend), chưa có thì tạo mới"""
+        with self._lock:
+            if session_id and session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+                self._hits += 1
+                return self._sessions[session_id]
+
+            data = self.backend.load(session_id) if session_id and self.backend else None
+            if data is not None:
+                self._backend_loads += 1
+            else:
+                session_id = session_id or uuid.uuid4().hex
+                self._created += 1
+
+            session = ChatSession(session_id, data)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.capacity:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+            return session
+
+    def record_turn(self, session: ChatSession, message: str, reply: str,
+                    intent: dict = None, usage: dict = None):
+        """Ghi 1 lượt hỏi/đáp + thực thể trong intent + token vào phiên"""
+        with self._lock:
+            session.turns.append({'role': 'user', 'content': message})
+            session.turns.append({'role': 'bot', 'content': reply})
+            if len(session.turns) > self.max_turns:
+                del session.turns[:len(session.turns) - self.max_turns]
+
+            for item in (intent or {}).get('actions') or [intent or {}]:
+                for field in ENTITY_FIELDS:
+                    if isinstance(item, dict) and item.get(field):
+                        session.entities[field] = item[field]
+
+            for key, value in (usage or {}).items():
+                if 'tokens' in key and isinstance(value, (int, float)):
+                    session.usage[key] = session.usage.get(key, 0) + value
+            session.usage['turns'] = session.usage.get('turns', 0) + 1
+            session.updated_at = time.time()
+
+            if self.backend:
+                self.backend.save(session.session_id, session.to_dict())
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            if self.backend:
+                self.backend.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions_in_memory': len(self._sessions),
+            'capacity': self.capacity,
+            'hits': self._hits,
+            'backend_loads': self._backend_loads,
+            'created': self._created,
+            'evictions': self._evictions,
+            'backend': type(self.backend).__name__ if self.backend else None,
+        }
+
+
+def create_session_store() -> SessionStore:
+    """Tạo store theo cấu hình (SESSION_DB_PATH rỗng -> chỉ giữ trong bộ nhớ)"""
+    backend = SQLiteSessionBackend(settings.SESSION_DB_PATH) if settings.SESSION_DB_PATH else None
+    return SessionStore(backend=backend)
+
+
+# Singleton instance
+session_store = create_session_store()
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.config import settings
+from backend.services.catalog_cache import product_catalog
+from backend.services.customer_index import customer_index
+from backend.services.llm_service import llm_service
+from backend.services.odoo_service import odoo_service
+from backend.services.pricelist_engine import pricelist_engine
+from backend.utils.concurrency import run_concurrently
+from backend.utils.metrics import registry
+
+# Model mà các service dùng -> nạp metadata (fields_get) sẵn lúc khởi động
+WARMUP_MODELS = [
+    'product.product', 'product.template', 'res.partner', 'sale.order',
+    'sale.order.line', 'crm.lead', 'stock.picking', 'product.pricelist.item',
+]
+
+STARTUP_SECONDS = registry.gauge('app_startup_seconds', 'Thời gian khởi động theo giai đoạn', ['phase'])
+READY = registry.gauge('app_ready', 'Worker đã sẵn sàng nhận traffic (đã đăng nhập Odoo)')
+
+
+class StartupWarmup:
+    """
+    Khởi động worker: đăng nhập Odoo rồi nạp song song metadata model + catalog,
+    index khách hàng, bảng giá mặc định. Chạy nền trong lifespan; lỗi đăng nhập
+    thì thử lại (backoff) thay vì làm sập worker.
+
+    - live: process đang chạy
+    - ready: đã đăng nhập Odoo (cache còn lại nạp lười nếu warmup chưa xong)
+    """
+
+    def __init__(self, retry_max_delay: float = 30.0):
+        self.retry_max_delay = retry_max_delay
+        self.started_at = time.perf_counter()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.accepting_ms: Optional[float] = None
+        self.ready_ms: Optional[float] = None
+        self.warm_ms: Optional[float] = None
+        self.login_attempts = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return odoo_service.connected
+
+    def _elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def _step(self, name: str, func: Callable) -> bool:
+        start = time.perf_counter()
+        try:
+            func()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+            print(f"⚠️ Warmup '{name}' lỗi: {e}")
+        self.steps[name] = {'ok': ok, 'ms': round((time.perf_counter() - start) * 1000, 1), 'error': error}
+        return ok
+
+    @staticmethod
+    def _warm_models():
+        for model in WARMUP_MODELS:
+            odoo_service.get_model(model)
+
+    def warm_caches(self):
+        """Nạp song song metadata model, các cache trong bộ nhớ và SDK LLM"""
+        steps = [lambda: self._step('model_metadata', self._warm_models),
+                 lambda: self._step('llm_client', llm_service.preload),
+                 lambda: self._step('default_pricelist', pricelist_engine.default_pricelist_id)]
+        if settings.CATALOG_ENABLED:
+            steps.append(lambda: self._step('catalog', product_catalog.ensure_fresh))
+        if settings.CUSTOMER_INDEX_ENABLED:
+            steps.append(lambda: self._step('customer_index', customer_index.ensure_fresh))
+        run_concurrently(*steps)
+
+    async def run(self):
+        delay = 1.0
+        while True:
+            self.login_attempts += 1
+            if await run_in_threadpool(self._step, 'odoo_login', odoo_service.connect):
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_delay)
+        self.ready_ms = self._elapsed_ms()
+        READY.set(1)
+        STARTUP_SECONDS.set(self.ready_ms / 1000, phase='ready')
+
+        await run_in_threadpool(self.warm_caches)
+        self.warm_ms = self._elapsed_ms()
+        STARTUP_SECONDS.set(self.warm_ms / 1000, phase='warm')
+        print(f"✅ Warmup xong sau {self.warm_ms} ms")
+
+    async def start(self, budget: float = None):
+        """Chạy warmup nền, chờ tối đa `budget` giây rồi cho worker nhận traffic"""
+        budget = settings.STARTUP_BUDGET if budget is None else budget
+        READY.set(0)
+        self._task = asyncio.ensure_future(self.run())
+        await asyncio.wait({self._task}, timeout=budget)
+        self.accepting_ms = self._elapsed_ms()
+        STARTUP_SECONDS.set(self.accepting_ms / 1000, phase='accepting')
+        state = 'warmup xong' if self._task.done() else ('đã đăng nhập Odoo' if self.ready else 'đang đăng nhập Odoo')
+        print(f"🚀 Nhận traffic sau {self.accepting_ms} ms ({state})")
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'ready': self.ready,
+            'accepting_ms': self.accepting_ms,
+            'ready_ms': self.ready_ms,
+            'warm_ms': self.warm_ms,
+            'budget_ms': settings.STARTUP_BUDGET * 1000,
+            'login_attempts': self.login_attempts,
+            'steps': self.steps,
+            'breakers': {'odoo': odoo_service.breaker.stats(), 'llm': llm_service.breaker.stats()},
+        }
+
+
+# Singleton instance
+startup_warmup = StartupWarmup()
@@ -0,0 +1,209 @@
+"""
+Circuit breaker cho backend bên ngoài (Odoo, LLM) + ghi nhận dữ liệu cũ khi phải phục vụ từ cache.
+
+- closed: gọi bình thường, ghi kết quả vào cửa sổ trượt N lần gọi gần nhất
+- open: tỉ lệ lỗi hoặc tỉ lệ gọi chậm vượt ngưỡng -> từ chối ngay (CircuitOpenError)
+- half_open: hết thời gian open -> cho 1 số request thử; thành công thì đóng lại, lỗi thì mở tiếp
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.utils.metrics import registry
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = registry.gauge('circuit_breaker_state', 'Trạng thái breaker (0=closed, 1=half_open, 2=open)', ['name'])
+BREAKER_TRANSITIONS = registry.counter('circuit_breaker_transitions_total', 'Số lần breaker đổi trạng thái', ['name', 'state'])
+BREAKER_REJECTED = registry.counter('circuit_breaker_rejected_total', 'Số lần gọi bị từ chối vì breaker mở', ['name'])
+
+# Nguồn dữ liệu cũ đã dùng trong action hiện tại (xem stale_reads)
+_stale_sources: ContextVar = ContextVar('stale_sources', default=None)
+
+
+class CircuitOpenError(Exception):
+    """Breaker đang mở: không gọi backend, trả lỗi ngay"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name.upper()} tạm thời không phản hồi, vui lòng thử lại sau {max(1, round(retry_after))}s")
+
+
+class CircuitBreaker:
+    """
+    Args:
+        window: số lần gọi gần nhất dùng để tính tỉ lệ
+        min_calls: số lần gọi tối thiểu trong cửa sổ trước khi được phép mở
+        failure_ratio: tỉ lệ lỗi để mở breaker
+        slow_call_seconds / slow_ratio: gọi lâu hơn slow_call_seconds tính là chậm; tỉ lệ chậm >= slow_ratio -> mở
+        open_seconds: thời gian mở trước khi cho request thử (half_open)
+        half_open_calls: số request thử đồng thời khi half_open
+        is_failure: hàm phân loại exception có tính là lỗi của backend không (VD lỗi nghiệp vụ thì không)
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, failure_ratio: float = 0.5,
+                 slow_call_seconds: float = 5.0, slow_ratio: float = 0.8, open_seconds: float = 30.0,
+                 half_open_calls: int = 1, is_failure: Callable[[BaseException], bool] = None):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_ratio = slow_ratio
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure or (lambda error: True)
+
+        self._lock = threading.Lock()
+        self._results: deque = deque(maxlen=window)   # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+        BREAKER_STATE.set(0, name=name)
+
+    # ===== TRẠNG THÁI =====
+
+    def _transition(self, state: str):
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self._probes = 0
+        if state == CLOSED:
+            self._results.clear()
+        BREAKER_STATE.set(STATE_VALUES[state], name=self.name)
+        BREAKER_TRANSITIONS.inc(name=self.name, state=state)
+        print(f"⚡ Circuit breaker '{self.name}': {state}")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """Đang mở (chưa tới lúc thử lại) -> mọi lời gọi sẽ bị từ chối"""
+        return self.state == OPEN
+
+    def retry_after(self) -> float:
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    # ===== GỌI =====
+
+    def allow(self):
+        """Xin phép gọi backend; raise CircuitOpenError nếu breaker đang mở"""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self._reject()
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self._reject()
+                self._probes += 1
+
+    def _reject(self):
+        self._rejected += 1
+        BREAKER_REJECTED.inc(name=self.name)
+        raise CircuitOpenError(self.name, self.retry_after())
+
+    def record(self, seconds: float, error: BaseException = None):
+        """Ghi kết quả 1 lần gọi (error=None là thành công)"""
+        failed = error is not None and self.is_failure(error)
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if failed:
+                self._last_error = f"{type(error).__name__}: {error}"
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._transition(OPEN if failed or slow else CLOSED)
+                return
+            if self._state == OPEN:
+                return
+            self._results.append((failed, slow))
+            if len(self._results) < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._results if f) / len(self._results)
+            slow_calls = sum(1 for _, s in self._results if s) / len(self._results)
+            if failures >= self.failure_ratio or slow_calls >= self.slow_ratio:
+                self._transition(OPEN)
+
+    def release(self):
+        """Lần gọi bị hủy giữa chừng (client ngắt kết nối, tắt server): trả lại lượt thử, không tính kết quả"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        self.allow()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record(time.perf_counter() - start, e)
+            raise
+        self.record(time.perf_counter() - start)
+        return result
+
+    def wrap(self, func: Callable) -> Callable:
+        def guarded(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return guarded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            results = list(self._results)
+        return {
+            'state': self.state,
+            'window_calls': len(results),
+            'failure_ratio': round(sum(1 for f, _ in results if f) / len(results), 3) if results else 0.0,
+            'slow_ratio': round(sum(1 for _, s in results if s) / len(results), 3) if results else 0.0,
+            'rejected': self._rejected,
+            'retry_after_seconds': round(self.retry_after(), 1) if self._state == OPEN else 0.0,
+            'last_error': self._last_error,
+        }
+
+
+# ===== DỮ LIỆU CŨ (degraded read) =====
+
+def note_stale(source: str, age_seconds: Optional[float]):
+    """Cache gọi khi phải trả dữ liệu cũ vì không làm mới được từ backend"""
+    sources = _stale_sources.get()
+    if sources is not None:
+        sources.append((source, age_seconds))
+
+
+@contextmanager
+def stale_reads():
+    """
+    Thu thập các nguồn dữ liệu cũ đã dùng trong 1 khối code
+
+    VD:
+        with stale_reads() as sources:
+            reply = product_service.list_products()
+        if sources: reply += stale_note(sources)
+    """
+    sources: List[Tuple[str, Optional[float]]] = []
+    token = _stale_sources.set(sources)
+    try:
+        yield sources
+    finally:
+        _stale_sources.reset(token)
+
+
+def stale_note(sources: List[Tuple[str, Optional[float]]]) -> str:
+    """Ghi chú cho người dùng: dữ liệu lấy từ bộ nhớ đệm, cập nhật cách đây bao lâu"""
+    ages = {}
+    for source, age in sources:
+        ages[source] = max(ages.get(source) or 0, age or 0)
+    parts = [f"{source} ({round(age)}s trước)" for source, age in ages.items()]
+    return f"⚠️ Odoo đang gián đoạn, dữ liệu lấy từ bộ nhớ đệm: {', '.join(parts)}"
@@ -0,0 +1,50 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from backend.config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.LOOKUP_WORKERS, thread_name_prefix='lookup')
+    return _executor
+
+
+def _run_as_worker(context: contextvars.Context, func: Callable) -> Any:
+    _worker.active = True
+    try:
+        return context.run(func)
+    finally:
+        _worker.active = False
+
+
+def run_concurrently(*funcs: Callable[[], Any]) -> List[Any]:
+    """
+    Chạy các tra cứu độc lập (RPC odoorpc đồng bộ) song song, trả về kết quả theo thứ tự.
+
+    - Hàm đầu tiên chạy ngay trên thread hiện tại, các hàm còn lại trong thread pool dùng chung
+    - Context (VD: progress_reporter, bộ đếm RPC) được chép sang thread con
+    - Gọi lồng từ trong 1 worker -> chạy tuần tự để không chiếm hết pool (deadlock)
+    - Lỗi của hàm nào được raise lại khi lấy kết quả của hàm đó
+    """
+    if len(funcs) <= 1 or getattr(_worker, 'active', False):
+        return [func() for func in funcs]
+
+    executor = _get_executor()
+    futures = [executor.submit(_run_as_worker, contextvars.copy_context(), func) for func in funcs[1:]]
+    try:
+        first = funcs[0]()
+    finally:
+        # Đợi hết các task con kể cả khi hàm đầu lỗi
+        for future in futures:
+            future.exception()
+    return [first] + [future.result() for future in futures]
@@ -1,3 +1,5 @@
+import unicodedata
+
 def format_currency(amount: float) -> str:
     """Format số tiền thành chuỗi có dấu phẩy"""
     return "{:,.0f}".format(amount)
@@ -29,18 +31,38 @@ def extract_core_digits(phone: str) -> str:
     
     return digits
 
+def normalize_phone(phone: str) -> str:
+    """Chuẩn hóa SĐT về dạng lõi để so khớp (bỏ 0 đầu / mã quốc gia 84)"""
+    core = extract_core_digits(phone)
+    if core and core.startswith('84') and len(core) == 11:
+        return core[2:]
+    return core
+
+def normalize_text(text: str) -> str:
+    """Bỏ dấu tiếng Việt, chữ thường, gộp khoảng trắng (VD: 'Điện  Thoại' -> 'dien thoai')"""
+    if not text:
+        return ''
+    text = str(text).replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return ' '.join(text.lower().split())
+
 def format_order_response(order, status_text: str, sales_rep: str = None, is_quotation: bool = False) -> str:
-    """Format phản hồi đơn hàng/báo giá thống nhất"""
-    products_info = []
-    for line in order.order_line:
-        products_info.append(f"{line.product_id.name} x {int(line.product_uom_qty)}")
+    """
+    Format phản hồi đơn hàng/báo giá thống nhất
+    
+    Args:
+        order: snapshot dict đã đọc sẵn (xem order_snapshot), không phải record odoorpc
+               -> format không phát sinh RPC
+    """
+    products_info = [f"{line['product_name']} x {int(line['product_uom_qty'])}" for line in order['lines']]
     
     info = {
-        'name': order.name,
-        'customer': order.partner_id.name,
+        'name': order['name'],
+        'customer': order['partner_name'],
         'products': ', '.join(products_info),
-        'total': format_currency(order.amount_total),
-        'state': order.state
+        'total': format_currency(order['amount_total']),
+        'state': order['state']
     }
     
     if is_quotation:
@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+# Callback nhận (stage, data) của request hiện tại (None = không ai lắng nghe)
+_reporter: ContextVar[Optional[Callable[[str, dict], None]]] = ContextVar('progress_reporter', default=None)
+
+
+def report_progress(stage: str, message: str, **data):
+    """Báo tiến trình xử lý (VD: đã tìm thấy khách hàng) cho client đang stream"""
+    callback = _reporter.get()
+    if callback is None:
+        return
+    try:
+        callback(stage, {'stage': stage, 'message': message, **data})
+    except Exception as e:
+        print(f"DEBUG - Progress callback error: {e}")
+
+
+@contextmanager
+def progress_reporter(callback: Callable[[str, dict], None]):
+    """Đăng ký callback nhận tiến trình trong phạm vi khối with"""
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
@@ -0,0 +1,312 @@
+"""
+Benchmark các action của chatbot, chạy offline (không cần Odoo thật / Groq key).
+
+- Odoo: fake odoorpc trong process (backend.fakes.odoo_env) trên dữ liệu sinh sẵn,
+  độ trễ mỗi RPC cấu hình được
+- LLM: fake OpenAI server (backend.fakes.llm_server) trả intent theo kịch bản
+- Gọi POST /chat của FastAPI app qua httpx.ASGITransport
+
+Mỗi action đo p50/p95/p99 (ms), số RPC tới Odoo và bộ nhớ cấp phát đỉnh (tracemalloc),
+so sánh với benchmarks/baseline.json (p50, số RPC, bộ nhớ), có regression thì exit 1.
+
+VD (từ thư mục gốc):
+    python -m benchmarks.bench_actions
+    python -m benchmarks.bench_actions --products 5000 --latency 5 --actions suggest_price,create_quotation
+    python -m benchmarks.bench_actions --update-baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+# Tham số ảnh hưởng tới kết quả -> phải khớp với baseline mới so sánh
+DATASET_KEYS = ('products', 'partners', 'orders', 'latency', 'llm_latency')
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark action chatbot trên fake Odoo + fake LLM")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--partners", type=int, default=100)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=2.0, help="Độ trễ mỗi RPC Odoo (ms)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Độ trễ mỗi request LLM (ms)")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--alloc-iterations", type=int, default=5, help="Số lần đo bộ nhớ (tracemalloc, chậm)")
+    parser.add_argument("--actions", default="", help="Danh sách action, phân tách bởi dấu phẩy (mặc định: tất cả)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Cho phép p50 / bộ nhớ tăng bao nhiêu (0.5 = 50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0, help="Bỏ qua chênh lệch p50 nhỏ hơn mức này")
+    parser.add_argument("--json", dest="json_path", default="", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--verbose", action="store_true", help="Giữ log của backend")
+    return parser.parse_args(argv)
+
+
+def configure_environment():
+    """Trỏ cấu hình về fake (phải chạy trước khi import backend.config)"""
+    os.environ.update({
+        'ODOO_URL': 'http://fake-odoo:8069',
+        'ODOO_DB': 'fake',
+        'ODOO_USERNAME': 'admin',
+        'ODOO_PASSWORD': 'admin',
+        'OPENAI_API_KEY': 'fake',
+        'SESSION_DB_PATH': '',
+        # Đo đường đi qua LLM của từng action
+        'FAST_INTENT_ENABLED': 'false',
+        # Đo đường tính thật (cache kết quả sẽ che regression RPC của action đọc)
+        'RESULT_CACHE_ENABLED': 'false',
+        'INTENT_CACHE_ENABLED': 'false',
+    })
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class FakeLLM:
+    """Fake LLM chạy bằng uvicorn trên 1 thread, trả intent đã đăng ký theo nội dung tin nhắn"""
+
+    def __init__(self, latency: float = 0.0):
+        self.intents: Dict[str, dict] = {}
+        self.latency = latency
+        self.url = None
+
+    def responder(self, messages: List[dict]) -> dict:
+        message = messages[-1]['content'] if messages else ''
+        return self.intents.pop(message, None) or {"action": "chat", "response": "Xin chào anh chị!"}
+
+    def start(self) -> str:
+        import uvicorn
+        from backend.fakes.llm_server import create_fake_llm_app
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        app = create_fake_llm_app(self.responder, latency=self.latency)
+        server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+        threading.Thread(target=server.run, daemon=True).start()
+        deadline = time.time() + 10
+        while not server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Fake LLM không khởi động được")
+            time.sleep(0.05)
+        self.url = f"http://127.0.0.1:{port}/v1"
+        return self.url
+
+
+class Scenarios:
+    """Kịch bản cho từng action: sinh intent (và chuẩn bị dữ liệu trực tiếp trên store nếu cần)"""
+
+    def __init__(self, store):
+        self.store = store
+        products = [p for p in store.records['product.product'].values() if p.get('sale_ok')]
+        self.products = [p['name'] for p in products]
+        self.in_stock = [p['name'] for p in products if p.get('qty_available', 0) >= 10] or self.products
+        # Kèm SĐT để xác định đúng 1 khách (tên trong dữ liệu mẫu có thể trùng tiền tố)
+        self.partners = [{'customer': p['name'], 'phone': p['phone']}
+                         for p in store.records['res.partner'].values() if p.get('customer_rank')]
+        self._product_ids = [p['id'] for p in products]
+
+    def _pick(self, items: list, i: int):
+        return items[i % len(items)]
+
+    def _draft_order(self, i: int) -> str:
+        """Tạo báo giá nháp trực tiếp trên store (không tính vào RPC của action)"""
+        partner_id = self._pick(list(self.store.records['res.partner']), i)
+        lines = [(0, 0, {'product_id': self._pick(self._product_ids, i + k), 'product_uom_qty': 1.0 + k,
+                         'price_unit': 1_000_000.0}) for k in range(2)]
+        order_id = self.store.create('sale.order', {'partner_id': partner_id, 'order_line': lines})
+        return self.store.records['sale.order'][order_id]['name']
+
+    def build(self) -> Dict[str, Callable[[int], dict]]:
+        return {
+            'chat': lambda i: {"action": "chat", "response": "Xin chào anh chị!"},
+            'list_products': lambda i: {"action": "list_products", "keyword": self._pick(self.products, i).split()[0]},
+            'suggest_price': lambda i: {"action": "suggest_price", "product": self._pick(self.in_stock, i),
+                                        **self._pick(self.partners, i), "qty": 1 + i % 5},
+            'get_customer_pricelist': lambda i: {"action": "get_customer_pricelist",
+                                                 **self._pick(self.partners, i)},
+            'check_orders': lambda i: {"action": "check_orders", **self._pick(self.partners, i)},
+            'create_quotation': lambda i: {"action": "create_quotation", **self._pick(self.partners, i),
+                                           "product": self._pick(self.in_stock, i), "qty": 1 + i % 3},
+            'update_quotation': lambda i: {"action": "update_quotation", "order_name": self._draft_order(i),
+                                           "product": self._pick(self.in_stock, i + 1), "qty": 2},
+            'confirm_quotation': lambda i: {"action": "confirm_quotation", "order_name": self._draft_order(i)},
+            'cancel_order': lambda i: {"action": "cancel_order", "order_name": self._draft_order(i)},
+            'create_order': lambda i: {"action": "create_order", **self._pick(self.partners, i),
+                                       "product": self._pick(self.in_stock, i), "qty": 1},
+            'create_opportunity': lambda i: {"action": "create_opportunity", **self._pick(self.partners, i),
+                                             "product": self._pick(self.products, i), "qty": 3},
+        }
+
+
+async def run_action(client, fake_llm: FakeLLM, rpc_counter, action: str, make_intent: Callable[[int], dict],
+                     i: int) -> dict:
+    """Gửi 1 tin nhắn cho action, trả về thời gian (ms), số RPC, lỗi"""
+    message = f"bench {action} {i}"
+    fake_llm.intents[message] = make_intent(i)
+    with rpc_counter.track() as calls:
+        start = time.perf_counter()
+        response = await client.post('/chat', json={'message': message})
+        elapsed = (time.perf_counter() - start) * 1000
+    reply = response.json().get('reply') if response.status_code == 200 else None
+    return {'ms': elapsed, 'rpc': len(calls), 'ok': bool(reply) and not reply.startswith('❌')}
+
+
+async def bench(options: argparse.Namespace, store, fake_llm: FakeLLM) -> Dict[str, dict]:
+    import httpx
+    from backend.main import app
+    from backend.services.odoo_service import odoo_service
+
+    rpc_counter = odoo_service.rpc_counter
+    scenarios = Scenarios(store).build()
+    selected = [a.strip() for a in options.actions.split(',') if a.strip()] or list(scenarios)
+    unknown = [a for a in selected if a not in scenarios]
+    if unknown:
+        raise SystemExit(f"Action không hỗ trợ: {', '.join(unknown)}")
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=120) as client:
+        for action in selected:
+            make_intent = scenarios[action]
+            counter = 0
+            for _ in range(options.warmup):
+                await run_action(client, fake_llm, rpc_counter, action, make_intent, counter)
+                counter += 1
+
+            gc.collect()
+            samples = []
+            for _ in range(options.iterations):
+                samples.append(await run_action(client, fake_llm, rpc_counter, action, make_intent, counter))
+                counter += 1
+
+            # Đo bộ nhớ riêng (tracemalloc làm chậm, không trộn với số đo độ trễ)
+            peaks = []
+            tracemalloc.start()
+            try:
+                for _ in range(options.alloc_iterations):
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    await run_action(client, fake_llm, rpc_counter, action, make_intent, counter)
+                    peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+                    counter += 1
+            finally:
+                tracemalloc.stop()
+
+            latencies = [s['ms'] for s in samples]
+            rpcs = [s['rpc'] for s in samples]
+            results[action] = {
+                'iterations': len(samples),
+                'errors': sum(1 for s in samples if not s['ok']),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'rpc': percentile(rpcs, 50),
+                'rpc_max': max(rpcs),
+                'peak_kb': round(percentile(peaks, 50), 1) if peaks else None,
+            }
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: dict, options: argparse.Namespace) -> List[str]:
+    """Danh sách regression so với baseline (độ trễ, số RPC, bộ nhớ)"""
+    regressions = []
+    for action, current in results.items():
+        base = baseline.get('results', {}).get(action)
+        if not base:
+            continue
+        # p50 ổn định hơn p95 với số mẫu nhỏ -> dùng p50 làm ngưỡng chặn, p95 chỉ để theo dõi
+        limit = max(base['p50_ms'] * (1 + options.tolerance), base['p50_ms'] + options.min_delta_ms)
+        if current['p50_ms'] > limit:
+            regressions.append(f"{action}: p50 {current['p50_ms']}ms > {base['p50_ms']}ms")
+        if current['rpc'] > base['rpc']:
+            regressions.append(f"{action}: RPC {current['rpc']} > {base['rpc']}")
+        if current['peak_kb'] and base.get('peak_kb') and current['peak_kb'] > base['peak_kb'] * (1 + options.tolerance):
+            regressions.append(f"{action}: bộ nhớ {current['peak_kb']}KB > {base['peak_kb']}KB")
+        if current['errors']:
+            regressions.append(f"{action}: {current['errors']} request lỗi")
+    return regressions
+
+
+def print_report(results: Dict[str, dict], baseline: Optional[dict]):
+    base_results = (baseline or {}).get('results', {})
+    header = f"{'action':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'rpc':>6}{'peak KB':>10}{'base p50':>10}{'base rpc':>10}"
+    print(header)
+    print('-' * len(header))
+    for action, r in results.items():
+        base = base_results.get(action, {})
+        print(f"{action:<24}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['rpc']:>6}"
+              f"{r['peak_kb'] or 0:>10.1f}{base.get('p50_ms', '-'):>10}{base.get('rpc', '-'):>10}")
+
+
+def main(argv: List[str] = None) -> int:
+    options = parse_args(argv)
+    configure_environment()
+
+    from backend.fakes.odoo_env import install_fake_odoo
+    from backend.fakes.odoo_store import build_demo_dataset
+
+    store = build_demo_dataset(n_products=options.products, n_partners=options.partners, n_orders=options.orders)
+    install_fake_odoo(store, latency=options.latency / 1000, seed=42)
+
+    fake_llm = FakeLLM(latency=options.llm_latency / 1000)
+    fake_llm.start()
+
+    from backend.services.llm_service import llm_service
+    llm_service.base_url = fake_llm.url
+    llm_service._client = None
+
+    logs = contextlib.nullcontext() if options.verbose else contextlib.redirect_stdout(io.StringIO())
+    with logs:
+        results = asyncio.run(bench(options, store, fake_llm))
+
+    baseline_path = Path(options.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else None
+    dataset = {key: getattr(options, key) for key in DATASET_KEYS}
+    print_report(results, baseline)
+
+    if options.json_path:
+        Path(options.json_path).write_text(json.dumps({'dataset': dataset, 'results': results}, indent=2), encoding='utf-8')
+
+    if options.update_baseline:
+        merged = dict((baseline or {}).get('results', {})) if baseline and baseline.get('dataset') == dataset else {}
+        merged.update(results)
+        baseline_path.write_text(json.dumps({'dataset': dataset, 'results': merged}, indent=2) + '\n', encoding='utf-8')
+        print(f"\nĐã ghi baseline: {baseline_path}")
+        return 0
+
+    if baseline is None:
+        print("\nChưa có baseline (chạy với --update-baseline để tạo)")
+        return 0
+    if baseline.get('dataset') != dataset:
+        print(f"\nBỏ qua so sánh: tham số khác baseline ({baseline.get('dataset')})")
+        return 0
+
+    regressions = compare(results, baseline, options)
+    if regressions:
+        print("\n❌ Regression:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ Không có regression so với baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
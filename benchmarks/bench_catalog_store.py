@@ -0,0 +1,198 @@
+"""
+Benchmark catalog dạng cột NumPy (backend.services.catalog_store) so với dict từng sản phẩm
+(cách lưu cũ của ProductCatalog: {id: {field: value, '_name_lower': ...}}), chạy offline.
+
+- Bộ nhớ: tracemalloc sau khi dựng từ cùng các dòng search_read giả (đã bỏ dòng gốc)
+- Lọc 'còn hàng, giá sau thuế <= X': vòng lặp Python trên dict vs mặt nạ NumPy
+- Giá sau thuế cho K sản phẩm: vòng lặp vs 1 phép tính mảng
+- Đọc 1 sản phẩm theo ID (dict nhanh hơn, cột phải dựng lại dict)
+
+VD (từ thư mục gốc):
+    python -m benchmarks.bench_catalog_store
+    python -m benchmarks.bench_catalog_store --products 20000 --batch 200 --json
+"""
+import argparse
+import gc
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from backend.services.catalog_store import ProductColumns
+from benchmarks.bench_product_index import generate_names
+
+TAX_AMOUNTS = {1: 10.0, 2: 8.0, 3: 5.0}
+PUBLIC_FIELDS = ['id', 'name', 'list_price', 'standard_price', 'qty_available', 'taxes_id', 'product_tmpl_id']
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark catalog dạng cột NumPy vs dict")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=500, help="Số sản phẩm khi tính giá sau thuế theo lô")
+    parser.add_argument("--max-price", type=float, default=10_000_000, help="Ngưỡng giá sau thuế khi lọc")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    return parser.parse_args(argv)
+
+
+def generate_rows(n: int, seed: int) -> List[dict]:
+    """Dòng giống search_read(product.product, CATALOG_FIELDS)"""
+    rng = random.Random(seed)
+    names = generate_names(n, rng)
+    rows = []
+    for product_id, name in names.items():
+        price = rng.randrange(100, 50000) * 1000.0
+        rows.append({
+            'id': product_id,
+            'name': name,
+            'list_price': price,
+            'standard_price': round(price * 0.7, 2),
+            'qty_available': float(rng.choice([0, 0, 0, rng.randint(1, 200)])),
+            'taxes_id': rng.choice([[], [1], [1], [2], [3]]),
+            # 2 biến thể / template
+            'product_tmpl_id': [(product_id + 1) // 2, name],
+            'sale_ok': True,
+            'active': True,
+            'write_date': '2025-01-01 00:00:00',
+        })
+    return rows
+
+
+def build_dicts(rows: List[dict]) -> Dict[int, dict]:
+    """Cách lưu cũ (ProductCatalog._store_entry)"""
+    products = {}
+    for row in rows:
+        entry = {f: row.get(f) for f in PUBLIC_FIELDS}
+        entry['_name_lower'] = (row.get('name') or '').lower()
+        products[row['id']] = entry
+    return products
+
+
+def build_columns(rows: List[dict]) -> ProductColumns:
+    return ProductColumns.from_rows(rows, TAX_AMOUNTS)
+
+
+def measure_memory(n: int, seed: int, build: Callable[[List[dict]], object]) -> int:
+    """Byte còn giữ sau khi dựng cấu trúc từ dòng search_read mới sinh và bỏ dòng gốc"""
+    gc.collect()
+    tracemalloc.start()
+    rows = generate_rows(n, seed)
+    structure = build(rows)
+    del rows
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del structure
+    return retained
+
+
+def timeit(fn: Callable[[], object], repeat: int) -> float:
+    """Thời gian trung vị (ms)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: List[str] = None) -> Dict[str, object]:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    dict_bytes = measure_memory(args.products, args.seed, build_dicts)
+    column_bytes = measure_memory(args.products, args.seed, build_columns)
+
+    rows = generate_rows(args.products, args.seed)
+    products = build_dicts(rows)
+    store = build_columns(rows)
+    del rows
+
+    # 1. Còn hàng, giá sau thuế <= max_price
+    def filter_dicts():
+        result = []
+        for p in products.values():
+            taxes = p['taxes_id']
+            price = p['list_price'] * (1 + (TAX_AMOUNTS.get(taxes[0], 0) if taxes else 0) / 100)
+            if p['qty_available'] > 0 and price <= args.max_price:
+                result.append(p['id'])
+        return result
+
+    def filter_columns():
+        return store.column('id')[store.filter(max_price=args.max_price, in_stock=True)]
+
+    assert filter_dicts() == filter_columns().tolist(), "Kết quả lọc khác nhau"
+
+    # 2. Giá sau thuế cho 1 lô sản phẩm
+    batch = rng.sample(list(products), min(args.batch, len(products)))
+
+    def price_dicts():
+        prices = []
+        for product_id in batch:
+            p = products[product_id]
+            taxes = p['taxes_id']
+            prices.append(p['list_price'] * (1 + (TAX_AMOUNTS.get(taxes[0], 0) if taxes else 0) / 100))
+        return prices
+
+    def price_columns():
+        return store.prices_with_tax(store.positions(batch))
+
+    assert price_dicts() == price_columns().tolist(), "Giá sau thuế khác nhau"
+
+    # 3. Đọc 1 sản phẩm theo ID
+    probe = batch[0]
+    get_dict_us = timeit(lambda: [dict(products[probe]) for _ in range(1000)], args.repeat)
+    get_column_us = timeit(lambda: [store.get(probe) for _ in range(1000)], args.repeat)
+
+    report = {
+        'products': args.products,
+        'memory': {
+            'dict_mb': round(dict_bytes / 1024 / 1024, 1),
+            'columns_mb': round(column_bytes / 1024 / 1024, 1),
+            'columns_numeric_mb': round(store.stats()['column_bytes'] / 1024 / 1024, 1),
+            'ratio': round(column_bytes / dict_bytes, 3),
+        },
+        'filter_in_stock_max_price': {
+            'matches': len(filter_dicts()),
+            'dict_ms': round(timeit(filter_dicts, args.repeat), 3),
+            'columns_ms': round(timeit(filter_columns, args.repeat), 3),
+        },
+        'price_with_tax_batch': {
+            'batch': len(batch),
+            'dict_ms': round(timeit(price_dicts, args.repeat), 3),
+            'columns_ms': round(timeit(price_columns, args.repeat), 3),
+        },
+        'get_by_id_us': {
+            'dict': round(get_dict_us, 3),
+            'columns': round(get_column_us, 3),
+        },
+    }
+    for name in ('filter_in_stock_max_price', 'price_with_tax_batch'):
+        section = report[name]
+        section['speedup'] = round(section['dict_ms'] / section['columns_ms'], 1) if section['columns_ms'] else None
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+
+    memory = report['memory']
+    print(f"Catalog {args.products} sản phẩm")
+    print(f"Bộ nhớ: dict {memory['dict_mb']} MB | cột NumPy {memory['columns_mb']} MB "
+          f"(số: {memory['columns_numeric_mb']} MB) -> {memory['ratio'] * 100:.1f}%")
+    f = report['filter_in_stock_max_price']
+    print(f"Lọc còn hàng + giá sau thuế <= {args.max_price:,.0f}: {f['matches']} sản phẩm, "
+          f"dict {f['dict_ms']} ms | cột {f['columns_ms']} ms (x{f['speedup']})")
+    b = report['price_with_tax_batch']
+    print(f"Giá sau thuế {b['batch']} sản phẩm: dict {b['dict_ms']} ms | cột {b['columns_ms']} ms (x{b['speedup']})")
+    g = report['get_by_id_us']
+    print(f"Đọc 1 sản phẩm theo ID: dict {g['dict']} µs | cột {g['columns']} µs")
+    return report
+
+
+if __name__ == '__main__':
+    main()
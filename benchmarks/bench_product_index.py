@@ -0,0 +1,212 @@
+"""
+Benchmark index trigram tên sản phẩm (backend.services.product_index), chạy offline.
+
+- Catalog giả: N tên sản phẩm tiếng Việt có dấu (loại + hãng + dòng + dung lượng + màu)
+- Truy vấn sinh từ tên thật theo từng kiểu: nguyên tên, bỏ dấu, lỗi gõ (xóa 1 ký tự),
+  bỏ dấu + lỗi gõ (Odoo 'ilike' đều bỏ sót), thiếu từ cuối, chỉ loại + hãng (mơ hồ thật sự)
+- Chất lượng: top-1, top-5, MRR; tỉ lệ tự chọn và độ chính xác khi tự chọn
+  (truy vấn thiếu từ: khớp = tên bắt đầu bằng truy vấn; tự chọn đúng khi chỉ 1 tên như vậy)
+- Độ trễ truy vấn p50/p95/p99 (ms), thời gian dựng index, cập nhật tăng dần, bộ nhớ (tracemalloc)
+
+VD (từ thư mục gốc):
+    python -m benchmarks.bench_product_index
+    python -m benchmarks.bench_product_index --products 20000 --queries 500 --json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from backend.services.product_index import ProductNameIndex, pick_best
+from backend.utils.formatter import normalize_text
+
+CATEGORIES = ['Điện thoại', 'Máy tính bảng', 'Tai nghe', 'Đồng hồ thông minh', 'Laptop', 'Màn hình',
+              'Bàn phím', 'Chuột không dây', 'Loa', 'Sạc dự phòng', 'Ốp lưng', 'Cáp sạc', 'Máy ảnh', 'Tủ lạnh']
+BRANDS = ['Samsung', 'Apple', 'Xiaomi', 'Oppo', 'Vivo', 'Sony', 'Asus', 'Dell', 'HP', 'Lenovo', 'Huawei',
+          'Realme', 'Nokia', 'JBL', 'Logitech', 'Anker', 'Baseus', 'Panasonic', 'LG', 'Canon']
+SERIES = ['Galaxy', 'Note', 'Pro', 'Nova', 'Reno', 'Find', 'Redmi', 'Xperia', 'ZenBook', 'Inspiron',
+          'Pavilion', 'ThinkPad', 'Mate', 'Soundcore', 'Bravia', 'Gram', 'Lumix', 'Tune', 'Air', 'Ultra']
+VARIANTS = ['64GB', '128GB', '256GB', '512GB', '1TB', 'Wifi', '5G', 'Lite', 'Plus', 'Max']
+COLORS = ['Đen', 'Trắng', 'Xanh dương', 'Xanh lá', 'Vàng đồng', 'Bạc', 'Hồng', 'Tím', 'Đỏ', 'Xám']
+
+QUERY_KINDS = ['exact', 'no_accent', 'typo', 'no_accent_typo', 'partial', 'broad']
+# Kiểu truy vấn là tiền tố của tên (nhiều sản phẩm có thể khớp như nhau)
+PREFIX_KINDS = ('partial', 'broad')
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark index trigram tên sản phẩm")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000, help="Số truy vấn mỗi kiểu")
+    parser.add_argument("--updates", type=int, default=5000, help="Số sản phẩm đổi tên/ngừng bán khi đo cập nhật tăng dần")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON")
+    return parser.parse_args(argv)
+
+
+def generate_names(n: int, rng: random.Random) -> Dict[int, str]:
+    """N tên sản phẩm không trùng (VD 'Điện thoại Samsung Galaxy S24 256GB Xanh dương')"""
+    names, seen = {}, set()
+    while len(names) < n:
+        name = (f"{rng.choice(CATEGORIES)} {rng.choice(BRANDS)} {rng.choice(SERIES)} "
+                f"{rng.choice('ABCMSXZ')}{rng.randint(1, 99)} {rng.choice(VARIANTS)} {rng.choice(COLORS)}")
+        if name not in seen:
+            seen.add(name)
+            names[len(names) + 1] = name
+    return names
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    """Xóa 1 ký tự trong 1 từ dài >= 4 ký tự (lỗi gõ thường gặp)"""
+    tokens = text.split()
+    candidates = [i for i, t in enumerate(tokens) if len(t) >= 4]
+    if not candidates:
+        return text
+    i = rng.choice(candidates)
+    pos = rng.randrange(1, len(tokens[i]))
+    tokens[i] = tokens[i][:pos] + tokens[i][pos + 1:]
+    return ' '.join(tokens)
+
+
+def make_query(kind: str, name: str, rng: random.Random) -> str:
+    if kind == 'exact':
+        return name
+    if kind == 'no_accent':
+        return normalize_text(name)
+    if kind == 'typo':
+        return _typo(name, rng)
+    if kind == 'no_accent_typo':
+        return _typo(normalize_text(name), rng)
+    if kind == 'partial':
+        return ' '.join(name.split()[:-1])
+    # broad: chỉ loại + hãng (VD 'Điện thoại Samsung') -> hàng trăm sản phẩm, không được tự chọn
+    category = next(c for c in CATEGORIES if name.startswith(c + ' '))
+    return ' '.join(name.split()[:len(category.split()) + 1])
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _prefix_counts(names: Dict[int, str], words: int) -> Counter:
+    """Số sản phẩm theo tiền tố 'words' từ đầu của tên đã bỏ dấu"""
+    return Counter(' '.join(normalize_text(n).split()[:words]) for n in names.values())
+
+
+def run_queries(index: ProductNameIndex, names: Dict[int, str], kind: str, count: int,
+                rng: random.Random) -> Dict[str, float]:
+    ids = rng.sample(list(names), min(count, len(names)))
+    prefix_counts: Dict[int, Counter] = {}
+    latencies, reciprocal = [], []
+    top1 = top5 = picked = picked_right = 0
+    for product_id in ids:
+        query = make_query(kind, names[product_id], rng)
+        start = time.perf_counter()
+        matches = index.search(query, limit=15)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        ranked = [pid for pid, _ in matches]
+        unique = True
+        if kind in PREFIX_KINDS:
+            folded = normalize_text(query)
+            words = len(folded.split())
+            if words not in prefix_counts:
+                prefix_counts[words] = _prefix_counts(names, words)
+            unique = prefix_counts[words][folded] == 1
+            relevant = {pid for pid in ranked if normalize_text(names[pid]).startswith(folded + ' ')} | {product_id}
+        else:
+            relevant = {product_id}
+        rank = next((i for i, pid in enumerate(ranked, 1) if pid in relevant), None)
+        top1 += rank == 1
+        top5 += rank is not None and rank <= 5
+        reciprocal.append(1 / rank if rank else 0.0)
+
+        choice = pick_best(matches)
+        if choice is not None:
+            picked += 1
+            picked_right += choice in relevant and unique
+
+    n = len(ids)
+    return {
+        'queries': n,
+        'top1': round(top1 / n, 4),
+        'top5': round(top5 / n, 4),
+        'mrr': round(statistics.mean(reciprocal), 4),
+        'autopick_rate': round(picked / n, 4),
+        'autopick_precision': round(picked_right / picked, 4) if picked else None,
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p95_ms': round(_percentile(latencies, 95), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3),
+    }
+
+
+def main(argv: List[str] = None) -> Dict[str, object]:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    names = generate_names(args.products, rng)
+
+    # Bộ nhớ đo ở lần dựng riêng (tracemalloc làm chậm thời gian dựng)
+    tracemalloc.start()
+    ProductNameIndex().rebuild(names.items())
+    memory_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    index = ProductNameIndex()
+    index.rebuild(names.items())
+    build_seconds = time.perf_counter() - start
+
+    results = {kind: run_queries(index, names, kind, args.queries, rng) for kind in QUERY_KINDS}
+
+    # Cập nhật tăng dần: đổi tên 1 nửa, ngừng bán 1 nửa (giống refresh_incremental của catalog)
+    changed: List[Tuple[int, str]] = []
+    sample = rng.sample(list(names), min(args.updates, len(names)))
+    start = time.perf_counter()
+    for i, product_id in enumerate(sample):
+        if i % 2:
+            index.remove(product_id)
+            del names[product_id]
+        else:
+            names[product_id] = names[product_id] + ' (2025)'
+            index.add(product_id, names[product_id])
+            changed.append((product_id, names[product_id]))
+    update_ms = (time.perf_counter() - start) * 1000
+    after_update = run_queries(index, names, 'no_accent', args.queries, rng)
+
+    report = {
+        'products': args.products,
+        'build_seconds': round(build_seconds, 3),
+        'index_peak_memory_mb': round(memory_bytes / 1024 / 1024, 1),
+        'queries': results,
+        'incremental': {
+            'updates': len(sample),
+            'avg_update_us': round(update_ms * 1000 / max(1, len(sample)), 1),
+            'after_update_no_accent': after_update,
+        },
+        'index': index.stats(),
+    }
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+
+    print(f"Index {args.products} sản phẩm: dựng {report['build_seconds']}s, bộ nhớ đỉnh ~{report['index_peak_memory_mb']} MB")
+    header = f"{'Kiểu truy vấn':<16}{'top1':>8}{'top5':>8}{'MRR':>8}{'tự chọn':>9}{'chọn đúng':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    rows = list(results.items()) + [('sau cập nhật', after_update)]
+    for kind, r in rows:
+        precision = '-' if r['autopick_precision'] is None else f"{r['autopick_precision']:.3f}"
+        print(f"{kind:<16}{r['top1']:>8.3f}{r['top5']:>8.3f}{r['mrr']:>8.3f}{r['autopick_rate']:>9.3f}"
+              f"{precision:>11}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}{r['p99_ms']:>9.3f}")
+    print(f"Cập nhật tăng dần: {len(sample)} sản phẩm, trung bình {report['incremental']['avg_update_us']} µs/sản phẩm")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,35 @@
 import { useState, useRef, useEffect } from 'react'
-import axios from 'axios'
 import './App.css'
 
+const API_URL = 'http://127.0.0.1:8000';
+
+// Đọc stream Server-Sent Events, gọi onEvent(event, data) cho từng event
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let separator;
+    while ((separator = buffer.indexOf('\n\n')) >= 0) {
+      const rawEvent = buffer.slice(0, separator);
+      buffer = buffer.slice(separator + 2);
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 function App() {
   // Danh sách tin nhắn ban đầu
   const [messages, setMessages] = useState([
@@ -11,6 +39,8 @@ function App() {
   const [isLoading, setIsLoading] = useState(false);
   const [salesRepName, setSalesRepName] = useState('Admin'); // Tên nhân viên
   const [showSettings, setShowSettings] = useState(false);
+  // Phiên chat phía server: chỉ gửi session_id + tin nhắn, lịch sử do backend giữ
+  const [sessionId, setSessionId] = useState(() => localStorage.getItem('chatSessionId'));
   
   // Tự động cuộn xuống tin nhắn mới nhất
   const messagesEndRef = useRef(null);
@@ -29,17 +59,46 @@ function App() {
     setInput('');
     setIsLoading(true);
 
+    // Bong bóng tạm thời hiển thị tiến trình / token đang stream
+    let progress = [];
+    let partialReply = '';
+    const renderPending = () => {
+      const content = [...progress, partialReply].filter(Boolean).join('\n');
+      setMessages([...newMessages, { role: 'bot', content: content || '...', pending: true }]);
+    };
+
     try {
-      // 2. Gửi sang Python Backend (Cổng 8000) với thông tin sales rep
-      const historyPayload = messages.slice(-10);
-      const response = await axios.post('http://127.0.0.1:8000/chat', {
-        message: input,
-        history: historyPayload,
-        sales_rep_name: salesRepName  
+      // 2. Gửi sang Python Backend (Cổng 8000) với thông tin sales rep, nhận kết quả dạng stream
+      const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          message: input,
+          session_id: sessionId,
+          sales_rep_name: salesRepName
+        })
+      });
+      if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+      let finalReply = null;
+      await readEventStream(response, (event, data) => {
+        if (event === 'token') {
+          partialReply += data.text;
+          renderPending();
+        } else if (event === 'stage' && data.stage !== 'intent_parsed') {
+          progress = [...progress, data.message];
+          renderPending();
+        } else if (event === 'reply') {
+          finalReply = data.reply;
+          if (data.session_id && data.session_id !== sessionId) {
+            setSessionId(data.session_id);
+            localStorage.setItem('chatSessionId', data.session_id);
+          }
+        }
       });
 
-      // 3. Nhận phản hồi từ Bot
-      setMessages([...newMessages, { role: 'bot', content: response.data.reply }]);
+      // 3. Nhận phản hồi cuối cùng từ Bot
+      setMessages([...newMessages, { role: 'bot', content: finalReply ?? partialReply }]);
     } catch (error) {
       console.error("Lỗi:", error);
       setMessages([...newMessages, { role: 'bot', content: "⚠️ Lỗi kết nối Server! Bạn đã chạy backend chưa?" }]);
@@ -98,14 +157,14 @@ function App() {
               justifyContent: msg.role === 'user' ? 'flex-end' : 'flex-start',
               marginBottom: '15px' 
             }}>
-            <div className={msg.role === 'user' ? 'userBubble' : 'botBubble'}>
+            <div className={msg.role === 'user' ? 'userBubble' : (msg.pending ? 'botBubble pending' : 'botBubble')}>
               {msg.content.split('\n').map((line, i) => (
                 <div key={i}>{line}</div>
               ))}
             </div>
           </div>
         ))}
-        {isLoading && <div style={{fontStyle: 'italic', color: '#666'}}>Bot đang nhập...</div>}
+        {isLoading && !messages[messages.length - 1]?.pending && <div style={{fontStyle: 'italic', color: '#666'}}>Bot đang nhập...</div>}
         <div ref={messagesEndRef} />
       </div>
 
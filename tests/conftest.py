@@ -0,0 +1,48 @@
+import os
+
+# Cấu hình fake (trước khi import backend.config): không cần Odoo/LLM thật, không ghi file SQLite
+for name, value in {
+    'ODOO_URL': 'http://fake-odoo:8069',
+    'ODOO_DB': 'fake',
+    'ODOO_USERNAME': 'admin',
+    'ODOO_PASSWORD': 'admin',
+    'OPENAI_API_KEY': 'fake',
+    'SESSION_DB_PATH': '',
+    'INTENT_CACHE_DB_PATH': '',
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+
+from backend.fakes.odoo_env import FakeODOO  # noqa: E402
+from backend.fakes.odoo_store import build_demo_dataset  # noqa: E402
+from backend.services.catalog_cache import product_catalog  # noqa: E402
+from backend.services.odoo_service import odoo_service  # noqa: E402
+from backend.services.pricelist_engine import pricelist_engine  # noqa: E402
+from backend.services.result_cache import result_cache  # noqa: E402
+
+
+@pytest.fixture
+def fake_odoo(request):
+    """Fake odoorpc trên dữ liệu demo (độ trễ mỗi RPC lấy từ marker latency), catalog/pricelist/result cache sạch"""
+    marker = request.node.get_closest_marker('latency')
+    fake = FakeODOO(build_demo_dataset(n_products=20, n_partners=5, n_orders=3),
+                    latency=marker.args[0] if marker else 0.0)
+    fake.login(fake.store.db, fake.store.username, fake.store.password)
+    previous = odoo_service.__dict__.get('_odoo')
+    odoo_service.use_connection(fake)
+    product_catalog.invalidate()
+    pricelist_engine.invalidate()
+    result_cache.clear()
+    yield fake
+    product_catalog.invalidate()
+    pricelist_engine.invalidate()
+    result_cache.clear()
+    if previous is None:
+        odoo_service.__dict__.pop('_odoo', None)
+    else:
+        odoo_service._odoo = previous
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'latency(seconds): độ trễ giả lập mỗi RPC của fixture fake_odoo')
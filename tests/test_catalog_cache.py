@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services.catalog_cache import advance_watermark, after_watermark, product_catalog
+from backend.services.product_service import product_service
+from backend.services.result_cache import result_cache
+
+
+def test_watermark_skips_rows_already_applied():
+    rows = [{'id': 1, 'write_date': '2025-01-01 00:00:05'},
+            {'id': 2, 'write_date': '2025-01-01 00:00:05'},
+            {'id': 3, 'write_date': '2025-01-01 00:00:01'}]
+    last_write, seen = advance_watermark(rows, None, set())
+    assert (last_write, seen) == ('2025-01-01 00:00:05', {1, 2})
+
+    # Lần sau: dòng 2 cùng write_date nhưng đã áp dụng; dòng 4 mới cùng write_date vẫn lấy
+    again = rows[:2] + [{'id': 4, 'write_date': '2025-01-01 00:00:05'}]
+    assert [r['id'] for r in after_watermark(again, last_write, seen)] == [4]
+    assert advance_watermark(again, last_write, seen) == (last_write, {1, 2, 4})
+
+
+def test_refresh_counts_each_change_once(fake_odoo):
+    product_catalog.full_load()
+    start = product_catalog.stats()['incremental_updates']
+    product_catalog.refresh_incremental()
+    product_catalog.refresh_incremental()
+    assert product_catalog.stats()['incremental_updates'] == start
+
+    product_id = min(fake_odoo.store.records['product.product'])
+    fake_odoo.store.write('product.product', [product_id], {'name': 'iPhone 99 Ultra'})
+    product_catalog.refresh_incremental()
+    product_catalog.refresh_incremental()
+    assert product_catalog.stats()['incremental_updates'] == start + 1
+    assert product_catalog.get(product_id)['name'] == 'iPhone 99 Ultra'
+
+
+def test_template_change_reloads_variants_once(fake_odoo):
+    product_catalog.full_load()
+    start = product_catalog.stats()['incremental_updates']
+    template_id = min(fake_odoo.store.records['product.template'])
+    fake_odoo.store.write('product.template', [template_id], {'list_price': 123.0})
+    product_catalog.refresh_incremental()
+    updates = product_catalog.stats()['incremental_updates']
+    assert updates > start
+    product_catalog.refresh_incremental()
+    assert product_catalog.stats()['incremental_updates'] == updates
+
+
+def test_unchanged_catalog_keeps_cached_entries(fake_odoo, monkeypatch):
+    product_service.suggest_pricing('Máy chiếu Epson')
+    invalidated = result_cache.stats()['evictions']['invalidate']
+    monkeypatch.setattr(product_catalog, 'ttl', 0)
+    monkeypatch.setattr(product_catalog, 'stock_ttl', 0)
+    product_service.suggest_pricing('Máy chiếu Epson')
+    product_service.suggest_pricing('Máy chiếu Epson')
+    assert result_cache.stats()['evictions']['invalidate'] == invalidated
+
+
+def run_concurrently(func, n=8):
+    with ThreadPoolExecutor(n) as executor:
+        for future in [executor.submit(func) for _ in range(n)]:
+            future.result()
+
+
+@pytest.mark.latency(0.02)
+def test_concurrent_cold_requests_load_once(fake_odoo):
+    start = product_catalog.stats()['full_loads']
+    run_concurrently(product_catalog.ensure_fresh)
+    assert product_catalog.stats()['full_loads'] == start + 1
+
+
+@pytest.mark.latency(0.02)
+def test_concurrent_expired_requests_refresh_once(fake_odoo, monkeypatch):
+    product_catalog.ensure_fresh()
+    before = product_catalog.stats()
+    monkeypatch.setattr(product_catalog, '_checked_at', 0.0)
+    monkeypatch.setattr(product_catalog, '_stock_at', 0.0)
+    run_concurrently(product_catalog.ensure_fresh)
+    after = product_catalog.stats()
+    assert after['stale_refreshes'] == before['stale_refreshes'] + 1
+    assert after['stock_refreshes'] == before['stock_refreshes'] + 1
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from backend.services import catalog_store
+from backend.services.catalog_store import ProductColumns
+
+TAX_AMOUNTS = {1: 10.0, 2: 8.0}
+
+
+def make_row(product_id, name, price=1000.0, qty=5.0, taxes=(1,), tmpl_id=None):
+    return {
+        'id': product_id,
+        'name': name,
+        'list_price': price,
+        'standard_price': price * 0.7,
+        'qty_available': qty,
+        'taxes_id': list(taxes),
+        'product_tmpl_id': [tmpl_id or product_id, name],
+    }
+
+
+@pytest.fixture
+def store():
+    return ProductColumns.from_rows([
+        make_row(30, 'Tai nghe Sony', 2000.0, qty=0),
+        make_row(10, 'Điện thoại Samsung', 1000.0),
+        make_row(20, 'Laptop Dell', 3000.0, taxes=(2,)),
+    ], TAX_AMOUNTS)
+
+
+def test_rows_sorted_by_id_and_shaped_like_search_read(store):
+    assert store.column('id').tolist() == [10, 20, 30]
+    assert store.get(20) == {
+        'id': 20,
+        'name': 'Laptop Dell',
+        'list_price': 3000.0,
+        'standard_price': 2100.0,
+        'qty_available': 5.0,
+        'taxes_id': [2],
+        'product_tmpl_id': [20, 'Laptop Dell'],
+    }
+    assert store.get(99) is None
+
+
+def test_upsert_updates_and_inserts(store):
+    updated = store.upsert([
+        make_row(20, 'Laptop Dell XPS', 3500.0, taxes=()),
+        make_row(15, 'Chuột Logitech', 500.0),
+        make_row(40, 'Loa JBL', 800.0, qty=0),
+    ], TAX_AMOUNTS)
+
+    assert updated.column('id').tolist() == [10, 15, 20, 30, 40]
+    assert updated.get(20)['name'] == 'Laptop Dell XPS'
+    assert updated.get(20)['list_price'] == 3500.0
+    assert updated.get(20)['taxes_id'] == []
+    assert updated.get(15)['name'] == 'Chuột Logitech'
+    # Các cột của cùng 1 sản phẩm vẫn đi cùng nhau sau khi sắp xếp lại
+    for product_id in [10, 15, 20, 30, 40]:
+        assert updated.get(product_id)['product_tmpl_id'][0] == product_id
+
+
+def test_upsert_does_not_touch_previous_version(store):
+    before = store.get(20)
+    store.upsert([make_row(20, 'Laptop Dell XPS', 3500.0), make_row(5, 'Ốp lưng', 100.0)], TAX_AMOUNTS)
+    store.with_stock([10], [0.0])
+    store.remove([10])
+    assert store.column('id').tolist() == [10, 20, 30]
+    assert store.get(20) == before
+    assert store.get(10)['qty_available'] == 5.0
+
+
+def test_columns_are_read_only(store):
+    with pytest.raises(ValueError):
+        store.column('list_price')[0] = 0
+
+
+def test_remove(store):
+    removed = store.remove([10, 30, 99])
+    assert removed.column('id').tolist() == [20]
+    assert removed.get(10) is None
+    assert removed.get(20)['name'] == 'Laptop Dell'
+    assert removed.positions([10, 20, 30]).tolist() == [-1, 0, -1]
+    assert store.remove([]) is store
+    assert store.remove([99]) is store
+    assert len(removed.remove([20])) == 0
+
+
+def test_with_stock_ignores_unknown_ids(store):
+    restocked = store.with_stock([30, 99], [7.0, 1.0])
+    assert restocked.get(30)['qty_available'] == 7.0
+    assert len(restocked) == 3
+
+
+def test_filter_and_prices_with_tax(store):
+    prices = store.prices_with_tax(store.positions([10, 20, 30]))
+    assert prices.tolist() == pytest.approx([1100.0, 3240.0, 2200.0])
+
+    in_stock = store.filter(in_stock=True)
+    assert store.column('id')[in_stock].tolist() == [10, 20]
+    cheap = store.filter(max_price=2500.0)
+    assert store.column('id')[cheap].tolist() == [10, 30]
+    list_price = store.filter(min_price=2000.0, with_tax=False)
+    assert store.column('id')[list_price].tolist() == [20, 30]
+
+
+def test_name_table_is_compacted(monkeypatch, store):
+    monkeypatch.setattr(catalog_store, 'NAME_COMPACT_MIN', 0)
+    current = store
+    for i in range(20):
+        current = current.upsert([make_row(10, f'Điện thoại Samsung v{i}')], TAX_AMOUNTS)
+        assert current.stats()['names'] <= catalog_store.NAME_COMPACT_RATIO * 2 * len(current)
+    assert current.get(10)['name'] == 'Điện thoại Samsung v19'
+    assert current.get(20)['name'] == 'Laptop Dell'
+    assert current.get(30)['taxes_id'] == [1]
+
+
+def test_empty_store():
+    empty = ProductColumns()
+    assert len(empty) == 0
+    assert empty.positions([1]).tolist() == [-1]
+    assert empty.get(1) is None
+    grown = empty.upsert([make_row(1, 'Loa')], TAX_AMOUNTS)
+    assert grown.get(1)['name'] == 'Loa'
+    assert np.array_equal(grown.filter(), [0])
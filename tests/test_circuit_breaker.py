@@ -0,0 +1,112 @@
+"""Circuit breaker: mở khi tỉ lệ lỗi vượt ngưỡng, half_open sau open_seconds, đóng lại khi thử thành công"""
+import asyncio
+import time
+
+import pytest
+
+from backend.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise ConnectionError("odoo down")
+
+
+def make_breaker(**kwargs):
+    options = dict(window=4, min_calls=4, failure_ratio=0.5, open_seconds=0.05)
+    options.update(kwargs)
+    return CircuitBreaker('test', **options)
+
+
+def test_opens_after_failure_ratio_and_rejects():
+    breaker = make_breaker()
+    breaker.call(lambda: 1)
+    breaker.call(lambda: 1)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    called = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: called.append(1))
+    assert not called
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker()
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+def test_business_errors_do_not_count():
+    breaker = make_breaker(is_failure=lambda error: not isinstance(error, ValueError))
+
+    def business_error():
+        raise ValueError("Không tìm thấy sản phẩm")
+
+    for _ in range(4):
+        with pytest.raises(ValueError):
+            breaker.call(business_error)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success_and_reopens_on_failure():
+    breaker = make_breaker()
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+    assert breaker.stats()['window_calls'] == 0
+
+
+def test_half_open_limits_concurrent_probes():
+    breaker = make_breaker()
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    time.sleep(0.06)
+
+    breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_cancelled_llm_probe_releases_half_open_slot():
+    from backend.services.llm_service import LLMService
+
+    service = LLMService(hedge_enabled=False, max_retries=0)
+    service.breaker = make_breaker()
+    for _ in range(4):
+        with pytest.raises(ConnectionError):
+            service.breaker.call(fail)
+    time.sleep(0.06)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def answer():
+        return 'ok'
+
+    async def scenario():
+        probe = asyncio.ensure_future(service._with_retries('gpt', hang, hedge=False))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert service.breaker.state == HALF_OPEN
+        return await service._with_retries('gpt', answer, hedge=False)
+
+    assert asyncio.run(scenario()) == 'ok'
+    assert service.breaker.state == CLOSED
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services.crm_service import crm_service
+from backend.services.customer_index import customer_index
+
+
+def test_new_partner_from_opportunity_is_indexed(fake_odoo, monkeypatch):
+    # Index không tự refresh trong lúc test: khách mới phải có nhờ upsert sau create
+    monkeypatch.setattr(customer_index, 'ttl', 3600)
+    customer_index.invalidate()
+    assert customer_index.lookup('Phạm Minh Khôi') == []
+
+    crm_service.create_opportunity('Phạm Minh Khôi', phone='0912 345 678', email='khoi@example.com')
+
+    partner_id = max(fake_odoo.store.records['res.partner'])
+    assert fake_odoo.store.records['res.partner'][partner_id]['name'] == 'Phạm Minh Khôi'
+    for query in [{'customer_name': 'pham minh khoi'}, {'phone': '0912345678'}, {'email': 'KHOI@example.com'}]:
+        assert [p['id'] for p in customer_index.lookup(**query)] == [partner_id]
+
+
+@pytest.mark.latency(0.02)
+def test_concurrent_expired_lookups_refresh_once(fake_odoo, monkeypatch):
+    customer_index.invalidate()
+    customer_index.ensure_fresh()
+    before = customer_index.stats()['incremental_refreshes']
+    monkeypatch.setattr(customer_index, '_checked_at', 0.0)
+    with ThreadPoolExecutor(8) as executor:
+        for future in [executor.submit(customer_index.ensure_fresh) for _ in range(8)]:
+            future.result()
+    assert customer_index.stats()['incremental_refreshes'] == before + 1
@@ -0,0 +1,81 @@
+import pytest
+
+from backend.services.fast_intent import FastIntentParser
+
+
+class StubIndexParser(FastIntentParser):
+    """Parser coi mọi khách/sản phẩm là có trong index (chỉ kiểm tra luật tách câu)"""
+
+    @staticmethod
+    def _customer_exists(name: str) -> bool:
+        return True
+
+    @staticmethod
+    def _product_exists(name: str) -> bool:
+        return True
+
+
+@pytest.fixture
+def parser():
+    return StubIndexParser(threshold=0.0)
+
+
+@pytest.mark.parametrize("message, action", [
+    ("Xác nhận đơn SO001", "confirm_quotation"),
+    ("Đồng ý SO001", "confirm_quotation"),
+    ("Confirm S00042", "confirm_quotation"),
+    ("Xác nhận báo giá S042", "confirm_quotation"),
+    ("Đồng ý báo giá SO001", "confirm_quotation"),
+    ("Hủy đơn hàng SO001", "cancel_order"),
+    ("Hủy đơn SO001", "cancel_order"),
+    ("Cancel SO-003", "cancel_order"),
+])
+def test_write_command_fast_path(parser, message, action):
+    intent, confidence = parser.parse(message)
+    assert intent["action"] == action
+    assert confidence == 0.95
+
+
+@pytest.mark.parametrize("message", [
+    # Vừa xác nhận vừa hủy -> mơ hồ, không được chạy lệnh ghi
+    "Xác nhận hủy đơn SO001",
+    "Hủy xác nhận SO001",
+    "Khách đồng ý hủy SO001",
+    "Confirm cancel SO003",
+    # Động từ không đứng đầu câu
+    "Khách muốn hủy SO001",
+    "Đơn SO001 khách xác nhận rồi",
+    # Phủ định, nhiều mã đơn
+    "Không hủy đơn SO001",
+    "Xác nhận SO001 và SO002",
+    # Mã model sản phẩm, không phải mã đơn
+    "Xác nhận báo giá S23 Ultra cho khách An",
+    "Hủy S24",
+])
+def test_ambiguous_write_command_goes_to_llm(parser, message):
+    assert parser.parse(message) is None
+
+
+def test_check_orders(parser):
+    assert parser.parse("Xem đơn hàng gần đây") == ({"action": "check_orders", "customer": None}, 0.9)
+    assert parser.parse("Xem đơn của khách Trần Thị An") == (
+        {"action": "check_orders", "customer": "Trần Thị An"}, 0.9)
+
+
+@pytest.mark.parametrize("message", [
+    "Giá iPhone 10 Pro cho khách Nguyễn Văn An và xem đơn của khách Trần Thị An",
+    "Xem đơn của khách An, báo giá iPhone",
+    "Xem đơn của khách An rồi xác nhận đơn mới nhất",
+    "Khách muốn xem đơn của Trần An",
+])
+def test_multi_request_goes_to_llm(parser, message):
+    assert parser.parse(message) is None
+
+
+def test_stats_count_fast_path(parser):
+    parser.parse("Hủy đơn SO001")
+    parser.parse("Xác nhận hủy đơn SO001")
+    stats = parser.stats()
+    assert stats["messages"] == 2
+    assert stats["fast_path_hits"] == 1
+    assert stats["by_action"] == {"cancel_order": 1}
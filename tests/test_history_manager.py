@@ -0,0 +1,72 @@
+from backend.services.history_manager import MESSAGE_OVERHEAD, HistoryManager, estimate_tokens
+
+SYSTEM = "Bạn là trợ lý bán hàng."
+
+
+def order_list(n: int) -> str:
+    orders = [f"• S{i:05d} - Khách {i} - {i},000,000 VNĐ\n  [Báo giá] [Chưa xuất hóa đơn] [Chưa giao]"
+              for i in range(1, n + 1)]
+    return "DANH SÁCH ĐƠN HÀNG:\n\n" + "\n\n".join(orders)
+
+
+def test_short_reply_kept():
+    manager = HistoryManager(compact_chars=200)
+    assert manager.compact_reply("Dạ, em chào anh!") == "Dạ, em chào anh!"
+
+
+def test_order_listing_compacted_to_codes():
+    manager = HistoryManager(compact_chars=100, max_facts=3)
+    summary = manager.compact_reply(order_list(5))
+    assert summary == ("[Tóm tắt] DANH SÁCH ĐƠN HÀNG | S00001 (Khách 1, 1,000,000 VNĐ); "
+                       "S00002 (Khách 2, 2,000,000 VNĐ); S00003 (Khách 3, 3,000,000 VNĐ) (+2 khác)")
+
+
+def test_field_reply_keeps_facts():
+    reply = ("✅ ĐÃ TẠO BÁO GIÁ THÀNH CÔNG\n\nMã báo giá: S00042\nKhách hàng: Nguyễn Văn An\n"
+             "Sản phẩm:\n- iPhone 15 Pro - Giá: 25,000,000 VNĐ x 2\nTổng tiền: 55,000,000 VNĐ\n"
+             "Trạng thái: Chờ xác nhận (Draft)\n" + "Ghi chú dài. " * 20)
+    summary = HistoryManager(compact_chars=100).compact_reply(reply)
+    assert summary.startswith("[Tóm tắt] ✅ ĐÃ TẠO BÁO GIÁ THÀNH CÔNG")
+    for fact in ["Mã báo giá: S00042", "Khách hàng: Nguyễn Văn An", "Tổng tiền: 55,000,000 VNĐ",
+                 "iPhone 15 Pro (25,000,000 VNĐ)"]:
+        assert fact in summary
+    assert "Ghi chú" not in summary
+
+
+def test_unstructured_reply_truncated_with_order_codes():
+    reply = "Anh chị có thể xem lại đơn " + "rất dài " * 40 + "liên quan tới SO12345 và S00007."
+    summary = HistoryManager(compact_chars=60).compact_reply(reply)
+    assert summary.startswith(reply[:50]) and '…' in summary
+    assert summary.endswith("[Mã: SO12345, S00007]")
+
+
+def test_build_keeps_system_first_and_drops_oldest_within_budget():
+    history = []
+    for i in range(10):
+        history += [{'role': 'user', 'content': f"câu hỏi số {i} " * 5},
+                    {'role': 'bot', 'content': f"trả lời số {i} " * 5}]
+    manager = HistoryManager(budget=120, compact_chars=1000)
+    messages, usage = manager.build(SYSTEM, history, "câu hỏi mới")
+
+    assert messages[0] == {'role': 'system', 'content': SYSTEM}
+    assert messages[-1] == {'role': 'user', 'content': "câu hỏi mới"}
+    kept = messages[1:-1]
+    # Giữ phần đuôi của lịch sử, vai trò bot -> assistant
+    assert kept[-1] == {'role': 'assistant', 'content': history[-1]['content']}
+    assert len(kept) == usage['history_kept'] < len(history)
+    assert usage['history_tokens'] == sum(estimate_tokens(m['content']) + MESSAGE_OVERHEAD for m in kept)
+    assert usage['history_tokens'] <= 120
+    assert usage['prompt_tokens_est'] == usage['system_tokens'] + usage['history_tokens'] + usage['message_tokens']
+    assert manager.stats()['dropped_messages'] == len(history) - len(kept)
+
+
+def test_build_compacts_long_bot_replies():
+    history = [{'role': 'user', 'content': "xem đơn hàng"}, {'role': 'bot', 'content': order_list(8)}]
+    manager = HistoryManager(budget=10000, compact_chars=200)
+    messages, usage = manager.build(SYSTEM, history, "xác nhận đơn đầu tiên")
+
+    assert messages[2]['content'].startswith("[Tóm tắt] DANH SÁCH ĐƠN HÀNG")
+    assert usage['compacted'] == 1 and usage['saved_tokens'] > 0
+    # Prefix system prompt không đổi giữa các lượt
+    again, _ = manager.build(SYSTEM, history + [{'role': 'user', 'content': 'ok'}], "tiếp")
+    assert again[0] == messages[0]
@@ -0,0 +1,30 @@
+from backend.models import ChatRequest
+from backend.routers.chat import cacheable_intent, intent_cache_key
+from backend.services.session_store import ChatSession
+
+
+def session_after(bot_reply: str) -> ChatSession:
+    return ChatSession('s1', {
+        'turns': [
+            {'role': 'user', 'content': 'Đơn SO001 thế nào?'},
+            {'role': 'bot', 'content': bot_reply},
+        ],
+        'entities': {'order_name': 'SO001'},
+    })
+
+
+def test_short_follow_up_keyed_by_last_bot_question():
+    request = ChatRequest(message='Có')
+    confirm = intent_cache_key(request, session_after('Xác nhận đơn SO001?'))
+    cancel = intent_cache_key(request, session_after('Hủy đơn SO001?'))
+    assert confirm != cancel
+    assert confirm == intent_cache_key(ChatRequest(message='có'), session_after('Xác nhận đơn SO001?'))
+
+
+def test_only_read_intents_are_cacheable():
+    assert cacheable_intent({'action': 'list_products', 'keyword': 'iPhone'})
+    assert cacheable_intent({'actions': [{'action': 'check_orders'}, {'action': 'suggest_price'}]})
+    assert not cacheable_intent({'action': 'confirm_quotation', 'order_name': 'SO001'})
+    assert not cacheable_intent({'action': 'cancel_order', 'order_name': 'SO001'})
+    assert not cacheable_intent({'actions': [{'action': 'list_products'}, {'action': 'create_quotation'}]})
+    assert not cacheable_intent(None)
@@ -0,0 +1,98 @@
+"""LLMService.stream_json qua fake OpenAI server (uvicorn chạy nền trên cổng ngẫu nhiên)"""
+import asyncio
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from backend.fakes.llm_server import create_fake_llm_app
+from backend.services.llm_service import LLM_SECONDS, LLM_TOKENS, LLMService, StreamInterrupted
+
+MESSAGES = [{'role': 'user', 'content': 'xin chào'}]
+
+
+@contextmanager
+def serve(app):
+    """Chạy app trên 127.0.0.1, trả về base_url kiểu OpenAI (/v1)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        assert time.time() < deadline, "server không khởi động được"
+        time.sleep(0.02)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        server.should_exit = True
+        thread.join(5)
+
+
+def broken_stream_app() -> FastAPI:
+    """Trả chunk đầu rồi đứt kết nối giữa stream"""
+    app = FastAPI()
+    chunk = {'id': 'c1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'fake-broken',
+             'choices': [{'index': 0, 'delta': {'content': '{"action"'}, 'finish_reason': None}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions():
+        async def events():
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(0.05)
+            raise RuntimeError("upstream reset")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def stream_count(model: str) -> int:
+    state = LLM_SECONDS._values.get(LLM_SECONDS._key({'model': model, 'kind': 'stream'}))
+    return state[2] if state else 0
+
+
+def run_stream(service: LLMService, on_chunk, usage: dict = None):
+    async def scenario():
+        try:
+            return await service.stream_json(MESSAGES, on_chunk, usage)
+        finally:
+            await service.close()
+
+    return asyncio.run(scenario())
+
+
+def test_stream_records_usage_and_duration():
+    prompt_before = LLM_TOKENS.value(model='fake-stream', type='prompt')
+    streams_before = stream_count('fake-stream')
+    chunks, usage = [], {}
+    with serve(create_fake_llm_app()) as base_url:
+        service = LLMService(base_url=base_url, model='fake-stream')
+        data = run_stream(service, chunks.append, usage)
+
+    assert data['action'] == 'chat' and ''.join(chunks) == json.dumps(data, ensure_ascii=False)
+    assert usage['prompt_tokens'] > 0 and usage['completion_tokens'] > 0
+    assert LLM_TOKENS.value(model='fake-stream', type='prompt') == prompt_before + usage['prompt_tokens']
+    assert stream_count('fake-stream') == streams_before + 1
+    assert service.breaker.stats()['window_calls'] == 1
+
+
+def test_mid_stream_failure_counts_for_breaker():
+    chunks = []
+    with serve(broken_stream_app()) as base_url:
+        service = LLMService(base_url=base_url, model='fake-broken', max_retries=0)
+        with pytest.raises(StreamInterrupted):
+            run_stream(service, chunks.append)
+
+    assert chunks == ['{"action"']
+    stats = service.breaker.stats()
+    assert stats['window_calls'] == 1 and stats['failure_ratio'] == 1.0
+    assert service.stats()['errors'] == 1
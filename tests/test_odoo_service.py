@@ -0,0 +1,26 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services.odoo_service import odoo_service
+
+LATENCY = 0.1
+
+
+@pytest.mark.latency(LATENCY)
+def test_concurrent_chats_make_concurrent_rpcs(fake_odoo):
+    """N lời gọi từ threadpool (như N chat đồng thời) chạy song song trên cùng kết nối"""
+    def read_products(_):
+        return odoo_service.get_model('product.product').search_read([], ['name'], limit=1)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(read_products, range(8)))
+    elapsed = time.perf_counter() - start
+
+    assert all(len(rows) == 1 for rows in results)
+    assert elapsed < 4 * LATENCY
+    stats = odoo_service.rpc_counter.stats()
+    assert stats['max_in_flight'] >= 8
+    assert stats['in_flight'] == 0
@@ -0,0 +1,71 @@
+import pytest
+
+from backend.services.order_service import order_service
+from backend.services.product_service import product_service
+
+
+@pytest.fixture
+def products(fake_odoo):
+    """3 sản phẩm còn nhiều hàng (đủ cho số lượng trong test)"""
+    rows = [p for p in fake_odoo.store.records['product.product'].values() if p['qty_available'] >= 25]
+    assert len(rows) >= 3
+    return rows[:3]
+
+
+def line(line_id, product, qty):
+    return {'id': line_id, 'product_id': product['id'], 'product_name': product['name'],
+            'product_uom_qty': qty, 'price_unit': product['list_price']}
+
+
+def diff(existing, requested, keep_others=False):
+    lines = [(p['name'], qty) for p, qty in requested]
+    resolution = product_service.resolve_product_ids([p['id'] for p, _ in requested])
+    context = product_service.get_pricing_context(None)
+    return order_service._diff_order_lines(existing, lines, resolution, context, keep_others=keep_others)
+
+
+def test_only_changed_lines_produce_commands(products):
+    a, b, c = products
+    commands, details, ops, error = diff([line(11, a, 2), line(12, b, 1)], [(a, 2), (c, 3)])
+
+    assert error is None
+    assert ops == {'update': 0, 'create': 1, 'delete': 1}
+    assert commands[0][:2] == (0, 0)
+    assert commands[0][2]['product_id'] == c['id']
+    assert commands[0][2]['product_uom_qty'] == 3
+    assert commands[1] == (2, 12)
+    assert len(details) == 2
+
+
+def test_quantity_change_updates_line_in_place(products):
+    a, b, _ = products
+    commands, _, ops, error = diff([line(11, a, 2), line(12, b, 1)], [(a, 5)], keep_others=True)
+
+    assert error is None
+    assert ops == {'update': 1, 'create': 0, 'delete': 0}
+    assert commands == [(1, 11, {'product_uom_qty': 5, 'price_unit': commands[0][2]['price_unit']})]
+    assert commands[0][2]['price_unit'] > 0
+
+
+def test_unchanged_order_sends_nothing(products):
+    a, b, _ = products
+    commands, details, ops, error = diff([line(11, a, 2), line(12, b, 1)], [(a, 2), (b, 1)])
+    assert (commands, ops, error) == ([], {'update': 0, 'create': 0, 'delete': 0}, None)
+    assert len(details) == 2
+
+
+def test_duplicate_product_lines_match_once(products):
+    a, _, _ = products
+    commands, _, ops, _ = diff([line(11, a, 2), line(13, a, 4)], [(a, 2)])
+    assert commands == [(2, 13)]
+    assert ops['delete'] == 1
+
+
+def test_unknown_product_returns_error(products):
+    a, _, _ = products
+    lines = [(a['name'], 2), ('xyzqw', 1)]
+    commands, details, ops, error = order_service._diff_order_lines(
+        [line(11, a, 2)], lines, product_service.resolve_products(lines), product_service.get_pricing_context(None)
+    )
+    assert (commands, details, ops) == ([], [], {})
+    assert 'xyzqw' in error
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+import pytest
+
+from backend.services.catalog_cache import product_catalog
+from backend.services.odoo_service import odoo_service
+from backend.services.order_service import order_service
+from backend.services.order_snapshot import OrderSnapshotLoader, order_snapshots
+
+
+@pytest.fixture(autouse=True)
+def empty_name_cache(monkeypatch):
+    """LRU mã đơn -> ID của singleton không mang sang test khác (ID của store demo trùng nhau)"""
+    monkeypatch.setattr(order_snapshots, '_ids', OrderedDict())
+
+
+def make_order(fake, n_lines=1, confirm=False, invoice_state=None, picking_state=None):
+    store = fake.store
+    products = sorted(store.records['product.product'])
+    order_id = store.create('sale.order', {
+        'partner_id': min(store.records['res.partner']),
+        'order_line': [(0, 0, {'product_id': products[i], 'product_uom_qty': 1.0, 'price_unit': 1000000.0})
+                       for i in range(n_lines)],
+    })
+    if confirm:
+        store.action_confirm('sale.order', [order_id])
+    order = store.records['sale.order'][order_id]
+    if invoice_state:
+        invoice_id = store.create('account.move', {'name': f"INV/{order_id:04d}", 'state': invoice_state})
+        store.write('sale.order', [order_id], {'invoice_ids': [(4, invoice_id)]})
+    if picking_state:
+        for picking_id in order['picking_ids']:
+            store.records['stock.picking'][picking_id]['state'] = picking_state
+    return order
+
+
+def rpc_calls(func, *args, **kwargs):
+    product_catalog.ensure_fresh()  # tên sản phẩm lấy từ catalog đã load, không tính vào snapshot
+    with odoo_service.rpc_counter.track() as calls:
+        result = func(*args, **kwargs)
+    return result, [(model, method) for model, method, _ in calls]
+
+
+# ===== SỐ RPC CỐ ĐỊNH =====
+
+def test_snapshot_rpc_count_does_not_grow_with_lines(fake_odoo):
+    loader = OrderSnapshotLoader()
+    small = make_order(fake_odoo, n_lines=1, confirm=True, invoice_state='draft')
+    large = make_order(fake_odoo, n_lines=5, confirm=True, invoice_state='draft')
+
+    snapshot, calls = rpc_calls(loader.load, large['name'], documents=True)
+    assert len(snapshot['lines']) == 5 and len(snapshot['invoices']) == 1 and len(snapshot['pickings']) == 1
+    assert sorted(calls) == sorted([('sale.order', 'search_read'), ('sale.order.line', 'read'),
+                                    ('account.move', 'read'), ('stock.picking', 'read')])
+    _, small_calls = rpc_calls(loader.load, small['name'], documents=True)
+    assert len(small_calls) == len(calls)
+
+    # Lần 2: mã đã nhớ -> read theo ID thay cho search_read
+    _, calls = rpc_calls(loader.load, large['name'], documents=True)
+    assert ('sale.order', 'read') in calls and ('sale.order', 'search_read') not in calls
+    assert len(calls) == 4
+
+
+def test_draft_order_skips_empty_documents(fake_odoo):
+    order = make_order(fake_odoo, n_lines=2)
+    snapshot, calls = rpc_calls(OrderSnapshotLoader().load, order['name'], documents=True)
+    assert snapshot['invoices'] == [] and snapshot['pickings'] == []
+    assert calls == [('sale.order', 'search_read'), ('sale.order.line', 'read')]
+
+
+# ===== KIỂM TRA TRẠNG THÁI =====
+
+def test_confirm_checks_state_from_snapshot(fake_odoo):
+    confirmed = make_order(fake_odoo, confirm=True)
+    assert 'đã được xác nhận trước đó' in order_service.confirm_quotation(confirmed['name'])
+
+    cancelled = make_order(fake_odoo)
+    fake_odoo.store.action_cancel('sale.order', [cancelled['id']])
+    assert 'đã bị hủy' in order_service.confirm_quotation(cancelled['name'])
+
+    draft = make_order(fake_odoo)
+    assert '✅ Đã xác nhận' in order_service.confirm_quotation(draft['name'])
+    assert draft['state'] == 'sale'
+    assert "Không tìm thấy báo giá 'S99999'" in order_service.confirm_quotation('S99999')
+
+
+def test_update_rejects_confirmed_order(fake_odoo):
+    order = make_order(fake_odoo, confirm=True)
+    reply = order_service.update_quotation(order['name'], quantity=3)
+    assert 'Chỉ có thể sửa báo giá ở trạng thái Nháp' in reply
+    assert fake_odoo.store.records['sale.order.line'][order['order_line'][0]]['product_uom_qty'] == 1.0
+
+
+@pytest.mark.parametrize('invoice_state, picking_state, expected, state_after', [
+    ('posted', None, 'Đã có hóa đơn được xác nhận', 'sale'),
+    (None, 'done', 'Đã có phiếu giao hàng hoàn tất', 'sale'),
+    ('draft', None, 'ĐÃ HỦY ĐƠN HÀNG THÀNH CÔNG', 'cancel'),
+    (None, None, 'ĐÃ HỦY ĐƠN HÀNG THÀNH CÔNG', 'cancel'),
+])
+def test_cancel_checks_invoices_and_pickings(fake_odoo, invoice_state, picking_state, expected, state_after):
+    order = make_order(fake_odoo, confirm=True, invoice_state=invoice_state, picking_state=picking_state)
+    assert expected in order_service.cancel_sale_order(order['name'])
+    assert order['state'] == state_after
+
+
+# ===== LRU MÃ ĐƠN -> ID =====
+
+def test_lru_evicts_least_recently_used(fake_odoo):
+    loader = OrderSnapshotLoader(capacity=2)
+    a, b, c = (make_order(fake_odoo) for _ in range(3))
+    loader.load(a['name'])
+    loader.load(b['name'])
+    loader.load(a['name'])          # a mới dùng -> b cũ nhất
+    loader.load(c['name'])
+    assert list(loader._ids) == [a['name'], c['name']]
+    misses = loader.stats()['id_misses']
+    loader.load(b['name'])
+    assert loader.stats()['id_misses'] == misses + 1
+
+
+def test_reused_name_is_looked_up_again(fake_odoo):
+    loader = OrderSnapshotLoader()
+    old = make_order(fake_odoo)
+    name = old['name']
+    assert loader.load(name)['id'] == old['id']
+
+    # Đơn cũ đổi mã, mã cũ gán cho đơn khác -> ID đã nhớ không còn khớp
+    new = make_order(fake_odoo, n_lines=2)
+    fake_odoo.store.write('sale.order', [old['id']], {'name': name + '-OLD'})
+    fake_odoo.store.write('sale.order', [new['id']], {'name': name})
+    snapshot = loader.load(name)
+    assert snapshot['id'] == new['id'] and len(snapshot['lines']) == 2
+    assert loader._ids[name] == new['id']
+
+
+def test_deleted_order_is_forgotten(fake_odoo):
+    loader = OrderSnapshotLoader()
+    order = make_order(fake_odoo)
+    loader.load(order['name'])
+    fake_odoo.store.unlink('sale.order', [order['id']])
+    assert loader.load(order['name']) is None
+    assert order['name'] not in loader._ids
+
+
+def test_cancelled_order_stays_cached_with_new_state(fake_odoo):
+    order = make_order(fake_odoo)
+    assert 'ĐÃ HỦY ĐƠN HÀNG THÀNH CÔNG' in order_service.cancel_sale_order(order['name'])
+    hits = order_snapshots.stats()['id_hits']
+
+    _, calls = rpc_calls(order_service.confirm_quotation, order['name'])
+    assert ('sale.order', 'search_read') not in calls
+    assert order_snapshots.stats()['id_hits'] == hits + 1
+    assert 'đã bị hủy' in order_service.confirm_quotation(order['name'])
+    assert 'đã bị hủy trước đó' in order_service.cancel_sale_order(order['name'])
@@ -0,0 +1,102 @@
+"""PricelistEngine so với logic pricelist cũ (search_read theo từng dòng, lọc min_quantity)"""
+import pytest
+
+from backend.services.pricelist_engine import compute_rule_price, pricelist_engine
+
+QUANTITIES = [1, 4, 5, 9, 10, 19, 20, 100]
+
+
+def legacy_price(items, product, quantity):
+    """Logic cũ của suggest_pricing: variant/template/global, order='applied_on, min_quantity desc'"""
+    template_id = product['product_tmpl_id']
+    matching = [i for i in items
+                if i['product_id'] == product['id']
+                or (template_id and i['product_tmpl_id'] == template_id)
+                or i['applied_on'] == '3_global']
+    matching.sort(key=lambda i: -(i['min_quantity'] or 0))
+    matching.sort(key=lambda i: i['applied_on'])
+    item = next((i for i in matching if (i['min_quantity'] or 0) <= quantity), None)
+    if not item:
+        return product['list_price']
+    if item['compute_price'] == 'fixed':
+        return item['fixed_price']
+    if item['compute_price'] == 'percentage':
+        return product['list_price'] * (1 - item['percent_price'] / 100)
+    base = product['standard_price'] if item['base'] == 'standard_price' else product['list_price']
+    return base * (1 - item['price_discount'] / 100)
+
+
+def add_rule(fake, pricelist_id, applied_on, compute_price, min_quantity=0, product=None, template_id=False,
+             fixed_price=0.0, percent_price=0.0, price_discount=0.0, base='list_price'):
+    return fake.store.create('product.pricelist.item', {
+        'pricelist_id': pricelist_id, 'applied_on': applied_on, 'compute_price': compute_price,
+        'min_quantity': min_quantity, 'product_id': product['id'] if product else False,
+        'product_tmpl_id': product['product_tmpl_id'] if product else template_id,
+        'fixed_price': fixed_price, 'percent_price': percent_price, 'price_discount': price_discount,
+        'price_surcharge': 0.0, 'base': base,
+    })
+
+
+@pytest.fixture
+def pricelist(fake_odoo):
+    """Pricelist mới: A có rule variant (fixed), template của B có rule percentage, còn lại rule global (formula)"""
+    store = fake_odoo.store
+    currency_id = min(store.records['res.currency'])
+    pricelist_id = store.create('product.pricelist', {'name': 'Test', 'active': True, 'currency_id': currency_id})
+    a, b, c = [store.records['product.product'][pid] for pid in sorted(store.records['product.product'])[:3]]
+    add_rule(fake_odoo, pricelist_id, '0_product_variant', 'fixed', 0, a, fixed_price=900000.0)
+    add_rule(fake_odoo, pricelist_id, '0_product_variant', 'fixed', 10, a, fixed_price=800000.0)
+    add_rule(fake_odoo, pricelist_id, '1_product', 'percentage', 5, template_id=b['product_tmpl_id'], percent_price=10.0)
+    add_rule(fake_odoo, pricelist_id, '1_product', 'percentage', 20, template_id=b['product_tmpl_id'], percent_price=20.0)
+    add_rule(fake_odoo, pricelist_id, '3_global', 'formula', 0, price_discount=5.0, base='standard_price')
+    add_rule(fake_odoo, pricelist_id, '3_global', 'formula', 20, price_discount=15.0, base='list_price')
+    items = [i for i in store.records['product.pricelist.item'].values() if i['pricelist_id'] == pricelist_id]
+    return pricelist_id, items, (a, b, c)
+
+
+def test_engine_matches_legacy_logic(pricelist):
+    pricelist_id, items, products = pricelist
+    for product in products:
+        for quantity in QUANTITIES:
+            price, _ = pricelist_engine.compute_price(pricelist_id, product, quantity)
+            assert price == pytest.approx(legacy_price(items, product, quantity)), (product['name'], quantity)
+
+
+def test_min_quantity_boundaries(pricelist):
+    pricelist_id, _, (a, b, c) = pricelist
+    price = lambda product, quantity: pricelist_engine.compute_price(pricelist_id, product, quantity)[0]
+
+    # Variant: bậc 10 áp dụng từ đúng 10
+    assert price(a, 9) == 900000.0
+    assert price(a, 10) == 800000.0
+    # Template: dưới bậc thấp nhất -> rơi xuống rule global (giá vốn -5%)
+    assert price(b, 4) == pytest.approx(b['standard_price'] * 0.95)
+    assert price(b, 5) == pytest.approx(b['list_price'] * 0.9)
+    assert price(b, 20) == pytest.approx(b['list_price'] * 0.8)
+    # Global: formula theo giá vốn, từ 20 theo giá niêm yết
+    assert price(c, 19) == pytest.approx(c['standard_price'] * 0.95)
+    assert price(c, 20) == pytest.approx(c['list_price'] * 0.85)
+
+
+def test_no_rule_keeps_list_price(fake_odoo):
+    store = fake_odoo.store
+    product = store.records['product.product'][min(store.records['product.product'])]
+    pricelist_id = store.create('product.pricelist', {'name': 'Bulk', 'active': True,
+                                                      'currency_id': min(store.records['res.currency'])})
+    add_rule(fake_odoo, pricelist_id, '0_product_variant', 'fixed', 50, product, fixed_price=1.0)
+    assert pricelist_engine.compute_price(pricelist_id, product, 49) == (product['list_price'], None)
+    assert compute_rule_price(None, 100.0) == 100.0
+
+
+def test_variant_rule_does_not_leak_to_sibling_variant(pricelist, fake_odoo):
+    # Khác biệt có chủ ý so với logic cũ: domain product_tmpl_id cũ khớp cả rule variant của sibling
+    pricelist_id, items, (a, _, _) = pricelist
+    sibling_id = fake_odoo.store.create('product.product', {
+        'name': a['name'] + ' (bản 2)', 'product_tmpl_id': a['product_tmpl_id'], 'list_price': a['list_price'],
+        'standard_price': a['standard_price'], 'qty_available': 5.0, 'taxes_id': [], 'sale_ok': True, 'active': True,
+    })
+    sibling = fake_odoo.store.records['product.product'][sibling_id]
+    price, rule = pricelist_engine.compute_price(pricelist_id, sibling, 1)
+    assert rule['applied_on'] == '3_global'
+    assert price == pytest.approx(sibling['standard_price'] * 0.95)
+    assert legacy_price(items, sibling, 1) == 900000.0
@@ -0,0 +1,79 @@
+import pytest
+
+from backend.config import settings
+from backend.services.product_index import ProductNameIndex, pick_best, trigrams
+
+NAMES = {
+    1: 'iPhone 15 Pro Max',
+    2: 'iPhone 15',
+    3: 'iPad Air',
+    4: 'Samsung Galaxy S24',
+    5: 'Điện thoại Xiaomi Redmi Note 13',
+    6: 'Tai nghe AirPods Pro',
+}
+
+
+@pytest.fixture
+def index():
+    index = ProductNameIndex(min_coverage=0.5)
+    index.rebuild(NAMES.items())
+    return index
+
+
+def ids(matches):
+    return [product_id for product_id, _ in matches]
+
+
+def test_exact_token_scores_one(index):
+    for token in ['samsung', 'galaxy', 's24', 'iphone', 'a']:
+        grams = trigrams(token)
+        assert len(grams) == len(token) + 1
+    assert index._similar_tokens('galaxy') == {'galaxy': 1.0}
+    # 'galax' (6 trigram) và 'galaxy' (7 trigram) chung 5 trigram
+    assert index._similar_tokens('galax')['galaxy'] == pytest.approx(2 * 5 / 13)
+
+
+def test_accents_and_exact_name(index):
+    assert index.search('dien thoai xiaomi redmi note 13')[0] == (5, 1.0)
+    assert index.search('iPhone 15')[0] == (2, 1.0)
+
+
+def test_typo(index):
+    assert ids(index.search('samsng galaxy'))[0] == 4
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('iph', {1, 2}),
+    ('ip', {1, 2, 3}),
+    ('phone', {1, 2}),
+    ('airpod', {6}),
+    ('galax', {4}),
+])
+def test_prefix_and_substring(index, query, expected):
+    matches = index.search(query, min_score=settings.PRODUCT_MATCH_MIN_SCORE)
+    assert set(ids(matches)) == expected
+
+
+def test_prefix_follows_incremental_updates(index):
+    index.add(7, 'Ipod Touch')
+    assert 7 in ids(index.search('ipo'))
+    index.remove(7)
+    assert index.search('ipo') == []
+
+
+def test_pick_best():
+    assert pick_best([]) is None
+    # 1 ứng viên đạt ngưỡng khớp -> chọn dù điểm thấp
+    assert pick_best([(6, 0.6)]) == 6
+    assert pick_best([(6, 0.6), (3, 0.2)]) == 6
+    # Trùng tên
+    assert pick_best([(2, 1.0), (1, 0.8)]) == 2
+    # Nhiều ứng viên sát nhau -> mơ hồ
+    assert pick_best([(1, 0.6), (2, 0.6)]) is None
+    assert pick_best([(1, 0.4)]) is None
+
+
+def test_single_weak_candidate_is_picked(index):
+    matches = index.search('airpod', min_score=settings.PRODUCT_MATCH_MIN_SCORE)
+    assert pick_best(matches) == 6
+    assert pick_best(index.search('iph', min_score=settings.PRODUCT_MATCH_MIN_SCORE)) is None
@@ -0,0 +1,74 @@
+from backend.services.catalog_cache import product_catalog
+from backend.services.customer_service import customer_service
+from backend.services.pricelist_engine import pricelist_engine
+from backend.services.product_service import product_service
+from backend.services.result_cache import result_cache
+
+
+def new_product(fake, name, qty=3.0):
+    return fake.store.create('product.product', {
+        'name': name, 'list_price': 5000000.0, 'qty_available': qty,
+        'taxes_id': [], 'sale_ok': True, 'active': True,
+    })
+
+
+def test_not_found_pricing_refreshes_after_product_created(fake_odoo, monkeypatch):
+    assert 'Không tìm thấy' in product_service.suggest_pricing('Máy chiếu Epson')['message']
+    # Vẫn trong TTL catalog -> dùng kết quả đã cache
+    assert 'Không tìm thấy' in product_service.suggest_pricing('Máy chiếu Epson')['message']
+
+    product_id = new_product(fake_odoo, 'Máy chiếu Epson')
+    monkeypatch.setattr(product_catalog, 'ttl', 0)
+    pricing = product_service.suggest_pricing('Máy chiếu Epson')
+    assert pricing['product_id'] == product_id
+    assert pricing['suggested_price'] == 5000000.0
+
+
+def test_out_of_stock_pricing_refreshes_after_restock(fake_odoo, monkeypatch):
+    product_id = new_product(fake_odoo, 'Loa JBL Flip', qty=0.0)
+    product_catalog.invalidate()
+    pricing = product_service.suggest_pricing('Loa JBL Flip')
+    assert pricing['product_id'] is None and 'tồn kho' in pricing['message']
+
+    fake_odoo.store.write('product.product', [product_id], {'qty_available': 10.0})
+    monkeypatch.setattr(product_catalog, 'stock_ttl', 0)
+    assert product_service.suggest_pricing('Loa JBL Flip')['product_id'] == product_id
+
+
+
+def vip_fixed_rule(fake):
+    """Rule giá cố định của pricelist VIP (khách 'Nguyễn Văn An') cho sản phẩm đầu tiên (đảm bảo còn hàng)"""
+    items = fake.store.records['product.pricelist.item']
+    rule = next(item for item in items.values() if item['compute_price'] == 'fixed')
+    fake.store.write('product.product', [rule['product_id']], {'qty_available': 10.0})
+    return rule
+
+
+def test_pricing_refreshes_after_pricelist_rule_changes(fake_odoo, monkeypatch):
+    rule = vip_fixed_rule(fake_odoo)
+    product = fake_odoo.store.records['product.product'][rule['product_id']]
+    pricing = product_service.suggest_pricing(product['name'], customer_name='Nguyễn Văn An')
+    assert pricing['suggested_price'] == rule['fixed_price']
+
+    fake_odoo.store.write('product.pricelist.item', [rule['id']], {'fixed_price': 1234000.0})
+    # Chưa tới lần kiểm tra tiếp theo -> vẫn giá đã cache
+    pricing = product_service.suggest_pricing(product['name'], customer_name='Nguyễn Văn An')
+    assert pricing['suggested_price'] != 1234000.0
+
+    monkeypatch.setattr(pricelist_engine, 'check_interval', 0)
+    pricing = product_service.suggest_pricing(product['name'], customer_name='Nguyễn Văn An')
+    assert pricing['suggested_price'] == 1234000.0
+
+
+def test_customer_pricelist_reply_dropped_when_engine_reloads(fake_odoo, monkeypatch):
+    rule = vip_fixed_rule(fake_odoo)
+    product = fake_odoo.store.records['product.product'][rule['product_id']]
+    product_service.suggest_pricing(product['name'], customer_name='Nguyễn Văn An')
+    customer_service.get_customer_pricelist('Nguyễn Văn An')
+    invalidated = result_cache.stats()['evictions']['invalidate']
+
+    fake_odoo.store.write('product.pricelist.item', [rule['id']], {'fixed_price': 1234000.0})
+    monkeypatch.setattr(pricelist_engine, 'check_interval', 0)
+    customer_service.get_customer_pricelist('Nguyễn Văn An')
+    # Cả báo giá lẫn chính sách giá đã cache đều bị loại
+    assert result_cache.stats()['evictions']['invalidate'] == invalidated + 2
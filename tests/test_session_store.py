@@ -0,0 +1,54 @@
+from backend.services.session_store import SessionStore, SQLiteSessionBackend
+
+
+def test_new_session_gets_id_and_is_reused():
+    store = SessionStore(capacity=10, max_turns=20)
+    session = store.get_or_create()
+    assert session.session_id
+    assert store.get_or_create(session.session_id) is session
+    assert store.stats()['created'] == 1 and store.stats()['hits'] == 1
+
+
+def test_record_turn_keeps_entities_usage_and_trims_turns():
+    store = SessionStore(capacity=10, max_turns=4)
+    session = store.get_or_create('abc')
+    store.record_turn(session, "giá iPhone cho anh An", "25,000,000 VNĐ",
+                      {'action': 'suggest_price', 'product': 'iPhone 15', 'customer': 'An'},
+                      {'prompt_tokens': 100, 'completion_tokens': 20, 'fast_path': False})
+    store.record_turn(session, "tạo báo giá 2 cái", "Đã tạo S00042",
+                      {'actions': [{'action': 'create_quotation', 'order_name': 'S00042', 'customer': 'An'}]},
+                      {'prompt_tokens': 150, 'completion_tokens': 30})
+    store.record_turn(session, "cảm ơn", "Dạ", {'action': 'chat'}, {'fast_path': True, 'prompt_tokens_est': 0})
+
+    assert [t['content'] for t in session.history()] == ["tạo báo giá 2 cái", "Đã tạo S00042", "cảm ơn", "Dạ"]
+    assert session.entities == {'product': 'iPhone 15', 'customer': 'An', 'order_name': 'S00042'}
+    assert session.usage == {'prompt_tokens': 250, 'completion_tokens': 50, 'prompt_tokens_est': 0, 'turns': 3}
+
+
+def test_evicted_session_reloads_from_sqlite(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / 'sessions.db'))
+    store = SessionStore(capacity=1, max_turns=20, backend=backend)
+    first = store.get_or_create('first')
+    store.record_turn(first, "xin chào", "Dạ chào anh", {'action': 'chat', 'customer': 'An'})
+    store.get_or_create('second')
+    assert store.stats()['evictions'] == 1
+
+    reloaded = store.get_or_create('first')
+    assert reloaded is not first
+    assert reloaded.history() == first.history() and reloaded.entities == {'customer': 'An'}
+    assert store.stats()['backend_loads'] == 1
+
+    # Process khác (store mới, cùng file) vẫn thấy phiên
+    other = SessionStore(backend=SQLiteSessionBackend(str(tmp_path / 'sessions.db')))
+    assert other.get_or_create('first').turns == first.turns
+
+    store.delete('first')
+    assert backend.load('first') is None
+
+
+def test_memory_only_store_forgets_evicted_session():
+    store = SessionStore(capacity=1, max_turns=20)
+    session = store.get_or_create('first')
+    store.record_turn(session, "xin chào", "Dạ")
+    store.get_or_create('second')
+    assert store.get_or_create('first').turns == []